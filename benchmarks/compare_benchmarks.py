@@ -0,0 +1,77 @@
+"""
+compare_benchmarks.py
+Developer: Erik Serrano
+
+Compares two JSON result files written by run_benchmarks.py and prints the
+median time of every benchmark in both runs along with their ratio.
+
+Usage:
+
+    python benchmarks/compare_benchmarks.py baseline.json new.json
+"""
+import sys
+import json
+import argparse
+from typing import Dict
+from typing import Tuple
+
+
+def load_medians(results_file: str) -> Dict[Tuple[str, str], float]:
+    """Returns the median time of each (size, benchmark) pair"""
+    with open(results_file, "r") as f:
+        report = json.load(f)
+
+    return {
+        (result["size"], result["benchmark"]): result["median_s"]
+        for result in report["results"]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compares two benchmark result files"
+    )
+    parser.add_argument("baseline", type=str, help="baseline results file")
+    parser.add_argument("new", type=str, help="new results file")
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        dest="threshold",
+        default=1.1,
+        help="ratio above which a benchmark is flagged as slower",
+    )
+    args = parser.parse_args()
+
+    baseline = load_medians(args.baseline)
+    new = load_medians(args.new)
+
+    row_format = "{:<8} {:<26} {:>12} {:>12} {:>8}"
+    print(row_format.format("size", "benchmark", "baseline", "new", "ratio"))
+
+    n_slower = 0
+    for key in baseline:
+        if key not in new:
+            continue
+
+        ratio = new[key] / baseline[key] if baseline[key] > 0 else 0
+        flag = ""
+        if ratio > args.threshold:
+            flag = " slower"
+            n_slower += 1
+        print(
+            row_format.format(
+                key[0],
+                key[1],
+                f"{baseline[key]:.6f}",
+                f"{new[key]:.6f}",
+                f"{ratio:.2f}",
+            )
+            + flag
+        )
+
+    sys.exit(1 if n_slower > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
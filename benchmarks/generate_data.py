@@ -0,0 +1,242 @@
+"""
+generate_data.py
+Developer: Erik Serrano
+
+Generates synthetic GTEx-like datasets used by the benchmarks. The generated
+files follow the layout of the GTEx gene reads (GCT) and sample attributes
+files, so they can be passed straight to plot_gtex.py.
+
+* write_reads_file - writes a compressed GCT file with random read counts
+* write_attributes_file - writes a sample attributes file
+* generate_dataset - writes both files of a dataset into a directory
+
+GTEx v8 scale is 56200 genes, 17382 RNA-seq samples and 22951 attribute rows.
+"""
+import sys
+import gzip
+import random
+import argparse
+from pathlib import Path
+from typing import List
+from typing import Dict
+from typing import Optional
+
+TISSUES = [
+    "Adipose Tissue",
+    "Adrenal Gland",
+    "Bladder",
+    "Blood",
+    "Blood Vessel",
+    "Bone Marrow",
+    "Brain",
+    "Breast",
+    "Cervix Uteri",
+    "Colon",
+    "Esophagus",
+    "Fallopian Tube",
+    "Heart",
+    "Kidney",
+    "Liver",
+    "Lung",
+    "Muscle",
+    "Nerve",
+    "Ovary",
+    "Pancreas",
+    "Pituitary",
+    "Prostate",
+    "Salivary Gland",
+    "Skin",
+    "Small Intestine",
+    "Spleen",
+    "Stomach",
+    "Testis",
+    "Thyroid",
+    "Uterus",
+    "Vagina",
+]
+
+
+def sample_ids(n_samples: int) -> List[str]:
+    """Returns GTEx-like sample ids"""
+    return [
+        f"GTEX-{idx // 20:05X}-{idx % 20:04d}-SM-{idx:05X}"
+        for idx in range(n_samples)
+    ]
+
+
+def write_reads_file(
+    reads_file: str,
+    samples: List[str],
+    n_genes: int,
+    seed: Optional[int] = 0,
+) -> None:
+    """Writes a compressed GCT file with random read counts.
+
+    Parameters
+    ----------
+    reads_file : str
+        path of the generated file
+    samples : list[str]
+        sample ids used as the count columns
+    n_genes : int
+        number of gene rows
+    seed : int
+        random seed
+    """
+    rng = random.Random(seed)
+
+    # count rows are reused to keep generation time down at large sizes
+    count_rows = [
+        "\t".join(str(rng.randint(0, 50000)) for _ in samples)
+        for _ in range(min(n_genes, 64))
+    ]
+
+    with gzip.open(reads_file, "wt", compresslevel=1) as f:
+        f.write("#1.2\n")
+        f.write(f"{n_genes}\t{len(samples)}\n")
+        f.write("\t".join(["Name", "Description"] + samples) + "\n")
+        for idx in range(n_genes):
+            counts = count_rows[idx % len(count_rows)]
+            f.write(f"ENSG{idx:011d}.1\tGENE{idx}\t{counts}\n")
+
+
+def write_attributes_file(
+    attributes_file: str,
+    samples: List[str],
+    n_tissues: Optional[int] = len(TISSUES),
+    seed: Optional[int] = 0,
+) -> None:
+    """Writes a sample attributes file. Samples are randomly assigned to a
+    tissue group (SMTS), a tissue subgroup (SMTSD) and a center (SMCENTER).
+
+    Parameters
+    ----------
+    attributes_file : str
+        path of the generated file
+    samples : list[str]
+        sample ids written to the SAMPID column
+    n_tissues : int
+        number of tissue groups
+    seed : int
+        random seed
+    """
+    rng = random.Random(seed)
+    tissues = TISSUES[:n_tissues]
+
+    with open(attributes_file, "w") as f:
+        f.write("SAMPID\tSMATSSCR\tSMCENTER\tSMPTHNTS\tSMRIN\tSMTS\tSMTSD\n")
+        for sample in samples:
+            tissue = rng.choice(tissues)
+            center = rng.choice(["B1", "C1", "D1"])
+            sub_tissue = f"{tissue} - {rng.randint(1, 3)}"
+            f.write(
+                f"{sample}\t0\t{center}\tnotes\t7.0\t{tissue}\t{sub_tissue}\n"
+            )
+
+
+def generate_dataset(
+    out_dir: str,
+    n_genes: int,
+    n_samples: int,
+    n_attribute_rows: Optional[int] = None,
+    seed: Optional[int] = 0,
+) -> Dict[str, str]:
+    """Writes a reads file and an attributes file into a directory. The
+    attributes file contains more samples than the reads file, like GTEx
+    where many samples have no RNA-seq data.
+
+    Parameters
+    ----------
+    out_dir : str
+        directory where the files are written
+    n_genes : int
+        number of gene rows
+    n_samples : int
+        number of samples in the reads file
+    n_attribute_rows : int, optional
+        number of samples in the attributes file. Defaults to 1.3 times the
+        number of samples in the reads file
+    seed : int
+        random seed
+
+    Returns
+    -------
+    dict[str, str]
+        paths of the generated files (gene_reads, sample_attributes)
+    """
+    if n_attribute_rows is None:
+        n_attribute_rows = int(n_samples * 1.3)
+    n_attribute_rows = max(n_attribute_rows, n_samples)
+
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    name = f"synthetic_{n_genes}x{n_samples}"
+    reads_file = str(out_path / f"{name}_gene_reads.gct.gz")
+    attributes_file = str(out_path / f"{name}_SampleAttributesDS.txt")
+
+    all_samples = sample_ids(n_attribute_rows)
+    rng = random.Random(seed)
+    rna_samples = sorted(rng.sample(all_samples, n_samples))
+
+    write_reads_file(reads_file, rna_samples, n_genes, seed=seed)
+    write_attributes_file(attributes_file, all_samples, seed=seed)
+
+    return {"gene_reads": reads_file, "sample_attributes": attributes_file}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generates synthetic GTEx-like datasets"
+    )
+    parser.add_argument(
+        "-o",
+        "--out_dir",
+        type=str,
+        dest="out_dir",
+        required=True,
+        help="directory where the dataset is written",
+    )
+    parser.add_argument(
+        "-ng",
+        "--n_genes",
+        type=int,
+        dest="n_genes",
+        default=56200,
+        help="number of genes (default=56200)",
+    )
+    parser.add_argument(
+        "-ns",
+        "--n_samples",
+        type=int,
+        dest="n_samples",
+        default=17382,
+        help="number of samples in the reads file (default=17382)",
+    )
+    parser.add_argument(
+        "-na",
+        "--n_attribute_rows",
+        type=int,
+        dest="n_attribute_rows",
+        default=22951,
+        help="number of samples in the attributes file (default=22951)",
+    )
+    parser.add_argument(
+        "--seed", type=int, dest="seed", default=0, help="random seed"
+    )
+    args = parser.parse_args()
+
+    paths = generate_dataset(
+        args.out_dir,
+        n_genes=args.n_genes,
+        n_samples=args.n_samples,
+        n_attribute_rows=args.n_attribute_rows,
+        seed=args.seed,
+    )
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+run_benchmarks.py
+Developer: Erik Serrano
+
+Times the search, grouping and loading hot paths of plot_gtex on synthetic
+datasets of several sizes (look at generate_data.py) and writes the results
+as JSON, so runs of different commits can be compared offline with
+compare_benchmarks.py.
+
+Usage:
+
+    python benchmarks/run_benchmarks.py --sizes tiny,small -o results.json
+"""
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from datetime import timezone
+from contextlib import redirect_stdout
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Callable
+from typing import Optional
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_DIR))
+
+import utils  # noqa: E402
+import plot_gtex  # noqa: E402
+import sample_index  # noqa: E402
+from generate_data import generate_dataset  # noqa: E402
+
+# (genes, reads samples, attribute rows)
+SIZES = {
+    "tiny": (100, 200, 260),
+    "small": (1000, 2000, 2600),
+    "medium": (5000, 8000, 10400),
+    "gtex": (56200, 17382, 22951),
+}
+
+
+def time_call(
+    func: Callable[[], Any],
+    repeat: Optional[int] = 5,
+    setup: Optional[Callable[[], Any]] = None,
+) -> Dict[str, float]:
+    """Calls a function `repeat` times and returns the min, median and mean
+    wall time of a call in seconds. The setup function is called before every
+    call and is not timed.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.mean(timings),
+        "repeat": repeat,
+    }
+
+
+def run_main(argv: List[str]) -> None:
+    """Runs plot_gtex.main in-process with the given arguments"""
+    sys_argv = sys.argv
+    sys.argv = ["plot_gtex.py"] + argv
+    try:
+        with redirect_stdout(io.StringIO()):
+            plot_gtex.main()
+    except SystemExit as e:
+        if e.code not in (0, None):
+            raise RuntimeError(f"plot_gtex exited with {e.code}")
+    finally:
+        sys.argv = sys_argv
+
+
+def benchmark_size(
+    size_name: str, data_dir: str, repeat: int
+) -> List[Dict[str, Any]]:
+    """Generates the dataset of a size and times every hot path on it"""
+    n_genes, n_samples, n_attribute_rows = SIZES[size_name]
+    paths = generate_dataset(
+        str(Path(data_dir) / size_name),
+        n_genes=n_genes,
+        n_samples=n_samples,
+        n_attribute_rows=n_attribute_rows,
+    )
+    reads_file = paths["gene_reads"]
+    attributes_file = paths["sample_attributes"]
+
+    # inputs shared by the benchmarks
+    header = plot_gtex.load_reads_header(reads_file)
+    indexed_header = utils.index_list(header)
+    header_index = utils.SortedIndex(indexed_header)
+    sample_header, samples = plot_gtex.load_samples(attributes_file)
+    sample_id_col_idx = sample_header.index("SAMPID")
+    group_col_idx = sample_header.index("SMTS")
+    sample_groups = sample_index.load_sample_groups(
+        attributes_file, use_index=False
+    )
+    group_count_idxs, _ = plot_gtex.join_sample_columns(sample_groups, header)
+    gene = f"GENE{n_genes - 1}"
+    gene_counts = plot_gtex.load_gene_counts(reads_file, [gene])[gene]
+    grouped_counts = plot_gtex.collect_grouped_counts(
+        gene_counts, group_count_idxs
+    )
+    last_sample = header[-1]
+    output_file = str(Path(data_dir) / size_name / "benchmark.png")
+
+    # the sample groups index written by a run is removed before every timed
+    # call, so each call parses the attributes file like a first run
+    index_path = sample_index.sample_index_path(attributes_file, "SMTS")
+
+    def remove_sample_index() -> None:
+        if index_path.exists():
+            index_path.unlink()
+
+    benchmarks = {
+        "linear_search": lambda: utils.linear_search(last_sample, header),
+        "binary_search": lambda: utils.binary_search(
+            last_sample, indexed_header
+        ),
+        "sorted_index_lookup": lambda: header_index.lookup(last_sample),
+        "index_list": lambda: utils.index_list(header),
+        "group_samples_by_tissues": lambda: plot_gtex.group_samples_by_tissues(
+            samples, sample_id_col_idx, group_col_idx
+        ),
+        "join_sample_columns": lambda: plot_gtex.join_sample_columns(
+            sample_groups, header
+        ),
+        "load_sample_groups": lambda: sample_index.load_sample_groups(
+            attributes_file
+        ),
+        "load_sample_groups_indexed": lambda: (
+            sample_index.load_sample_groups(attributes_file)
+        ),
+        "load_reads": lambda: plot_gtex.load_reads(reads_file),
+        "load_reads_matrix": lambda: plot_gtex.load_reads_matrix(reads_file),
+        "load_gene_counts": lambda: plot_gtex.load_gene_counts(
+            reads_file, [gene]
+        ),
+        "filter_by_mean": lambda: utils.filter_by_mean(
+            grouped_counts, threshold=0
+        ),
+        "main": lambda: run_main(
+            [
+                "--gene_reads",
+                reads_file,
+                "--sample_attributes",
+                attributes_file,
+                "--gene",
+                gene,
+                "--output_file",
+                output_file,
+            ]
+        ),
+    }
+
+    # benchmarks that start without a sample groups index, the indexed
+    # benchmark runs right after load_sample_groups and reuses its index
+    cold_benchmarks = {"load_sample_groups", "main"}
+
+    results = []
+    for name, func in benchmarks.items():
+        print(f"MESSAGE: {size_name} {name}", file=sys.stderr)
+        result = {
+            "size": size_name,
+            "n_genes": n_genes,
+            "n_samples": n_samples,
+            "n_attribute_rows": n_attribute_rows,
+            "benchmark": name,
+        }
+        setup = remove_sample_index if name in cold_benchmarks else None
+        result.update(time_call(func, repeat=repeat, setup=setup))
+        results.append(result)
+
+    remove_sample_index()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """Returns the commit of the repository or None outside of git"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the hot paths of plot_gtex"
+    )
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        type=str,
+        dest="sizes",
+        default="tiny,small",
+        help=f"comma separated dataset sizes. choices={list(SIZES)}",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        dest="repeat",
+        default=5,
+        help="number of timed calls per benchmark (default=5)",
+    )
+    parser.add_argument(
+        "-d",
+        "--data_dir",
+        type=str,
+        dest="data_dir",
+        default=str(REPO_DIR / "benchmarks" / "data"),
+        help="directory where the synthetic datasets are written",
+    )
+    parser.add_argument(
+        "-o",
+        "--output_file",
+        type=str,
+        dest="output",
+        default=None,
+        help="JSON file where results are written (default=stdout)",
+    )
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",")]
+    for size in sizes:
+        if size not in SIZES:
+            print(f"ValueError: unknown size {size}, choices={list(SIZES)}")
+            sys.exit(1)
+
+    results = []
+    for size in sizes:
+        results.extend(benchmark_size(size, args.data_dir, args.repeat))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"MESSAGE: results saved in: {args.output}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
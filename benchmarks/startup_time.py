@@ -0,0 +1,147 @@
+"""
+startup_time.py
+Developer: Erik Serrano
+
+Measures the cold start of the command line tools. Every target is started in
+a fresh interpreter with `python -X importtime`, which reports the time spent
+importing each module. The total wall time of the process and the slowest
+imports are written as JSON, so startup regressions can be compared between
+commits.
+
+Usage:
+
+    python benchmarks/startup_time.py --repeat 5 -o startup.json
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+
+# name -> arguments passed to the interpreter
+TARGETS = {
+    "import utils": ["-c", "import utils"],
+    "import plot_gtex": ["-c", "import plot_gtex"],
+    "search.py --help": ["search.py", "--help"],
+    "plot_gtex.py --help": ["plot_gtex.py", "--help"],
+}
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """Parses the output of `-X importtime` into the self and cumulative
+    import time (microseconds) of every module
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        fields = line.split(":", 1)[1]
+        self_us, cumulative_us, module = fields.split("|")
+        imports[module.strip()] = {
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        }
+
+    return imports
+
+
+def measure(args: List[str], repeat: int, top: int) -> Dict[str, Any]:
+    """Starts a fresh interpreter `repeat` times and keeps the fastest run"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime"] + args,
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+        )
+        wall_s = time.perf_counter() - start
+
+        if best is None or wall_s < best["wall_s"]:
+            imports = parse_importtime(process.stderr)
+            slowest = sorted(
+                imports.items(),
+                key=lambda item: item[1]["cumulative_us"],
+                reverse=True,
+            )
+            best = {
+                "wall_s": wall_s,
+                "n_modules": len(imports),
+                "imports_matplotlib": "matplotlib" in imports,
+                "imports_numpy": "numpy" in imports,
+                "slowest_imports": [
+                    dict(module=module, **times)
+                    for module, times in slowest[:top]
+                ],
+            }
+
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measures the cold start of the command line tools"
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        dest="repeat",
+        default=5,
+        help="number of runs per target, the fastest is kept (default=5)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        dest="top",
+        default=10,
+        help="number of slowest imports reported per target (default=10)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output_file",
+        type=str,
+        dest="output",
+        default=None,
+        help="JSON file where results are written",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for name, target_args in TARGETS.items():
+        results[name] = measure(target_args, args.repeat, args.top)
+
+    row_format = "{:<22} {:>10} {:>9} {:>12} {:>8}"
+    print(
+        row_format.format(
+            "target", "wall (s)", "modules", "matplotlib", "numpy"
+        )
+    )
+    for name, result in results.items():
+        print(
+            row_format.format(
+                name,
+                f"{result['wall_s']:.3f}",
+                result["n_modules"],
+                str(result["imports_matplotlib"]),
+                str(result["imports_numpy"]),
+            )
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"MESSAGE: results saved in: {args.output}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+export_lib module
+Developer: Erik Serrano
+
+Module contains writers that export the grouped read counts collected by
+plot_gtex, so the numbers can be used without rendering any plot.
+
+Two kinds of tables can be written:
+
+* counts - one row per sample: gene, group, sample, count
+* summary - one row per group: gene, group, n, mean, median, q1, q3
+
+Supported formats are tsv, json, parquet (requires pyarrow) and npz. Genes
+are written one at a time as they are collected, tsv, json and parquet files
+are streamed to disk while npz files are written once all genes are added.
+
+* summarize_counts - computes the summary statistics of a group
+* open_writer - returns the writer of a format
+"""
+import json
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+from utils import group_stats
+
+if TYPE_CHECKING:
+    import numpy as np
+
+FORMATS = ["tsv", "json", "parquet", "npz"]
+COUNTS_COLUMNS = ["gene", "group", "sample", "count"]
+SUMMARY_COLUMNS = ["gene", "group", "n", "mean", "median", "q1", "q3"]
+
+
+def summarize_counts(
+    counts: "np.ndarray", stats: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Returns the number of samples, mean, median and quartiles of a group
+    (look at utils.group_stats). Precomputed statistics of the group are used
+    as they are, otherwise they are computed from the counts. Statistics of
+    empty groups are set to None.
+    """
+    if stats is None:
+        stats = group_stats([["", counts]])[0]
+    if stats["n"] == 0:
+        return {"n": 0, "mean": None, "median": None, "q1": None, "q3": None}
+
+    return {
+        "n": stats["n"],
+        "mean": round(stats["mean"], 2),
+        "median": stats["med"],
+        "q1": stats["q1"],
+        "q3": stats["q3"],
+    }
+
+
+def _iter_group_stats(
+    grouped_counts: List[List[Any]],
+    stats: Optional[List[Dict[str, Any]]] = None,
+) -> Iterator[Tuple[str, "np.ndarray", Optional[Dict[str, Any]]]]:
+    """Yields the name, counts and statistics (None if not provided) of
+    every group"""
+    if stats is None:
+        stats = [None] * len(grouped_counts)
+    for (group_name, counts), group_stat in zip(grouped_counts, stats):
+        yield group_name, counts, group_stat
+
+
+def gene_records(
+    gene: str,
+    grouped_counts: List[List[Any]],
+    group_samples: Dict[str, List[str]],
+    summary: bool,
+    stats: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Returns the table rows of one gene
+
+    Parameters
+    ----------
+    gene : str
+        gene name
+    grouped_counts : list[list[str, np.ndarray]]
+        group name and the read counts of its sample members
+    group_samples : dict[str, list[str]]
+        group name mapped to the sample ids of its counts, in the same order
+    summary : bool
+        returns one summary row per group instead of one row per sample
+    stats : list[dict], optional
+        statistics of every group (look at utils.group_stats), summaries are
+        computed from the counts if not provided
+    """
+    records = []
+    for group_name, counts, group_stat in _iter_group_stats(
+        grouped_counts, stats
+    ):
+        if summary:
+            record = {"gene": gene, "group": group_name}
+            record.update(summarize_counts(counts, group_stat))
+            records.append(record)
+            continue
+
+        for sample, count in zip(group_samples[group_name], counts.tolist()):
+            records.append(
+                {
+                    "gene": gene,
+                    "group": group_name,
+                    "sample": sample,
+                    "count": count,
+                }
+            )
+
+    return records
+
+
+class TsvWriter:
+    """Streams the table rows of every gene to a tab separated file"""
+
+    def __init__(self, output_file: str, summary: bool):
+        self.summary = summary
+        self.columns = SUMMARY_COLUMNS if summary else COUNTS_COLUMNS
+        self.file = open(output_file, "w")
+        self.file.write("\t".join(self.columns) + "\n")
+
+    def write_gene(
+        self,
+        gene: str,
+        grouped_counts: List[List[Any]],
+        group_samples: Dict[str, List[str]],
+        stats: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        for record in gene_records(
+            gene, grouped_counts, group_samples, self.summary, stats
+        ):
+            values = ["" if v is None else str(v) for v in record.values()]
+            self.file.write("\t".join(values) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class JsonWriter:
+    """Streams one JSON object per gene into a JSON array"""
+
+    def __init__(self, output_file: str, summary: bool):
+        self.summary = summary
+        self.file = open(output_file, "w")
+        self.file.write("[")
+        self.n_genes = 0
+
+    def write_gene(
+        self,
+        gene: str,
+        grouped_counts: List[List[Any]],
+        group_samples: Dict[str, List[str]],
+        stats: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        groups = []
+        for group_name, counts, group_stat in _iter_group_stats(
+            grouped_counts, stats
+        ):
+            group = {"group": group_name}
+            if self.summary:
+                group.update(summarize_counts(counts, group_stat))
+            else:
+                group["samples"] = group_samples[group_name]
+                group["counts"] = counts.tolist()
+            groups.append(group)
+
+        if self.n_genes > 0:
+            self.file.write(",")
+        self.file.write("\n" + json.dumps({"gene": gene, "groups": groups}))
+        self.n_genes += 1
+
+    def close(self) -> None:
+        self.file.write("\n]\n")
+        self.file.close()
+
+
+class ParquetWriter:
+    """Streams the table rows of every gene to a parquet file, one row group
+    per gene. Requires pyarrow.
+    """
+
+    def __init__(self, output_file: str, summary: bool):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            msg = "parquet output requires pyarrow to be installed"
+            raise ImportError(msg)
+
+        self.pa = pyarrow
+        self.summary = summary
+        if summary:
+            schema = pyarrow.schema(
+                [("gene", pyarrow.string()), ("group", pyarrow.string())]
+                + [("n", pyarrow.int64())]
+                + [(c, pyarrow.float64()) for c in SUMMARY_COLUMNS[3:]]
+            )
+        else:
+            schema = pyarrow.schema(
+                [(c, pyarrow.string()) for c in COUNTS_COLUMNS[:3]]
+                + [("count", pyarrow.int64())]
+            )
+        self.schema = schema
+        self.writer = pyarrow.parquet.ParquetWriter(output_file, schema)
+
+    def write_gene(
+        self,
+        gene: str,
+        grouped_counts: List[List[Any]],
+        group_samples: Dict[str, List[str]],
+        stats: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        records = gene_records(
+            gene, grouped_counts, group_samples, self.summary, stats
+        )
+        table = self.pa.Table.from_pylist(records, schema=self.schema)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class NpzWriter:
+    """Collects the counts of every gene and writes them to a compressed npz
+    file when closed. Arrays are named `gene/group` and hold the read counts
+    (and `gene/group/samples` the sample ids), or the n, mean, median, q1 and
+    q3 of the group with summary.
+    """
+
+    def __init__(self, output_file: str, summary: bool):
+        self.output_file = output_file
+        self.summary = summary
+        self.arrays = {}
+
+    def write_gene(
+        self,
+        gene: str,
+        grouped_counts: List[List[Any]],
+        group_samples: Dict[str, List[str]],
+        stats: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        import numpy as np
+
+        for group_name, counts, group_stat in _iter_group_stats(
+            grouped_counts, stats
+        ):
+            key = f"{gene}/{group_name}"
+            if self.summary:
+                summary = summarize_counts(counts, group_stat)
+                values = [summary[c] for c in SUMMARY_COLUMNS[2:]]
+                self.arrays[key] = np.asarray(
+                    [np.nan if v is None else v for v in values],
+                    dtype=np.float64,
+                )
+            else:
+                self.arrays[key] = np.asarray(counts)
+                self.arrays[f"{key}/samples"] = np.asarray(
+                    group_samples[group_name], dtype=str
+                )
+
+    def close(self) -> None:
+        import numpy as np
+
+        np.savez_compressed(self.output_file, **self.arrays)
+
+
+WRITERS = {
+    "tsv": TsvWriter,
+    "json": JsonWriter,
+    "parquet": ParquetWriter,
+    "npz": NpzWriter,
+}
+
+
+def open_writer(
+    output_format: str, output_file: str, summary: Optional[bool] = False
+) -> Any:
+    """Returns the writer of a format. Genes are added with
+    `writer.write_gene(gene, grouped_counts, group_samples, stats)` and the
+    file is completed with `writer.close()`. The statistics of the groups
+    (look at utils.filter_by_stat) are optional, summaries compute them from
+    the counts if they are not provided.
+
+    Parameters
+    ----------
+    output_format : str
+        tsv, json, parquet or npz
+    output_file : str
+        path of the exported file
+    summary : bool
+        writes the summary statistics of every group instead of the counts
+
+    Raises
+    ------
+    ValueError
+        Raised if the format is not supported
+    ImportError
+        Raised if parquet is requested without pyarrow installed
+    """
+    if output_format not in WRITERS:
+        raise ValueError(f"Unsupported format {output_format}")
+
+    return WRITERS[output_format](output_file, summary)
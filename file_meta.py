@@ -0,0 +1,138 @@
+"""
+file_meta module
+Developer: Erik Serrano
+
+Module contains the helpers shared by the on-disk builds derived from a
+reads file, the binary reads cache (look at gtex_cache.py) and the row index
+(look at gct_index.py). Each build directory holds a meta.json file with the
+fingerprint (size, mtime and sha256) of the reads file it was built from, and
+is written to a temporary directory that is moved in place once completed.
+
+* file_sha256 - returns the sha256 hex digest of a file
+* source_stats - returns the size and modification time of a file
+* source_fingerprint - returns the build metadata of a source file
+* read_meta - reads the metadata of a build directory
+* write_meta - writes the metadata of a build directory
+* is_build_valid - checks if a build still matches its source file
+* atomic_build - writes a build directory in place once completed
+"""
+import os
+import json
+import shutil
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+
+
+def file_sha256(path: str, chunk_size: Optional[int] = 1 << 20) -> str:
+    """Returns the sha256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_stats(source_file: str) -> Dict[str, int]:
+    """Returns the size and modification time of a file"""
+    stats = os.stat(source_file)
+    return {"size": stats.st_size, "mtime_ns": stats.st_mtime_ns}
+
+
+def source_fingerprint(source_file: str, version: int) -> Dict[str, Any]:
+    """Returns the metadata of a build of the source file: the build format
+    version, the source path, its size, mtime and sha256.
+
+    Builds take the fingerprint before reading the source file, so a file
+    modified while building leaves a stale build behind.
+    """
+    meta = {"version": version, "source": str(Path(source_file))}
+    meta.update(source_stats(source_file))
+    meta["sha256"] = file_sha256(source_file)
+    return meta
+
+
+def read_meta(build_path: Path) -> Optional[Dict[str, Any]]:
+    """Returns the metadata of a build or None if it cannot be read"""
+    try:
+        with open(build_path / "meta.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(build_path: Path, meta: Dict[str, Any]) -> None:
+    """Writes the metadata of a build"""
+    with open(build_path / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def is_build_valid(build_path: Path, source_file: str, version: int) -> bool:
+    """Checks if a build was made from the current source file.
+
+    The size and mtime of the source file are compared first. If only the
+    mtime changed (e.g. the file was copied or touched), the sha256 of the
+    file is compared instead and the stored mtime is refreshed when the
+    content is unchanged.
+
+    Parameters
+    ----------
+    build_path : Path
+        path to the build directory
+    source_file : str
+        path to the file the build was made from
+    version : int
+        expected version of the build format
+
+    Returns
+    -------
+    bool
+        True if the build can be used, False if it must be (re)built
+    """
+    meta = read_meta(build_path)
+    if meta is None or meta.get("version") != version:
+        return False
+
+    stats = source_stats(source_file)
+    if stats["size"] != meta["size"]:
+        return False
+    if stats["mtime_ns"] == meta["mtime_ns"]:
+        return True
+
+    if file_sha256(source_file) != meta["sha256"]:
+        return False
+
+    meta.update(stats)
+    write_meta(build_path, meta)
+    return True
+
+
+@contextmanager
+def atomic_build(build_path: Path) -> Iterator[Path]:
+    """Yields a temporary directory next to the build path. The directory is
+    moved in place of the build once the block completes, replacing a stale
+    build, and removed if the block raises.
+
+    Example
+    -------
+    >>> with atomic_build(Path("reads.gct.gz.cache")) as tmp_path:
+    ...     write_meta(tmp_path, {"version": 1})
+    """
+    tmp_path = build_path.with_name(f"{build_path.name}.tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    try:
+        yield tmp_path
+    except BaseException:
+        shutil.rmtree(tmp_path)
+        raise
+
+    if build_path.exists():
+        shutil.rmtree(build_path)
+    os.replace(tmp_path, build_path)
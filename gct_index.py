@@ -0,0 +1,325 @@
+"""
+gct_index module
+Developer: Erik Serrano
+
+Module contains a row index that gives random access to the gene rows of a
+compressed reads file (GCT). A gzip stream cannot be entered in the middle,
+so the reads file is re-compressed once into independent gzip members
+(blocks) of about `block_size` uncompressed bytes, in the spirit of BGZF.
+The re-blocked file is still a valid gzip file with the same content.
+
+Reading a gene then only decompresses the block that holds its row, so the
+time of a single gene query does not depend on where the gene sits in the
+file.
+
+Each row index is a directory that contains:
+
+* reads.gct.gz - re-blocked copy of the reads file
+* blocks.tsv - compressed offset and length of every block
+* rows.tsv - Name, Description, block and byte span of every gene row
+* header.tsv - column names of the reads file
+* meta.json - size, mtime and sha256 of the reads file the index was built
+  from
+
+* row_index_path_for - returns the row index directory used for a reads file
+* build_row_index - re-blocks a reads file and writes its row index
+* load_row_index - loads an existing row index
+"""
+import gzip
+import zlib
+from pathlib import Path
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+
+import numpy as np
+
+from file_meta import atomic_build
+from file_meta import read_meta
+from file_meta import source_fingerprint
+from file_meta import write_meta
+from gene_index import GeneIndex
+from gene_index import GeneRowsMixin
+
+INDEX_VERSION = 1
+DEFAULT_BLOCK_SIZE = 1 << 16
+
+
+class GCTRowIndex(GeneRowsMixin):
+    """Random access reader of the gene rows of a re-blocked reads file.
+    Genes are looked up with the gene row accessors of GeneRowsMixin.
+
+    Parameters
+    ----------
+    index_path : Path
+        path to the row index directory
+    header : list[str]
+        column names of the reads file
+    names : list[str]
+        Name (Ensembl ID) of each gene row
+    descriptions : list[str]
+        Description (gene symbol) of each gene row
+    row_spans : list[tuple[int, int, int]]
+        block and start, end byte offsets within the block of each gene row
+    blocks : list[tuple[int, int]]
+        compressed offset and length of each block
+    gene_index : GeneIndex, optional
+        index of the gene rows, built from the names and descriptions if not
+        provided
+    """
+
+    def __init__(
+        self,
+        index_path: Path,
+        header: List[str],
+        names: List[str],
+        descriptions: List[str],
+        row_spans: List[Tuple[int, int, int]],
+        blocks: List[Tuple[int, int]],
+        gene_index: Optional[GeneIndex] = None,
+    ):
+        self.index_path = index_path
+        self.header = header
+        self.names = names
+        self.descriptions = descriptions
+        self.row_spans = row_spans
+        self.blocks = blocks
+
+        if gene_index is None:
+            gene_index = GeneIndex(names, descriptions)
+        self.gene_index = gene_index
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def read_lines(self, row_idxs: Iterable[int]) -> List[bytes]:
+        """Returns the raw lines of the given rows. Every block is read and
+        decompressed once, even if it holds several of the rows.
+        """
+        block_data: Dict[int, bytes] = {}
+        lines = []
+        with open(self.index_path / "reads.gct.gz", "rb") as blocked_file:
+            for row_idx in row_idxs:
+                block_idx, start, end = self.row_spans[row_idx]
+                if block_idx not in block_data:
+                    offset, length = self.blocks[block_idx]
+                    blocked_file.seek(offset)
+                    block_data[block_idx] = zlib.decompress(
+                        blocked_file.read(length), wbits=31
+                    )
+                lines.append(block_data[block_idx][start:end])
+
+        return lines
+
+    def get_row(
+        self,
+        gene: str,
+        gene_col: Optional[str] = "Description",
+        ignore_case: bool = False,
+    ) -> List[str]:
+        """Returns the row entry of a gene as read from the reads file (Name,
+        Description followed by the counts). Only the block that holds the
+        row is decompressed.
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found in the gene column
+        """
+        row_idx = self.gene_row_idx(gene, gene_col, ignore_case)
+        line = self.read_lines([row_idx])[0]
+        return line.decode().rstrip("\r\n").split("\t")
+
+    def get_counts(
+        self,
+        gene: str,
+        gene_col: Optional[str] = "Description",
+        ignore_case: bool = False,
+    ) -> np.ndarray:
+        """Returns the read counts of a gene for all samples
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found or its counts are not integers
+        """
+        row = self.get_row(gene, gene_col, ignore_case)
+        return np.asarray(row[2:], dtype=np.int64)
+
+    def rows_counts(self, row_idxs: Iterable[int]) -> np.ndarray:
+        """Returns the read counts of the given rows, one row per row
+        position. Each block that holds one of the rows is decompressed once.
+
+        Raises
+        ------
+        ValueError
+            Raised if the counts are not integers
+        """
+        lines = self.read_lines(row_idxs)
+        return np.asarray(
+            [line.decode().rstrip("\r\n").split("\t")[2:] for line in lines],
+            dtype=np.int64,
+        )
+
+
+def row_index_path_for(reads_file: str, index_dir: str) -> Path:
+    """Returns the row index directory used for the given reads file"""
+    return Path(index_dir) / f"{Path(reads_file).name}.rowidx"
+
+
+def build_row_index(
+    index_path: Path,
+    reads_file: str,
+    block_size: Optional[int] = DEFAULT_BLOCK_SIZE,
+    compresslevel: Optional[int] = 6,
+) -> GCTRowIndex:
+    """Re-compresses a reads file into independent gzip blocks and records
+    the block and byte span of every gene row. The reads file is streamed, so
+    building the index holds one block in memory at a time.
+
+    The index is written with file_meta.atomic_build, a stale index in the
+    same location is replaced.
+
+    Parameters
+    ----------
+    index_path : Path
+        path to the row index directory
+    reads_file : str
+        path to reads file
+    block_size : int
+        uncompressed size after which a block is closed. Rows are never split
+        across blocks, so rows larger than the block size get a block of their
+        own
+    compresslevel : int
+        gzip compression level of the blocks
+
+    Returns
+    -------
+    GCTRowIndex
+        the newly built row index
+
+    Raises
+    ------
+    ValueError
+        Raised if the reads file has no header or a malformed row
+    """
+    meta = source_fingerprint(reads_file, INDEX_VERSION)
+
+    header = None
+    names = []
+    descriptions = []
+    with atomic_build(index_path) as tmp_path:
+        with gzip.open(reads_file, "rb") as reads, open(
+            tmp_path / "reads.gct.gz", "wb"
+        ) as blocked_file, open(tmp_path / "rows.tsv", "w") as rows_file, open(
+            tmp_path / "blocks.tsv", "w"
+        ) as blocks_file:
+            buffer = bytearray()
+            n_blocks = 0
+
+            for line_idx, line in enumerate(reads):
+                # first three lines are the version, dimensions and header
+                if line_idx == 2:
+                    header = line.decode().rstrip("\r\n").split("\t")
+                elif line_idx > 2:
+                    fields = line.split(b"\t", 2)
+                    if len(fields) < 3:
+                        msg = f"row {line_idx + 1} has no read counts"
+                        raise ValueError(msg)
+
+                    name = fields[0].decode()
+                    description = fields[1].decode()
+                    start = len(buffer)
+                    rows_file.write(
+                        f"{name}\t{description}\t{n_blocks}\t{start}\t"
+                        f"{start + len(line)}\n"
+                    )
+                    names.append(name)
+                    descriptions.append(description)
+
+                buffer += line
+                if len(buffer) >= block_size:
+                    _write_block(
+                        blocked_file, blocks_file, buffer, compresslevel
+                    )
+                    buffer = bytearray()
+                    n_blocks += 1
+
+            if len(buffer) > 0:
+                _write_block(blocked_file, blocks_file, buffer, compresslevel)
+
+        if header is None:
+            raise ValueError("reads file has no header")
+
+        with open(tmp_path / "header.tsv", "w") as header_file:
+            header_file.write("\t".join(header) + "\n")
+
+        meta["block_size"] = block_size
+        write_meta(tmp_path, meta)
+
+    return load_row_index(index_path)
+
+
+def _write_block(
+    blocked_file: BinaryIO,
+    blocks_file: TextIO,
+    buffer: bytearray,
+    compresslevel: int,
+) -> None:
+    """Appends one gzip member to the re-blocked file and records its offset
+    and length"""
+    offset = blocked_file.tell()
+    blocked_file.write(
+        gzip.compress(bytes(buffer), compresslevel=compresslevel, mtime=0)
+    )
+    blocks_file.write(f"{offset}\t{blocked_file.tell() - offset}\n")
+
+
+def load_row_index(index_path: Path) -> GCTRowIndex:
+    """Loads an existing row index. Only the index files are read, gene rows
+    are decompressed when they are accessed.
+
+    Parameters
+    ----------
+    index_path : Path
+        path to the row index directory
+
+    Returns
+    -------
+    GCTRowIndex
+        row index of the reads file
+
+    Raises
+    ------
+    FileNotFoundError
+        Raised if the row index does not exist
+    """
+    if read_meta(index_path) is None:
+        raise FileNotFoundError(f"No row index found in {index_path}")
+
+    with open(index_path / "header.tsv", "r") as header_file:
+        header = header_file.readline().rstrip("\n").split("\t")
+
+    blocks = []
+    with open(index_path / "blocks.tsv", "r") as blocks_file:
+        for line in blocks_file:
+            offset, length = line.split("\t")
+            blocks.append((int(offset), int(length)))
+
+    names = []
+    descriptions = []
+    row_spans = []
+    with open(index_path / "rows.tsv", "r") as rows_file:
+        for line in rows_file:
+            name, description, block_idx, start, end = line.split("\t")
+            names.append(name)
+            descriptions.append(description)
+            row_spans.append((int(block_idx), int(start), int(end)))
+
+    return GCTRowIndex(
+        index_path, header, names, descriptions, row_spans, blocks
+    )
@@ -0,0 +1,267 @@
+"""
+gene_index module
+Developer: Erik Serrano
+
+Module contains the gene index of a gene reads file. The index maps the Name
+(Ensembl ID, with or without its version suffix) and the Description (gene
+symbol) of every gene to its row position.
+
+* exact lookups are dictionary lookups, O(1)
+* case-insensitive lookups use a second dictionary of casefolded keys, O(1)
+* prefix lookups bisect the sorted casefolded keys, O(log n + matches)
+
+The index is built in memory from the Name and Description of the rows when
+a reads cache or row index is loaded (look at gtex_cache.py and gct_index.py).
+
+* strip_version - removes the version suffix of an Ensembl ID
+* GeneIndex - gene name to row position index
+* GeneRowsMixin - gene row lookups shared by the readers of a reads file
+"""
+from abc import ABC
+from abc import abstractmethod
+from array import array
+from bisect import bisect_left
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Iterable
+from typing import Optional
+from typing import TYPE_CHECKING
+
+from utils import PostingsIndex
+
+if TYPE_CHECKING:
+    import numpy as np
+
+GENE_COLS = ("Description", "Name")
+
+
+def strip_version(gene_id: str) -> str:
+    """Removes the version suffix of an Ensembl ID (ENSG00000223972.5 ->
+    ENSG00000223972). Other gene names are returned unchanged.
+    """
+    base, dot, version = gene_id.rpartition(".")
+    if dot == "" or base == "" or not version.isdigit():
+        return gene_id
+    return base
+
+
+class GeneIndex:
+    """Maps gene names and symbols to their row position. Duplicated names
+    point to their first row.
+
+    Parameters
+    ----------
+    names : iterable[str]
+        Name (Ensembl ID) of each gene row
+    descriptions : iterable[str]
+        Description (gene symbol) of each gene row
+    """
+
+    def __init__(
+        self,
+        names: Optional[Iterable[str]] = (),
+        descriptions: Optional[Iterable[str]] = (),
+    ):
+        self.exact = {gene_col: {} for gene_col in GENE_COLS}
+        self.folded = {gene_col: {} for gene_col in GENE_COLS}
+
+        for row_idx, (name, description) in enumerate(
+            zip(names, descriptions)
+        ):
+            self._add("Description", description, row_idx)
+            self._add("Name", name, row_idx)
+            self._add("Name", strip_version(name), row_idx)
+
+        self._sort_keys()
+
+    def _add(self, gene_col: str, gene: str, row_idx: int) -> None:
+        self.exact[gene_col].setdefault(gene, row_idx)
+        self.folded[gene_col].setdefault(gene.casefold(), row_idx)
+
+    def _sort_keys(self) -> None:
+        """Sorts the casefolded keys of every column for prefix lookups"""
+        self.sorted_keys = {}
+        self.sorted_rows = {}
+        for gene_col in GENE_COLS:
+            items = sorted(self.folded[gene_col].items())
+            self.sorted_keys[gene_col] = [key for key, _ in items]
+            self.sorted_rows[gene_col] = [row_idx for _, row_idx in items]
+
+    def __contains__(self, gene: str) -> bool:
+        try:
+            self.lookup(gene)
+        except ValueError:
+            return False
+        return True
+
+    def lookup(
+        self,
+        gene: str,
+        gene_col: Optional[str] = None,
+        ignore_case: Optional[bool] = False,
+    ) -> int:
+        """Returns the row position of a gene
+
+        Parameters
+        ----------
+        gene : str
+            gene symbol, or Ensembl ID with or without its version suffix
+        gene_col : str, optional
+            searches only the "Description" or "Name" column. Both columns
+            are searched if not provided, Description first
+        ignore_case : bool
+            falls back to a case-insensitive match if no exact match is found
+
+        Returns
+        -------
+        int
+            row position of the gene
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found
+        """
+        gene_cols = GENE_COLS if gene_col is None else (gene_col,)
+        for gene_col_name in gene_cols:
+            if gene_col_name not in self.exact:
+                raise ValueError(f"{gene_col_name} is not a gene column")
+
+        candidates = [(self.exact, gene)]
+        if ignore_case:
+            candidates.append((self.folded, gene.casefold()))
+
+        for keys, key in candidates:
+            for gene_col_name in gene_cols:
+                row_idx = keys[gene_col_name].get(key)
+                if row_idx is None and gene_col_name == "Name":
+                    row_idx = keys["Name"].get(strip_version(key))
+                if row_idx is not None:
+                    return row_idx
+
+        col_label = "gene" if gene_col is None else gene_col
+        raise ValueError(f"{gene} is not found in {col_label} column")
+
+    def find_prefix(
+        self,
+        prefix: str,
+        gene_col: Optional[str] = "Description",
+        limit: Optional[int] = None,
+    ) -> List[int]:
+        """Returns the rows of the genes starting with a prefix, ignoring
+        case, in alphabetical order
+
+        Parameters
+        ----------
+        prefix : str
+            start of the gene symbols or Ensembl IDs
+        gene_col : str
+            column searched, "Description" or "Name"
+        limit : int, optional
+            maximum number of rows returned
+
+        Returns
+        -------
+        list[int]
+            row positions of the matching genes, each row listed once
+        """
+        keys = self.sorted_keys[gene_col]
+        rows = self.sorted_rows[gene_col]
+        prefix = prefix.casefold()
+
+        matches = {}
+        pos = bisect_left(keys, prefix)
+        while pos < len(keys) and keys[pos].startswith(prefix):
+            matches.setdefault(rows[pos], None)
+            if limit is not None and len(matches) >= limit:
+                break
+            pos += 1
+
+        return list(matches)
+
+
+class GeneRowsMixin(ABC):
+    """Gene row lookups of the readers of a reads file (look at
+    reads_matrix.ReadsMatrix and gct_index.GCTRowIndex). The reader provides
+    the gene_index and descriptions of its rows, and reads the counts of
+    rows with rows_counts.
+    """
+
+    gene_index: GeneIndex
+    descriptions: List[str]
+    _symbol_rows: Optional[PostingsIndex] = None
+
+    @abstractmethod
+    def rows_counts(self, row_idxs: Iterable[int]) -> "np.ndarray":
+        """Returns the read counts of the given rows, one row per row
+        position"""
+
+    @property
+    def symbol_rows(self) -> PostingsIndex:
+        """Postings of the gene symbols, built on first use"""
+        if self._symbol_rows is None:
+            self._symbol_rows = PostingsIndex(self.descriptions)
+        return self._symbol_rows
+
+    def gene_row_idx(
+        self,
+        gene: str,
+        gene_col: Optional[str] = "Description",
+        ignore_case: bool = False,
+    ) -> int:
+        """Returns the row position of a gene. Both gene columns are searched
+        if gene_col is None (look at GeneIndex.lookup).
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found in the gene column
+        """
+        return self.gene_index.lookup(gene, gene_col, ignore_case)
+
+    def gene_row_idxs(
+        self,
+        gene: str,
+        gene_col: Optional[str] = None,
+        ignore_case: bool = False,
+    ) -> array:
+        """Returns the row positions of all rows of a gene, in file order. A
+        gene symbol (Description) can be shared by several rows with
+        different Ensembl IDs, while an Ensembl ID (Name) matches one row.
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found in the gene column
+        """
+        if gene_col in (None, "Description"):
+            try:
+                row_idx = self.gene_index.lookup(
+                    gene, "Description", ignore_case
+                )
+            except ValueError:
+                if gene_col is not None:
+                    raise
+            else:
+                return self.symbol_rows.find_all(self.descriptions[row_idx])
+
+        return array("I", [self.gene_index.lookup(gene, "Name", ignore_case)])
+
+    def get_all_counts(
+        self,
+        gene: str,
+        gene_col: Optional[str] = None,
+        ignore_case: bool = False,
+    ) -> "np.ndarray":
+        """Returns the read counts of all rows of a gene (look at
+        gene_row_idxs), one row per matching gene row
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found or its counts are not integers
+        """
+        return self.rows_counts(
+            self.gene_row_idxs(gene, gene_col, ignore_case)
+        )
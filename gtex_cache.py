@@ -0,0 +1,210 @@
+"""
+gtex_cache module
+Developer: Erik Serrano
+
+Module contains functions that converts a gene reads file (GCT) into a
+columnar binary cache on disk. Later runs memory-map the cache and only read
+the gene rows that are requested.
+
+Each cache is a directory that contains:
+
+* counts.u32 - raw uint32 count matrix (genes x samples) in row-major order
+* genes.tsv - Name and Description of each gene row
+* header.tsv - column names of the original reads file
+* meta.json - size, mtime and sha256 of the reads file the cache was built from
+
+* cache_path_for - returns the cache directory used for a reads file
+* is_cache_valid - checks if a cache still matches its reads file
+* build_reads_cache - writes a cache from streamed reads file rows
+* load_reads_cache - memory-maps an existing cache
+"""
+from pathlib import Path
+from typing import List
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from file_meta import atomic_build
+from file_meta import is_build_valid
+from file_meta import read_meta
+from file_meta import source_fingerprint
+from file_meta import write_meta
+from gene_index import GeneIndex
+from reads_matrix import COUNTS_DTYPE
+from reads_matrix import ReadsMatrix
+from reads_matrix import to_counts_row
+
+CACHE_VERSION = 2
+
+
+class ReadsCache(ReadsMatrix):
+    """Memory-mapped gene reads matrix along with its gene and sample indexes
+    (look at reads_matrix.ReadsMatrix for the accessors).
+
+    Parameters
+    ----------
+    cache_path : Path
+        path to the cache directory
+    header : list[str]
+        column names of the original reads file
+    names : list[str]
+        Name (Ensembl ID) of each gene row
+    descriptions : list[str]
+        Description (gene symbol) of each gene row
+    counts : np.ndarray
+        memory-mapped count matrix of shape (genes, samples)
+    gene_index : GeneIndex, optional
+        index of the gene rows, built from the names and descriptions if not
+        provided
+    """
+
+    def __init__(
+        self,
+        cache_path: Path,
+        header: List[str],
+        names: List[str],
+        descriptions: List[str],
+        counts: np.ndarray,
+        gene_index: Optional[GeneIndex] = None,
+    ):
+        super().__init__(header, names, descriptions, counts, gene_index)
+        self.cache_path = cache_path
+
+
+def cache_path_for(reads_file: str, cache_dir: str) -> Path:
+    """Returns the cache directory used for the given reads file"""
+    return Path(cache_dir) / f"{Path(reads_file).name}.cache"
+
+
+def is_cache_valid(
+    cache_path: Path, reads_file: str, version: Optional[int] = CACHE_VERSION
+) -> bool:
+    """Checks if the cache was built from the current reads file (look at
+    file_meta.is_build_valid)
+
+    Parameters
+    ----------
+    cache_path : Path
+        path to the cache directory
+    reads_file : str
+        path to reads file
+    version : int
+        expected version of the cache format
+
+    Returns
+    -------
+    bool
+        True if the cache can be used, False if it must be (re)built
+    """
+    return is_build_valid(cache_path, reads_file, version)
+
+
+def build_reads_cache(
+    cache_path: Path,
+    reads_file: str,
+    header: List[str],
+    rows: Iterable[Tuple[str, str, np.ndarray]],
+) -> ReadsCache:
+    """Writes the cache of a reads file. The rows are converted to uint32 and
+    appended to the count matrix one at a time, so building the cache never
+    holds more than one row in memory.
+
+    The cache is written with file_meta.atomic_build, a stale cache in the
+    same location is replaced.
+
+    Parameters
+    ----------
+    cache_path : Path
+        path to the cache directory
+    reads_file : str
+        path to the reads file the rows were read from
+    header : list[str]
+        column names of the reads file
+    rows : Iterable[tuple[str, str, np.ndarray]]
+        parsed row entries of the reads file (Name, Description and counts)
+
+    Returns
+    -------
+    ReadsCache
+        the newly built memory-mapped cache
+
+    Raises
+    ------
+    ValueError
+        Raised if a row does not have one count per sample, contains
+        non-integer counts or counts out of the uint32 range
+    """
+    n_samples = len(header) - 2
+    meta = source_fingerprint(reads_file, CACHE_VERSION)
+
+    names = []
+    descriptions = []
+    with atomic_build(cache_path) as tmp_path:
+        with open(tmp_path / "counts.u32", "wb") as counts_file, open(
+            tmp_path / "genes.tsv", "w"
+        ) as genes_file:
+            for name, description, counts in rows:
+                counts = to_counts_row(name, counts, n_samples)
+                counts_file.write(counts.tobytes())
+                genes_file.write(f"{name}\t{description}\n")
+                names.append(name)
+                descriptions.append(description)
+
+        with open(tmp_path / "header.tsv", "w") as header_file:
+            header_file.write("\t".join(header) + "\n")
+
+        meta["shape"] = [len(names), n_samples]
+        write_meta(tmp_path, meta)
+
+    return load_reads_cache(cache_path)
+
+
+def load_reads_cache(cache_path: Path) -> ReadsCache:
+    """Memory-maps an existing cache. Only the gene names and header are
+    read, the gene index is built from them in memory and the counts are
+    loaded from disk when rows are accessed.
+
+    Parameters
+    ----------
+    cache_path : Path
+        path to the cache directory
+
+    Returns
+    -------
+    ReadsCache
+        memory-mapped cache
+
+    Raises
+    ------
+    FileNotFoundError
+        Raised if the cache does not exist
+    """
+    meta = read_meta(cache_path)
+    if meta is None:
+        raise FileNotFoundError(f"No cache found in {cache_path}")
+
+    with open(cache_path / "header.tsv", "r") as header_file:
+        header = header_file.readline().rstrip("\n").split("\t")
+
+    names = []
+    descriptions = []
+    with open(cache_path / "genes.tsv", "r") as genes_file:
+        for line in genes_file:
+            name, description = line.rstrip("\n").split("\t")
+            names.append(name)
+            descriptions.append(description)
+
+    n_genes, n_samples = meta["shape"]
+    if n_genes == 0:
+        counts = np.zeros((0, n_samples), dtype=COUNTS_DTYPE)
+    else:
+        counts = np.memmap(
+            cache_path / "counts.u32",
+            dtype=COUNTS_DTYPE,
+            mode="r",
+            shape=(n_genes, n_samples),
+        )
+
+    return ReadsCache(cache_path, header, names, descriptions, counts)
@@ -0,0 +1,540 @@
+"""
+gtex_server module
+Developer: Erik Serrano
+
+Long running query server that keeps the gene reads and sample attributes in
+memory between requests, along with a small client. Both are reached through
+plot_gtex.py:
+
+    plot_gtex.py serve --gene_reads reads.gct.gz --sample_attributes attrs.txt
+    plot_gtex.py query --gene ACTA2 --output_file ACTA2.png
+
+Endpoints (HTTP GET, JSON responses):
+
+* /health - server status and dataset size
+* /genes?prefix=ACT&limit=20 - genes starting with a prefix (any case)
+* /counts?gene=ACTA2&group_by=SMTS&threshold=0 - per group read counts.
+  Groups are filtered on the mean unless `filter_stat` names another group
+  statistic, and `duplicate_genes=sum` sums the rows of a shared gene symbol
+  (look at plot_gtex.py --filter_stat and --duplicate_genes)
+* /plot?gene=ACTA2&output_file=ACTA2.png - renders a box plot on the server,
+  within the plot directory given at start (`--plot_dir`)
+
+* GTExDataset - gene reads and sample attributes indexed for repeated queries
+* make_server - creates the HTTP server of a dataset
+* query - sends a request to a running server
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from utils import FILTER_STATS
+from utils import filter_by_stat
+from plot_gtex import DUPLICATE_GENES
+from plot_gtex import load_cached_reads
+from plot_gtex import load_reads_matrix
+from plot_gtex import load_gene_counts
+from plot_gtex import collect_grouped_counts
+from plot_gtex import join_sample_columns
+from sample_index import load_sample_groups
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class GTExDataset:
+    """Gene reads and sample attributes loaded once and indexed for repeated
+    gene queries. Sample groups and their count positions are resolved once
+    per group column and reused by every query. Only the sample id and group
+    columns of the attributes file are parsed (look at sample_index.py).
+
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+    sample_file : str
+        path to sample attributes file
+    cache_dir : str, optional
+        directory of the binary reads cache (look at gtex_cache.py). The reads
+        are parsed into memory if not provided
+    workers : int
+        number of worker processes used to parse the reads file
+    """
+
+    def __init__(
+        self,
+        reads_file: str,
+        sample_file: str,
+        cache_dir: Optional[str] = None,
+        workers: Optional[int] = 1,
+    ):
+        self.reads_file = reads_file
+        self.sample_file = sample_file
+        with open(sample_file, "r") as f:
+            self.sample_header = f.readline().rstrip("\r\n").split("\t")
+
+        if cache_dir is not None:
+            self.reads = load_cached_reads(reads_file, cache_dir, workers)
+        else:
+            self.reads = load_reads_matrix(reads_file, workers)
+
+        self._group_count_idxs = {}
+        self._lock = threading.Lock()
+
+    def group_count_idxs(self, group_by: str) -> List[List[Any]]:
+        """Returns the groups of a sample attributes column and the count
+        positions of their members
+
+        Raises
+        ------
+        ValueError
+            Raised if the column is not found in the sample attributes file
+        """
+        with self._lock:
+            if group_by not in self._group_count_idxs:
+                if group_by not in self.sample_header:
+                    msg = f"{group_by} column is not found in attributes file"
+                    raise ValueError(msg)
+
+                sample_groups = load_sample_groups(
+                    self.sample_file, group_col=group_by
+                )
+                group_count_idxs, _ = join_sample_columns(
+                    sample_groups, self.reads.header
+                )
+                self._group_count_idxs[group_by] = group_count_idxs
+            return self._group_count_idxs[group_by]
+
+    def grouped_counts(
+        self,
+        gene: str,
+        group_by: Optional[str] = "SMTS",
+        threshold: Optional[float] = 0,
+        filter_stat: Optional[str] = "mean",
+        duplicate_genes: Optional[str] = "first",
+    ) -> Tuple[List[List[Any]], List[Dict[str, Any]]]:
+        """Returns the read counts of a gene per sample group along with the
+        group statistics. Groups whose filter statistic is below the
+        threshold are removed (look at utils.filter_by_stat).
+
+        Genes are matched by symbol or Ensembl ID, ignoring case, and the
+        rows of a shared gene symbol are summed with duplicate_genes set to
+        "sum" (look at plot_gtex.iter_gene_counts).
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene or the group column are not found
+        """
+        gene_counts = load_gene_counts(
+            self.reads_file, [gene], self.reads, duplicate_genes
+        )
+        if gene not in gene_counts:
+            raise ValueError(f"Unable to find {gene} gene in gene column")
+
+        grouped_read_counts = collect_grouped_counts(
+            gene_counts[gene], self.group_count_idxs(group_by)
+        )
+        return filter_by_stat(
+            grouped_read_counts, threshold=threshold, stat=filter_stat
+        )
+
+
+class GTExRequestHandler(BaseHTTPRequestHandler):
+    """Answers count and plot queries of the dataset attached to the server"""
+
+    # matplotlib is not thread safe, plots are rendered one at a time
+    render_lock = threading.Lock()
+
+    def send_json(self, status: int, content: Dict[str, Any]) -> None:
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        dataset = self.server.dataset
+
+        if url.path == "/health":
+            self.send_json(
+                200,
+                {
+                    "status": "ok",
+                    "n_genes": len(dataset.reads),
+                    "n_samples": len(dataset.reads.header) - 2,
+                },
+            )
+            return
+
+        if url.path == "/genes":
+            if "prefix" not in params:
+                self.send_json(400, {"error": "prefix parameter is required"})
+                return
+            try:
+                limit = int(params.get("limit", 50))
+            except ValueError:
+                self.send_json(400, {"error": "limit must be an integer"})
+                return
+            gene_col = params.get("gene_col", "Description")
+            if gene_col not in ("Description", "Name"):
+                self.send_json(400, {"error": f"Unknown gene_col {gene_col}"})
+                return
+            genes = [
+                {"name": name, "description": description}
+                for name, description in dataset.reads.find_genes(
+                    params["prefix"], gene_col, limit
+                )
+            ]
+            self.send_json(200, {"prefix": params["prefix"], "genes": genes})
+            return
+
+        if url.path not in ("/counts", "/plot"):
+            self.send_json(404, {"error": f"Unknown endpoint {url.path}"})
+            return
+        if "gene" not in params:
+            self.send_json(400, {"error": "gene parameter is required"})
+            return
+
+        gene = params["gene"]
+        group_by = params.get("group_by", "SMTS")
+        try:
+            threshold = float(params.get("threshold", 0))
+        except ValueError:
+            self.send_json(400, {"error": "threshold must be a number"})
+            return
+
+        filter_stat = params.get("filter_stat", "mean")
+        if filter_stat not in FILTER_STATS:
+            msg = f"filter_stat must be one of {', '.join(FILTER_STATS)}"
+            self.send_json(400, {"error": msg})
+            return
+        duplicate_genes = params.get("duplicate_genes", "first")
+        if duplicate_genes not in DUPLICATE_GENES:
+            choices = ", ".join(DUPLICATE_GENES)
+            msg = f"duplicate_genes must be one of {choices}"
+            self.send_json(400, {"error": msg})
+            return
+
+        if url.path == "/plot":
+            try:
+                fig_width = int(params.get("fig_width", 10))
+                fig_height = int(params.get("fig_height", 4))
+            except ValueError:
+                msg = "fig_width and fig_height must be integers"
+                self.send_json(400, {"error": msg})
+                return
+
+            # plots are only written within the plot directory of the server
+            plot_dir = self.server.plot_dir
+            output_file = params.get("output_file", f"{gene}.png")
+            output_path = (plot_dir / output_file).resolve()
+            if plot_dir not in output_path.parents:
+                msg = f"output_file must be within {plot_dir}"
+                self.send_json(400, {"error": msg})
+                return
+
+        try:
+            grouped_counts, group_stats = dataset.grouped_counts(
+                gene, group_by, threshold, filter_stat, duplicate_genes
+            )
+        except ValueError as e:
+            self.send_json(404, {"error": str(e)})
+            return
+
+        if url.path == "/counts":
+            groups = [
+                {"group": group_name, "counts": counts.tolist()}
+                for group_name, counts in grouped_counts
+            ]
+            self.send_json(200, {"gene": gene, "groups": groups})
+            return
+
+        # matplotlib is only imported once the first plot is requested
+        from viz_lib import make_box_plot
+
+        try:
+            with self.render_lock:
+                make_box_plot(
+                    data=grouped_counts,
+                    gene_name=gene,
+                    output_file=str(output_path),
+                    group_label=group_by,
+                    fig_width=fig_width,
+                    fig_height=fig_height,
+                    stats=group_stats,
+                )
+        except Exception as e:
+            e_type = e.__class__.__name__
+            msg = f"Unable to render plot ({e_type}: {e})"
+            self.send_json(500, {"error": msg})
+            return
+        self.send_json(200, {"gene": gene, "output_file": str(output_path)})
+
+
+def make_server(
+    dataset: GTExDataset,
+    host: Optional[str] = DEFAULT_HOST,
+    port: Optional[int] = DEFAULT_PORT,
+    quiet: Optional[bool] = False,
+    plot_dir: Optional[str] = None,
+) -> ThreadingHTTPServer:
+    """Creates the HTTP server answering queries of a loaded dataset. Use
+    port 0 to let the system pick a free port.
+
+    Plots are saved in plot_dir (the current working directory by default),
+    output files that resolve outside of it are rejected.
+    """
+    server = ThreadingHTTPServer((host, port), GTExRequestHandler)
+    server.dataset = dataset
+    server.quiet = quiet
+    server.plot_dir = Path(plot_dir or os.getcwd()).resolve()
+    server.plot_dir.mkdir(parents=True, exist_ok=True)
+    return server
+
+
+def query(
+    endpoint: str,
+    params: Dict[str, Any],
+    host: Optional[str] = DEFAULT_HOST,
+    port: Optional[int] = DEFAULT_PORT,
+    timeout: Optional[float] = 600,
+) -> Dict[str, Any]:
+    """Sends a query to a running server and returns the JSON response
+
+    Raises
+    ------
+    ValueError
+        Raised if the server could not answer the query
+    ConnectionError
+        Raised if the server cannot be reached
+    """
+    query_string = urllib.parse.urlencode(params)
+    url = f"http://{host}:{port}/{endpoint}?{query_string}"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise ValueError(json.load(e)["error"])
+    except urllib.error.URLError as e:
+        raise ConnectionError(f"Unable to reach {host}:{port} ({e.reason})")
+
+
+def serve_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="plot_gtex.py serve",
+        description="Keeps the GTEx data in memory and answers queries",
+    )
+    parser.add_argument(
+        "-gr",
+        "--gene_reads",
+        type=str,
+        dest="gene_reads",
+        required=True,
+        help="compressed file that contains gene reads",
+    )
+    parser.add_argument(
+        "-s",
+        "--sample_attributes",
+        type=str,
+        dest="sample_attributes",
+        required=True,
+        help="file that contains meta data information of samples",
+    )
+    parser.add_argument(
+        "-cd",
+        "--cache_dir",
+        type=str,
+        dest="cache_dir",
+        default=None,
+        help="Directory where a binary cache of the gene reads is kept",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        dest="workers",
+        default=1,
+        help="Number of processes used to parse the gene reads file",
+    )
+    parser.add_argument(
+        "-pd",
+        "--plot_dir",
+        type=str,
+        dest="plot_dir",
+        default=".",
+        help="Directory where plots requested by clients are saved",
+    )
+    parser.add_argument(
+        "--host", type=str, dest="host", default=DEFAULT_HOST, help="host"
+    )
+    parser.add_argument(
+        "--port", type=int, dest="port", default=DEFAULT_PORT, help="port"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        dataset = GTExDataset(
+            args.gene_reads,
+            args.sample_attributes,
+            cache_dir=args.cache_dir,
+            workers=args.workers,
+        )
+    except (OSError, ValueError) as e:
+        e_type = e.__class__.__name__
+        print(f"{e_type}: Unable to load dataset, {e}")
+        sys.exit(1)
+
+    server = make_server(
+        dataset, args.host, args.port, plot_dir=args.plot_dir
+    )
+    print(f"MESSAGE: serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+
+def query_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="plot_gtex.py query",
+        description="Queries a running plot_gtex server",
+    )
+    gene_group = parser.add_mutually_exclusive_group(required=True)
+    gene_group.add_argument(
+        "-g",
+        "--gene",
+        type=str,
+        dest="gene",
+        help="gene of interest (symbol or Ensembl ID, any case)",
+    )
+    gene_group.add_argument(
+        "-pf",
+        "--prefix",
+        type=str,
+        dest="prefix",
+        help="lists the genes starting with a prefix",
+    )
+    parser.add_argument(
+        "-o",
+        "--output_file",
+        type=str,
+        dest="output",
+        default=None,
+        help="Name of generated output plot, saved in the plot directory of "
+        "the server. Counts are printed as JSON if not provided",
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=int,
+        dest="threshold",
+        default=0,
+        help="Groups whose filter statistic (-fs) is below the threshold are "
+        "removed",
+    )
+    parser.add_argument(
+        "-fs",
+        "--filter_stat",
+        type=str,
+        dest="filter_stat",
+        choices=FILTER_STATS,
+        default="mean",
+        help="Group statistic compared to the threshold. Default is mean",
+    )
+    parser.add_argument(
+        "-dg",
+        "--duplicate_genes",
+        type=str,
+        dest="duplicate_genes",
+        choices=DUPLICATE_GENES,
+        default="first",
+        help="Handling of gene symbols shared by several rows of the reads "
+        "file: first uses the first row, sum sums the counts of all rows",
+    )
+    parser.add_argument(
+        "-gb",
+        "--group_by",
+        type=str,
+        dest="group_by",
+        default="SMTS",
+        help="Sample attributes column used to group samples (default=SMTS)",
+    )
+    parser.add_argument(
+        "-wt", "--fig_width", type=int, dest="fig_width", default=10
+    )
+    parser.add_argument(
+        "-ht", "--fig_height", type=int, dest="fig_height", default=4
+    )
+    parser.add_argument(
+        "--host", type=str, dest="host", default=DEFAULT_HOST, help="host"
+    )
+    parser.add_argument(
+        "--port", type=int, dest="port", default=DEFAULT_PORT, help="port"
+    )
+    args = parser.parse_args(argv)
+
+    if args.prefix is not None:
+        try:
+            response = query(
+                "genes", {"prefix": args.prefix}, args.host, args.port
+            )
+        except (ValueError, ConnectionError) as e:
+            e_type = e.__class__.__name__
+            print(f"{e_type}: {e}")
+            sys.exit(1)
+
+        for gene in response["genes"]:
+            print(f"{gene['description']}\t{gene['name']}")
+        sys.exit(0)
+
+    params = {
+        "gene": args.gene,
+        "group_by": args.group_by,
+        "threshold": args.threshold,
+        "filter_stat": args.filter_stat,
+        "duplicate_genes": args.duplicate_genes,
+    }
+    endpoint = "counts"
+    if args.output is not None:
+        endpoint = "plot"
+        params["output_file"] = args.output
+        params["fig_width"] = args.fig_width
+        params["fig_height"] = args.fig_height
+
+    try:
+        response = query(endpoint, params, args.host, args.port)
+    except (ValueError, ConnectionError) as e:
+        e_type = e.__class__.__name__
+        print(f"{e_type}: {e}")
+        sys.exit(1)
+
+    if endpoint == "plot":
+        print(f"MESSAGE: plot saved in: {response['output_file']}")
+    else:
+        print(json.dumps(response))
+    sys.exit(0)
@@ -0,0 +1,269 @@
+"""
+pipeline module
+Developer: Erik Serrano
+
+Module contains the asyncio pipeline of plot_gtex (`--pipeline`). The stages
+of a run overlap instead of running one after the other:
+
+* the sample attributes are parsed while the gene reads file is decompressed
+* each gene is filtered and exported as soon as its row is streamed in
+* finished genes are rendered while later rows are still being streamed
+
+Stages are connected by a bounded queue, so a slow stage holds back the
+stages before it instead of piling up gene counts in memory. The run then
+takes about as long as its slowest stage rather than the sum of all stages.
+
+With a profiler, every stage is recorded as it runs (look at profiling.py).
+Streaming only counts the time spent reading the reads file, not the time
+spent waiting for the queue, and rendering counts the time from sending a
+plot to the renderers until it is saved.
+
+* run_pipeline - runs plot_gtex with overlapping stages
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import threading
+from concurrent import futures
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from plot_gtex import iter_gene_counts
+from plot_gtex import load_run_reads
+from plot_gtex import load_run_samples
+from plot_gtex import join_run_samples
+from plot_gtex import open_run_export
+from plot_gtex import filter_gene_groups
+from plot_gtex import make_plot_job
+from plot_gtex import report_plot_results
+from profiling import NULL_PROFILER
+
+# marks the end of the streamed gene counts
+_END = None
+
+
+def _stream_gene_counts(
+    loop: asyncio.AbstractEventLoop,
+    queue: asyncio.Queue,
+    stop: threading.Event,
+    reads_file: str,
+    genes: List[str],
+    reads_cache: Optional[Any],
+    duplicate_genes: str,
+    profiler: Optional[Any] = NULL_PROFILER,
+) -> None:
+    """Puts the counts of every found gene on the queue, runs in a thread.
+    Waits whenever the queue is full, until the pipeline is stopped."""
+
+    def put(item: Optional[Tuple[str, np.ndarray]]) -> None:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not stop.is_set():
+            try:
+                return future.result(timeout=0.1)
+            except futures.TimeoutError:
+                continue
+        future.cancel()
+        raise RuntimeError("pipeline stopped")
+
+    gene_counts = iter_gene_counts(
+        reads_file, genes, reads_cache, duplicate_genes, profiler
+    )
+    try:
+        while True:
+            with profiler.stage("stream_gene_counts"):
+                item = next(gene_counts, _END)
+            if item is _END:
+                break
+            put(item)
+    finally:
+        put(_END)
+
+
+def _load_samples(
+    args: argparse.Namespace, profiler: Optional[Any] = NULL_PROFILER
+) -> List[Tuple[str, str]]:
+    """Loads the sample groups, runs in a thread"""
+    with profiler.stage("load_samples"):
+        return load_run_samples(args)
+
+
+def _render_executor(workers: int) -> Executor:
+    """Returns the executor that renders plots. Worker processes are started
+    right away, before the pipeline starts any thread."""
+    if workers <= 1:
+        return ThreadPoolExecutor(max_workers=1)
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    executor.submit(os.getpid).result()
+    return executor
+
+
+async def _run_pipeline(
+    args: argparse.Namespace,
+    genes: List[str],
+    render_executor: Executor,
+    profiler: Optional[Any] = NULL_PROFILER,
+) -> List[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+
+    # the reads cache or row index is opened first, as building it may start
+    # its own worker processes
+    reads_cache, reads_header = load_run_reads(args, profiler)
+
+    # gene rows are streamed while the sample attributes are parsed
+    queue = asyncio.Queue(maxsize=2 * args.workers)
+    stop = threading.Event()
+    stream_task = asyncio.create_task(
+        asyncio.to_thread(
+            _stream_gene_counts,
+            loop,
+            queue,
+            stop,
+            args.gene_reads,
+            genes,
+            reads_cache,
+            args.duplicate_genes,
+            profiler,
+        )
+    )
+    try:
+        return await _consume_gene_counts(
+            args,
+            genes,
+            queue,
+            stream_task,
+            reads_header,
+            render_executor,
+            profiler,
+        )
+    finally:
+        stop.set()
+
+
+async def _consume_gene_counts(
+    args: argparse.Namespace,
+    genes: List[str],
+    queue: asyncio.Queue,
+    stream_task: asyncio.Task,
+    reads_header: List[str],
+    render_executor: Executor,
+    profiler: Optional[Any] = NULL_PROFILER,
+) -> List[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    sample_groups = await asyncio.to_thread(_load_samples, args, profiler)
+
+    with profiler.stage("join_samples"):
+        group_count_idxs = join_run_samples(sample_groups, reads_header)
+    writer, export_file, group_samples = open_run_export(
+        args, reads_header, group_count_idxs
+    )
+
+    render_job = None
+    if not args.no_plot:
+        # -- matplotlib is only imported once plots are rendered
+        from viz_lib import _render_job as render_job
+
+    # genes are filtered, exported and sent to rendering as they arrive,
+    # at most two renders per worker are queued at once
+    render_slots = asyncio.Semaphore(2 * args.workers)
+    render_tasks = {}
+
+    async def render(job: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            with profiler.stage("render"):
+                return await loop.run_in_executor(
+                    render_executor, render_job, job
+                )
+        finally:
+            render_slots.release()
+
+    found_genes = set()
+    while True:
+        item = await queue.get()
+        if item is _END:
+            break
+
+        gene, counts = item
+        found_genes.add(gene)
+        grouped_counts, group_stats = filter_gene_groups(
+            counts,
+            group_count_idxs,
+            args.threshold,
+            profiler,
+            filter_stat=args.filter_stat,
+        )
+        if writer is not None:
+            with profiler.stage("export"):
+                writer.write_gene(
+                    gene, grouped_counts, group_samples, group_stats
+                )
+
+        if render_job is not None:
+            await render_slots.acquire()
+            job = make_plot_job(
+                args, gene, grouped_counts, len(genes), group_stats
+            )
+            render_tasks[gene] = asyncio.create_task(render(job))
+
+    await stream_task
+
+    for gene in genes:
+        if gene not in found_genes:
+            e_msg = f"Unable to find {gene} gene in gene column"
+            print(f"ValueError: {e_msg}")
+    if len(found_genes) == 0:
+        sys.exit(1)
+
+    if writer is not None:
+        with profiler.stage("export"):
+            writer.close()
+        print(f"MESSAGE: counts exported in: {export_file}")
+
+    return [await render_tasks[gene] for gene in genes if gene in render_tasks]
+
+
+def run_pipeline(
+    args: argparse.Namespace,
+    genes: List[str],
+    profiler: Optional[Any] = NULL_PROFILER,
+) -> List[Dict[str, Any]]:
+    """Generates the box plots of the genes of interest with overlapping
+    stages. Produces the same plots, exports and messages as plot_gtex.run.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        parsed arguments (look at plot_gtex.parse_args)
+    genes : list[str]
+        genes of interest
+    profiler : StageProfiler, optional
+        profiler that records every stage of the pipeline. Nothing is
+        recorded by default.
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        plot result of every gene in the order of the genes of interest
+        (look at viz_lib.render_box_plots). Empty if plots are skipped with
+        no_plot
+    """
+    render_executor = _render_executor(args.workers)
+    try:
+        plot_results = asyncio.run(
+            _run_pipeline(args, genes, render_executor, profiler)
+        )
+    finally:
+        render_executor.shutdown()
+
+    report_plot_results(plot_results)
+    return plot_results
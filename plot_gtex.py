@@ -7,6 +7,9 @@ to generate boxplot.
 
 The generated boxplot contains the counts of your gene of interests across all
 tissue samples.
+
+NumPy, the reads caches and the process pools are imported by the functions
+that use them, so `--help` and runs that do not need them start faster.
 """
 
 import sys
@@ -14,11 +17,36 @@ import gzip
 import argparse
 from typing import List
 from typing import Any
+from typing import Optional
+from typing import Iterable
+from typing import Iterator
+from typing import TextIO
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import TYPE_CHECKING
+from pathlib import Path
+from itertools import islice
+from collections import deque
+
 from utils import linear_search
-from utils import binary_search
-from utils import index_list
-from utils import filter_by_mean
-from viz_lib import make_box_plot
+from utils import group_by
+from utils import FILTER_STATS
+from utils import filter_by_stat
+from gene_index import strip_version
+from profiling import NULL_PROFILER
+from profiling import StageProfiler
+from export_lib import FORMATS
+from export_lib import open_writer
+
+if TYPE_CHECKING:
+    import numpy as np
+    from gtex_cache import ReadsCache
+    from reads_matrix import ReadsMatrix
+    from gct_index import GCTRowIndex
+
+# handling of gene symbols shared by several rows (look at iter_gene_counts)
+DUPLICATE_GENES = ("first", "sum")
 
 
 def load_samples(sample_file: str) -> List[Any]:
@@ -74,6 +102,216 @@ def load_samples(sample_file: str) -> List[Any]:
     return [header, samples]
 
 
+def _read_gct_header(reads: TextIO) -> List[str]:
+    """Reads the three GCT header lines (version, dimensions and column names)
+    of an opened reads file and returns the column names.
+    """
+    reads.readline()
+    reads.readline()
+    return reads.readline().rstrip().split("\t")
+
+
+def _iter_gct_rows(
+    reads: TextIO,
+    gene_col_idx: Optional[int] = None,
+    genes: Optional[Iterable[str]] = None,
+) -> Iterator[List[str]]:
+    """Yields the row entries of an opened reads file positioned after the
+    header. If genes are provided, only the gene field is split off of each
+    line and the rest of the line is only split when the gene matches. The
+    iteration stops as soon as all requested genes are found.
+    """
+    if genes is None:
+        for row in reads:
+            yield row.rstrip().split("\t")
+        return
+
+    remaining = set(genes)
+    if len(remaining) == 0:
+        return
+
+    for row in reads:
+        fields = row.split("\t", gene_col_idx + 1)
+        if fields[gene_col_idx] not in remaining:
+            continue
+
+        remaining.discard(fields[gene_col_idx])
+        yield fields[:-1] + fields[-1].rstrip().split("\t")
+
+        if len(remaining) == 0:
+            return
+
+
+def load_reads_header(reads_file: str) -> List[str]:
+    """Loads the column names of the gene reads file without reading any of
+    the gene read entries.
+
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+
+    Returns
+    -------
+    list[str]
+        column names of the reads file
+
+    Raises
+    ------
+    ValueError
+        Raised if a non-compressed file is provided
+    FileNotFoundError
+        Raised if the the path provided does not point to file
+    PermissionError
+        Raised if you do not have read permissions
+    """
+    try:
+        with gzip.open(reads_file, "rt") as reads:
+            return _read_gct_header(reads)
+    except FileNotFoundError as e:
+        e_type = e.__class__.__name__
+        e_msg = f"Unable to find: {reads_file}"
+        print(f"{e_type}: {e_msg}")
+        sys.exit(1)
+    except PermissionError as e:
+        e_type = e.__class__.__name__
+        e_msg = f"Unable to open: {reads_file}"
+        print(f"{e_type}: {e_msg}")
+        sys.exit(1)
+    except (ValueError, OSError) as e:
+        e_type = e.__class__.__name__
+        e_msg = "File provided is not a compressed file"
+        print(f"{e_type}: {e_msg}")
+        sys.exit(1)
+
+
+def iter_reads(
+    reads_file: str,
+    genes: Optional[Iterable[str]] = None,
+    gene_col: Optional[str] = "Description",
+) -> Iterator[List[str]]:
+    """Lazily yields gene read entries from the reads file. Only one row is
+    held in memory at a time.
+
+    If genes are provided, only the rows whose gene column matches one of the
+    genes are yielded. The gene field is checked before the rest of the row is
+    split and the file is no longer read once all genes have been found.
+
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+    genes : Iterable[str], optional
+        genes of interest. All rows are yielded if not provided
+    gene_col : str
+        name of the column that contains the gene names (Name or Description)
+
+    Yields
+    ------
+    list[str]
+        row entry of the reads file
+
+    Raises
+    ------
+    ValueError
+        Raised if the gene column is not found in the reads header
+    """
+    header = load_reads_header(reads_file)
+
+    gene_col_idx = None
+    if genes is not None:
+        gene_col_idx = linear_search(target=gene_col, sel_array=header)
+
+    with gzip.open(reads_file, "rt") as reads:
+        _read_gct_header(reads)
+        yield from _iter_gct_rows(reads, gene_col_idx, genes)
+
+
+def parse_reads_line(row_entry: str) -> Tuple[str, str, "np.ndarray"]:
+    """Splits a row of the reads file into its Name, Description and integer
+    read counts.
+
+    Parameters
+    ----------
+    row_entry : str
+        unsplit row of the reads file
+
+    Returns
+    -------
+    tuple[str, str, np.ndarray]
+        Name, Description and read counts of the row
+
+    Raises
+    ------
+    ValueError
+        Raised if the row contains non-integer counts
+    """
+    import numpy as np
+
+    name, description, counts = row_entry.rstrip().split("\t", 2)
+    return name, description, np.asarray(counts.split("\t"), dtype=np.int64)
+
+
+def _parse_reads_block(
+    row_entries: List[str],
+) -> List[Tuple[str, str, "np.ndarray"]]:
+    """Parses a block of rows, runs inside the worker processes"""
+    return [parse_reads_line(row_entry) for row_entry in row_entries]
+
+
+def iter_parsed_reads(
+    reads_file: str,
+    workers: Optional[int] = 1,
+    block_size: Optional[int] = 64,
+) -> Iterator[Tuple[str, str, "np.ndarray"]]:
+    """Yields the parsed rows of the reads file in file order.
+
+    With more than one worker, the calling thread only decompresses the file
+    and hands blocks of raw rows to a process pool that splits them and
+    converts the counts to integers. At most two blocks per worker are in
+    flight, so memory stays bounded by the block size.
+
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+    workers : int
+        number of worker processes used for parsing
+    block_size : int
+        number of rows sent to a worker at a time
+
+    Yields
+    ------
+    tuple[str, str, np.ndarray]
+        Name, Description and read counts of each row
+    """
+    load_reads_header(reads_file)
+
+    with gzip.open(reads_file, "rt") as reads:
+        _read_gct_header(reads)
+
+        if workers <= 1:
+            for row_entry in reads:
+                yield parse_reads_line(row_entry)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            while True:
+                block = list(islice(reads, block_size))
+                if len(block) == 0:
+                    break
+
+                pending.append(executor.submit(_parse_reads_block, block))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+
+            while len(pending) > 0:
+                yield from pending.popleft().result()
+
+
 def load_reads(reads_file: str) -> List[List[str]]:
     """Loads in gene reads
 
@@ -87,7 +325,8 @@ def load_reads(reads_file: str) -> List[List[str]]:
     list[list[str]]
         Returns a list of two nested lists. The first list contains a list of
         column names and the second list is a list of lists containing gene
-        read data.
+        read data. Counts are kept as strings, use load_reads_matrix to hold
+        the whole file as integers.
 
     Raises
     ------
@@ -105,18 +344,8 @@ def load_reads(reads_file: str) -> List[List[str]]:
     entries = []
     try:
         with gzip.open(reads_file, "rt") as reads:
-            for idx, row in enumerate(reads):
-
-                # skipping first two lines
-                if idx <= 1:
-                    continue
-                # getting header row
-                elif idx == 2:
-                    header = row.rstrip().split("\t")
-                    header_array = header
-                else:
-                    entry_list = row.rstrip().split("\t")
-                    entries.append(entry_list)
+            header_array = _read_gct_header(reads)
+            entries = list(_iter_gct_rows(reads))
 
     except ValueError as e:
         e_type = e.__class__.__name__
@@ -138,10 +367,91 @@ def load_reads(reads_file: str) -> List[List[str]]:
     return [header_array, entries]
 
 
+def load_reads_matrix(reads_file: str, workers: int = 1) -> "ReadsMatrix":
+    """Loads the whole reads file into an in-memory uint32 count matrix. Each
+    count is converted to an integer once, while the file is parsed.
+
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+    workers : int
+        number of worker processes used to parse the reads file
+
+    Returns
+    -------
+    ReadsMatrix
+        gene reads matrix
+
+    Raises
+    ------
+    ValueError
+        Raised if the reads file contains malformed or non-integer counts
+    """
+    from reads_matrix import ReadsMatrix
+
+    header = load_reads_header(reads_file)
+    return ReadsMatrix.from_rows(
+        header, iter_parsed_reads(reads_file, workers=workers)
+    )
+
+
+def load_cached_reads(
+    reads_file: str, cache_dir: str, workers: Optional[int] = 1
+) -> "ReadsCache":
+    """Loads the binary cache of a reads file. The cache is built on the first
+    run and rebuilt automatically when the reads file changes.
+
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+    cache_dir : str
+        directory where caches are stored
+    workers : int
+        number of worker processes used to parse the reads file when the
+        cache is built
+
+    Returns
+    -------
+    ReadsCache
+        memory-mapped gene reads cache
+
+    Raises
+    ------
+    ValueError
+        Raised if the reads file contains malformed or non-integer counts
+    """
+    from gtex_cache import cache_path_for
+    from gtex_cache import is_cache_valid
+    from gtex_cache import build_reads_cache
+    from gtex_cache import load_reads_cache
+
+    cache_path = cache_path_for(reads_file, cache_dir)
+
+    header = load_reads_header(reads_file)
+    if is_cache_valid(cache_path, reads_file):
+        return load_reads_cache(cache_path)
+
+    print(f"MESSAGE: building reads cache in: {str(cache_path)}")
+    try:
+        return build_reads_cache(
+            cache_path,
+            reads_file,
+            header,
+            iter_parsed_reads(reads_file, workers=workers),
+        )
+    except ValueError as e:
+        e_type = e.__class__.__name__
+        print(f"{e_type}: Unable to cache reads file, {e}")
+        sys.exit(1)
+
+
 def group_samples_by_tissues(
     samples: List[List[str]], sample_id_col_idx: int, group_col_idx: int
 ) -> List[List[str]]:
-    """Groups sample ids to their appropriate sample group.
+    """Groups sample ids to their appropriate sample group. Any column of the
+    sample file can be used as the group column (e.g SMTS, SMTSD, SMCENTER).
 
     Parameters
     ----------
@@ -162,43 +472,441 @@ def group_samples_by_tissues(
         and the second list is the samples associated with a group.
 
     """
+    grouped_samples = group_by(
+        samples, key_col_idx=group_col_idx, value_col_idx=sample_id_col_idx
+    )
+    return [tuple(group) for group in grouped_samples]
 
-    # initializing group and member lists
-    sample_groups = []
-    group_members = []
 
-    # iterate all samples and group them based on tissue group
-    for row_idx, sample_entry in enumerate(samples):
+def load_indexed_reads(reads_file: str, index_dir: str) -> "GCTRowIndex":
+    """Loads the row index of a reads file, which decompresses only the rows
+    that are requested (look at gct_index.py). The index is built on the
+    first run and rebuilt automatically when the reads file changes.
 
-        # selecting data from sample entry
-        sample_name = sample_entry[sample_id_col_idx]
-        current_group = sample_entry[group_col_idx]
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+    index_dir : str
+        directory where row indexes are stored
 
-        # searching if the current group is in the groups array
-        try:
-            current_group_idx = linear_search(current_group, sample_groups)
+    Returns
+    -------
+    GCTRowIndex
+        row index of the reads file
+    """
+    from file_meta import is_build_valid
+    from gct_index import INDEX_VERSION
+    from gct_index import row_index_path_for
+    from gct_index import build_row_index
+    from gct_index import load_row_index
 
-        # if the value is not found, start tracking
-        except ValueError:
-            current_group_idx = len(sample_groups)
-            sample_groups.append(current_group)
-            group_members.append([])
+    index_path = row_index_path_for(reads_file, index_dir)
 
-        # if list is empty, start tracking
-        except RuntimeError as e:
-            current_group_idx = len(sample_groups)
-            sample_groups.append(current_group)
-            group_members.append([])
+    # exits with a message if the reads file cannot be read
+    load_reads_header(reads_file)
+    if is_build_valid(index_path, reads_file, INDEX_VERSION):
+        return load_row_index(index_path)
+
+    print(f"MESSAGE: building reads row index in: {str(index_path)}")
+    try:
+        return build_row_index(index_path, reads_file)
+    except ValueError as e:
+        e_type = e.__class__.__name__
+        print(f"{e_type}: Unable to index reads file, {e}")
+        sys.exit(1)
+
+
+def load_gene_list(genes_file: str) -> List[str]:
+    """Reads a file that contains one gene per line. Empty lines and lines
+    starting with `#` are skipped.
+
+    Parameters
+    ----------
+    genes_file : str
+        path to genes file
+
+    Returns
+    -------
+    list[str]
+        genes in the order they appear in the file
+    """
+    try:
+        with open(genes_file, "r") as datafile:
+            genes = [line.strip() for line in datafile]
+    except FileNotFoundError as e:
+        e_type = e.__class__.__name__
+        e_msg = f"Unable to find: {genes_file}"
+        print(f"{e_type}: {e_msg}")
+        sys.exit(1)
+
+    return [gene for gene in genes if gene != "" and not gene.startswith("#")]
+
+
+def _gene_match_keys(
+    genes: Iterable[str], by_symbol: bool
+) -> List[Tuple[str, bool, Dict[str, List[str]]]]:
+    """Returns the match keys of the genes of interest in the lookup order of
+    the gene index (look at gene_index.GeneIndex.lookup): exact matches
+    before case-insensitive ones, and Names as given before Names without
+    their version suffix. Each entry holds the gene column, whether the keys
+    are casefolded and the keys mapped to their requested genes.
+
+    With by_symbol, both symbol (Description) matches come before the Name
+    matches, as in ReadsMatrix.gene_row_idxs.
+    """
+    ranked_cols = [
+        ("Description", False, False),
+        ("Name", False, False),
+        ("Name", False, True),
+        ("Description", True, False),
+        ("Name", True, False),
+        ("Name", True, True),
+    ]
+    if by_symbol:
+        ranked_cols = [ranked_cols[idx] for idx in (0, 3, 1, 2, 4, 5)]
+
+    match_keys = []
+    for gene_col, folded, stripped in ranked_cols:
+        keys = {}
+        for gene in genes:
+            key = gene.casefold() if folded else gene
+            if stripped:
+                key = strip_version(key)
+            keys.setdefault(key, []).append(gene)
+        match_keys.append((gene_col, folded, keys))
+    return match_keys
+
+
+def _parse_counts(row_counts: str) -> "np.ndarray":
+    """Converts the tab separated counts of a row to integers"""
+    import numpy as np
+
+    return np.asarray(row_counts.rstrip().split("\t"), dtype=np.int64)
+
+
+def _iter_read_blocks(
+    reads_file: str,
+    profiler: Optional[Any] = NULL_PROFILER,
+    block_size: int = 1 << 20,
+) -> Iterator[List[str]]:
+    """Yields the rows of the reads file (after its header) in blocks of
+    about block_size characters. Reading a block (decompression) is recorded
+    as the "decompress" stage of the profiler.
+    """
+    with gzip.open(reads_file, "rt") as reads:
+        _read_gct_header(reads)
+        while True:
+            with profiler.stage("decompress"):
+                rows = reads.readlines(block_size)
+            if len(rows) == 0:
+                return
+            yield rows
+
+
+def _iter_streamed_gene_counts(
+    reads_file: str,
+    genes: List[str],
+    sum_rows: bool,
+    profiler: Optional[Any] = NULL_PROFILER,
+) -> Iterator[Tuple[str, "np.ndarray"]]:
+    """Yields the read counts of the genes of interest with one streaming
+    pass over the reads file. Genes are matched like the gene index of a
+    cache: by symbol or Ensembl ID (with or without version), exact matches
+    first, then ignoring case. Counts are yielded under the requested gene.
+
+    Without sum_rows, a gene is yielded as soon as the block holding its
+    exact symbol is parsed and the file is no longer read once every gene was
+    yielded. Other matches may still be outranked further down, they are
+    yielded at the end of the file.
+
+    Decompression and parsing of the rows are recorded as the "decompress"
+    and "parse_counts" stages of the profiler.
+    """
+    genes = list(dict.fromkeys(genes))
+    if len(genes) == 0:
+        return
+    match_keys = _gene_match_keys(genes, by_symbol=sum_rows)
+
+    # best (rank, symbol or counts) of every gene, lower ranks win and the
+    # first row of a rank is kept
+    best_matches = {}
+    symbol_counts = {}
+    remaining = len(genes)
+
+    load_reads_header(reads_file)
+    for rows in _iter_read_blocks(reads_file, profiler):
+        # genes are yielded after the block, outside of the parsing stage
+        found = []
+        with profiler.stage("parse_counts"):
+            for row in rows:
+                fields = row.split("\t", 2)
+                if len(fields) < 3:
+                    # blank or truncated rows hold no counts
+                    continue
+                name, description, row_counts = fields
+                row_names = {name, strip_version(name)}
+                counts = None
+                symbol_matched = False
+
+                for rank, (gene_col, folded, keys) in enumerate(match_keys):
+                    row_keys = (
+                        {description}
+                        if gene_col == "Description"
+                        else row_names
+                    )
+                    if folded:
+                        row_keys = {key.casefold() for key in row_keys}
+
+                    for row_key in row_keys:
+                        for gene in keys.get(row_key, ()):
+                            by_symbol = sum_rows and gene_col == "Description"
+                            symbol_matched = symbol_matched or by_symbol
+                            if gene in best_matches and (
+                                best_matches[gene][0] <= rank
+                            ):
+                                continue
+
+                            if by_symbol:
+                                best_matches[gene] = (rank, description)
+                                continue
+                            if counts is None:
+                                counts = _parse_counts(row_counts)
+                            best_matches[gene] = (rank, counts)
+                            if rank == 0 and not sum_rows:
+                                remaining -= 1
+                                found.append((gene, counts))
+
+                # all rows of a matched symbol are summed, symbols outranked
+                # further down are dropped at the end
+                if symbol_matched:
+                    if counts is None:
+                        counts = _parse_counts(row_counts)
+                    if description in symbol_counts:
+                        symbol_counts[description] += counts
+                    else:
+                        symbol_counts[description] = counts.copy()
+
+                if not sum_rows and remaining == 0:
+                    break
+
+        yield from found
+        if not sum_rows and remaining == 0:
+            return
+
+    for gene in genes:
+        if gene not in best_matches:
+            continue
+        rank, match = best_matches[gene]
+        if rank == 0 and not sum_rows:
             continue
+        if isinstance(match, str):
+            match = symbol_counts[match]
+        yield gene, match
 
-        # if the group exists within the sample_groups array, use the idx
-        # position of the current group and append it to the members list
-        group_members[current_group_idx].append(sample_name)
 
-    return list(zip(sample_groups, group_members))
+def iter_gene_counts(
+    reads_file: str,
+    genes: List[str],
+    reads_cache: Optional[Union["ReadsMatrix", "GCTRowIndex"]] = None,
+    duplicate_genes: Optional[str] = "first",
+    profiler: Optional[Any] = NULL_PROFILER,
+) -> Iterator[Tuple[str, "np.ndarray"]]:
+    """Yields the read counts of the genes of interest as soon as they are
+    found (look at load_gene_counts). Genes that are not found are skipped.
 
+    Several rows of the reads file can share one gene symbol. Their counts are
+    summed with duplicate_genes set to "sum", otherwise only the first row of
+    the symbol is used. Without a cache, the profiler records decompression
+    and parsing of the reads file separately.
+    """
+    sum_rows = duplicate_genes == "sum"
+    if reads_cache is not None:
+        import numpy as np
 
-def main() -> None:
+        for gene in genes:
+            try:
+                if sum_rows:
+                    counts = reads_cache.get_all_counts(
+                        gene, gene_col=None, ignore_case=True
+                    ).sum(axis=0, dtype=np.int64)
+                else:
+                    counts = reads_cache.get_counts(
+                        gene, gene_col=None, ignore_case=True
+                    )
+            except ValueError:
+                continue
+            yield gene, counts
+        return
+
+    yield from _iter_streamed_gene_counts(
+        reads_file, genes, sum_rows, profiler
+    )
+
+
+def load_gene_counts(
+    reads_file: str,
+    genes: List[str],
+    reads_cache: Optional[Union["ReadsMatrix", "GCTRowIndex"]] = None,
+    duplicate_genes: Optional[str] = "first",
+    profiler: Optional[Any] = NULL_PROFILER,
+) -> Dict[str, "np.ndarray"]:
+    """Collects the read counts of all genes of interest as integer arrays.
+    Without a cache, all rows are gathered with one streaming pass over the
+    reads file and each row is converted to integers once. With a cache or
+    row index, genes are looked up in its gene index.
+
+    Either way, genes are matched as gene symbols or Ensembl IDs (with or
+    without version) of any case, exact matches first.
+
+    Parameters
+    ----------
+    reads_file : str
+        path to reads file
+    genes : list[str]
+        genes of interest (gene symbols or Ensembl IDs)
+    reads_cache : ReadsMatrix or GCTRowIndex, optional
+        reads matrix, binary cache or row index of the reads file
+    duplicate_genes : str
+        "first" uses the first row of a gene symbol shared by several rows,
+        "sum" sums the counts of all its rows
+    profiler : StageProfiler, optional
+        records the "decompress" and "parse_counts" stages of the streaming
+        pass (look at profiling.py)
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        requested gene mapped to the read counts of all samples, in the
+        order of the sample columns of the reads file. Genes that are not
+        found are left out.
+    """
+    return dict(
+        iter_gene_counts(
+            reads_file, genes, reads_cache, duplicate_genes, profiler
+        )
+    )
+
+
+def sample_count_positions(reads_header: List[str]) -> Dict[str, int]:
+    """Maps the sample ids of the reads file header to their count positions.
+    The first two columns (Name and Description) are not samples, and
+    duplicated sample ids point to their first column.
+    """
+    count_positions = {}
+    for count_idx, sample_id in enumerate(reads_header[2:]):
+        count_positions.setdefault(sample_id, count_idx)
+    return count_positions
+
+
+def join_sample_columns(
+    sample_groups: Iterable[Tuple[str, str]], reads_header: List[str]
+) -> Tuple[List[List[Any]], Dict[str, int]]:
+    """Joins the samples of the attributes file with the sample columns of the
+    reads file in a single pass. The resulting count positions are resolved
+    once and reused for every gene of a run.
+
+    Parameters
+    ----------
+    sample_groups : iterable[tuple[str, str]]
+        sample id and group of every sample (look at
+        sample_index.load_sample_groups)
+    reads_header : list[str]
+        column names of the reads file
+
+    Returns
+    -------
+    tuple[list[list[str, np.ndarray]], dict[str, int]]
+        group name and the count positions of its sample members in the order
+        groups first appear, along with the number of "matched" samples and
+        "unmatched" samples that have no column in the reads file
+    """
+    import numpy as np
+
+    count_positions = sample_count_positions(reads_header)
+
+    group_positions = {}
+    unmatched = 0
+    for sample_id, group_name in sample_groups:
+        positions = group_positions.setdefault(group_name, [])
+        count_idx = count_positions.get(sample_id)
+        if count_idx is None:
+            unmatched += 1
+        else:
+            positions.append(count_idx)
+
+    group_count_idxs = [
+        [group_name, np.asarray(positions, dtype=np.intp)]
+        for group_name, positions in group_positions.items()
+    ]
+    matched = sum(len(count_idxs) for _, count_idxs in group_count_idxs)
+
+    return group_count_idxs, {"matched": matched, "unmatched": unmatched}
+
+
+def collect_grouped_counts(
+    gene_counts: "np.ndarray", group_count_idxs: List[List[Any]]
+) -> List[List[Any]]:
+    """Collects the read counts of one gene for every sample group with
+    fancy indexing.
+
+    Parameters
+    ----------
+    gene_counts : np.ndarray
+        read counts of the gene of interest (look at load_gene_counts)
+    group_count_idxs : list[list[str, np.ndarray]]
+        group name and the count positions of its sample members (look at
+        join_sample_columns)
+
+    Returns
+    -------
+    list[list[str, np.ndarray]]
+        group name and the read counts of its sample members
+    """
+    return [
+        [group_name, gene_counts[count_idxs]]
+        for group_name, count_idxs in group_count_idxs
+    ]
+
+
+def gene_output_path(output_file: str, gene: str, n_genes: int) -> str:
+    """Returns the plot path of a gene. A single gene uses the output file as
+    is. With multiple genes, `{gene}` in the output file is replaced by the
+    gene name, otherwise the gene name is added to the file name
+    (e.g. plot.png -> plot_ACTA2.png).
+    """
+    if n_genes == 1:
+        return output_file
+    if "{gene}" in output_file:
+        return output_file.replace("{gene}", gene)
+
+    out_path_obj = Path(output_file)
+    out_name = f"{out_path_obj.stem}_{gene}{out_path_obj.suffix}"
+    return str(out_path_obj.parent / out_name)
+
+
+def export_output_path(output_file: str, output_format: str) -> str:
+    """Returns the default path of the exported counts. The extension of the
+    output file is replaced by the format, and a `{gene}` placeholder by
+    "genes" as all genes are exported to one file.
+    """
+    out_path = Path(output_file.replace("{gene}", "genes"))
+    return str(out_path.with_suffix(f".{output_format}"))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the plot_gtex command line arguments
+
+    Parameters
+    ----------
+    argv : list[str], optional
+        command line arguments. sys.argv is used if not provided
+
+    Returns
+    -------
+    argparse.Namespace
+        parsed arguments
+    """
     parser = argparse.ArgumentParser(
         description="Generates box plot of gene counts"
     )
@@ -218,21 +926,36 @@ def main() -> None:
         required=True,
         help="file that contains meta data information of samples",
     )
-    parser.add_argument(
+    gene_args = parser.add_mutually_exclusive_group(required=True)
+    gene_args.add_argument(
         "-g",
         "--gene",
         type=str,
         dest="gene",
-        required=True,
         help="gene of interest",
     )
+    gene_args.add_argument(
+        "-gs",
+        "--genes",
+        type=str,
+        dest="genes",
+        help="comma separated genes of interest (e.g ACTA2,BRCA1)",
+    )
+    gene_args.add_argument(
+        "-gf",
+        "--genes_file",
+        type=str,
+        dest="genes_file",
+        help="file that contains one gene of interest per line",
+    )
     parser.add_argument(
         "-o",
         "--output_file",
         type=str,
         dest="output",
         required=True,
-        help="Name of generated output plot",
+        help="Name of generated output plot. With multiple genes, the gene "
+        "name is added to the file name or replaces {gene} if present",
     )
     parser.add_argument(
         "-t",
@@ -241,7 +964,29 @@ def main() -> None:
         dest="threshold",
         default=0,
         required=False,
-        help="Assigns a median threshold. Values > Threshold are kept",
+        help="Groups whose filter statistic (-fs) is below the threshold are "
+        "removed. Groups equal to or above the threshold are kept",
+    )
+    parser.add_argument(
+        "-dg",
+        "--duplicate_genes",
+        type=str,
+        dest="duplicate_genes",
+        choices=DUPLICATE_GENES,
+        default="first",
+        required=False,
+        help="Handling of gene symbols shared by several rows of the reads "
+        "file: first uses the first row, sum sums the counts of all rows",
+    )
+    parser.add_argument(
+        "-fs",
+        "--filter_stat",
+        type=str,
+        dest="filter_stat",
+        choices=FILTER_STATS,
+        default="mean",
+        required=False,
+        help="Group statistic compared to the threshold. Default is mean",
     )
     parser.add_argument(
         "-wt",
@@ -261,113 +1006,439 @@ def main() -> None:
         required=False,
         help="Figure height size",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "-gb",
+        "--group_by",
+        type=str,
+        dest="group_by",
+        default="SMTS",
+        required=False,
+        help="Sample attributes column used to group samples (default=SMTS)",
+    )
+    parser.add_argument(
+        "-cd",
+        "--cache_dir",
+        type=str,
+        dest="cache_dir",
+        default=None,
+        required=False,
+        help="Directory where a binary cache of the gene reads is kept",
+    )
+    parser.add_argument(
+        "-ri",
+        "--row_index_dir",
+        type=str,
+        dest="row_index_dir",
+        default=None,
+        required=False,
+        help="Directory where a re-blocked copy of the gene reads file and "
+        "its row index are kept, so genes are read without decompressing the "
+        "whole file (ignored with --cache_dir)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        dest="workers",
+        default=1,
+        required=False,
+        help="Number of processes used to parse the gene reads file and "
+        "render plots",
+    )
+    parser.add_argument(
+        "-p",
+        "--profile",
+        dest="profile",
+        default=False,
+        action="store_true",
+        help="Prints the time and memory used by each stage of the run",
+    )
+    parser.add_argument(
+        "-pj",
+        "--profile_json",
+        type=str,
+        dest="profile_json",
+        default=None,
+        required=False,
+        help="Writes the profiled stages to a JSON file (implies --profile)",
+    )
+    parser.add_argument(
+        "-pt",
+        "--profile_time",
+        dest="profile_time",
+        default=False,
+        action="store_true",
+        help="Profiles the time of each stage without tracing memory, which "
+        "slows down the run (implies --profile)",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        type=str,
+        dest="format",
+        default=None,
+        required=False,
+        choices=FORMATS,
+        help="Exports the grouped read counts of all genes to a tsv, json, "
+        "parquet (requires pyarrow) or npz file",
+    )
+    parser.add_argument(
+        "-ef",
+        "--export_file",
+        type=str,
+        dest="export_file",
+        default=None,
+        required=False,
+        help="Name of the exported file. Defaults to the output file name "
+        "with the extension of the format",
+    )
+    parser.add_argument(
+        "--summary",
+        dest="summary",
+        default=False,
+        action="store_true",
+        help="Exports the n, mean, median and quartiles of every group "
+        "instead of the read counts of every sample",
+    )
+    parser.add_argument(
+        "-pl",
+        "--pipeline",
+        dest="pipeline",
+        default=False,
+        action="store_true",
+        help="Overlaps loading the sample attributes, streaming the gene "
+        "reads and rendering plots with an asyncio pipeline",
+    )
+    parser.add_argument(
+        "--no_plot",
+        dest="no_plot",
+        default=False,
+        action="store_true",
+        help="Skips rendering the box plots, only the export is written",
+    )
+    args = parser.parse_args(argv)
 
-    # loading sample data
-    sample_header, samples = load_samples(args.sample_attributes)
-    reads_header, reads = load_reads(args.gene_reads)
+    if args.workers < 1:
+        print("ValueError: --workers must be at least 1")
+        sys.exit(1)
+    if args.no_plot and args.format is None:
+        print("ValueError: --no_plot requires an export --format")
+        sys.exit(1)
 
-    # find the group and sample_id column indx within the header info
-    try:
-        sample_group_col_idx = linear_search(
-            target="SMTS", sel_array=sample_header
-        )
-    except ValueError as e:
-        e_type = e.__class__.__name__
-        e_msg = f"Unable to find tissue group column in gene attributes file"
-        print(f"{e_type}: {e_msg}")
+    return args
+
+
+def resolve_genes(args: argparse.Namespace) -> List[str]:
+    """Returns the unique genes of interest of the parsed arguments, exits if
+    no gene is provided"""
+    if args.genes_file is not None:
+        genes = load_gene_list(args.genes_file)
+    elif args.genes is not None:
+        genes = [gene.strip() for gene in args.genes.split(",")]
+    else:
+        genes = [args.gene]
+    genes = list(dict.fromkeys(gene for gene in genes if gene != ""))
+    if len(genes) == 0:
+        print("ValueError: No genes of interest provided")
         sys.exit(1)
 
+    return genes
+
+
+def load_run_samples(args: argparse.Namespace) -> List[Tuple[str, str]]:
+    """Loads the sample id and group of every sample, only these two columns
+    are parsed (look at sample_index.py). Exits if the attributes file cannot
+    be read."""
+    from sample_index import load_sample_groups
+
     try:
-        sample_id_col_idx = linear_search(
-            target="SAMPID", sel_array=sample_header
+        return load_sample_groups(
+            args.sample_attributes, group_col=args.group_by
         )
+    except FileNotFoundError as e:
+        e_type = e.__class__.__name__
+        print(f"{e_type}: File path provided does not exists")
+        sys.exit(1)
+    except PermissionError as e:
+        e_type = e.__class__.__name__
+        print(f"{e_type}: You do not have permission to open this file")
+        sys.exit(1)
     except ValueError as e:
         e_type = e.__class__.__name__
-        e_msg = f"Unable to sample id column in gene attributes file"
-        print(f"{e_type}: {e_msg}")
+        print(f"{e_type}: {e}")
         sys.exit(1)
 
-    # now group sample entries to their tissue types
-    group_members = group_samples_by_tissues(
-        samples,
-        sample_id_col_idx=sample_id_col_idx,
-        group_col_idx=sample_group_col_idx,
+
+def load_run_reads(
+    args: argparse.Namespace, profiler: Optional[Any] = NULL_PROFILER
+) -> Tuple[Optional[Union["ReadsMatrix", "GCTRowIndex"]], List[str]]:
+    """Returns the binary cache or row index of the reads file if requested,
+    along with the column names of the reads file. Exits if the reads file
+    has no gene column."""
+    reads_cache = None
+    if args.cache_dir is not None:
+        with profiler.stage("load_cache"):
+            reads_cache = load_cached_reads(
+                args.gene_reads, args.cache_dir, workers=args.workers
+            )
+        reads_header = reads_cache.header
+    elif args.row_index_dir is not None:
+        with profiler.stage("load_row_index"):
+            reads_cache = load_indexed_reads(
+                args.gene_reads, args.row_index_dir
+            )
+        reads_header = reads_cache.header
+    else:
+        with profiler.stage("load_reads_header"):
+            reads_header = load_reads_header(args.gene_reads)
+
+    # check that the gene column exists in reads data
+    if "Description" not in reads_header:
+        e_msg = "Unable to find gene column in gene reads header"
+        print(f"ValueError: {e_msg}")
+        sys.exit(1)
+
+    return reads_cache, reads_header
+
+
+def join_run_samples(
+    sample_groups: List[Tuple[str, str]], reads_header: List[str]
+) -> List[List[Any]]:
+    """Joins the samples with the reads file columns and reports the number
+    of matched samples (look at join_sample_columns)"""
+    group_count_idxs, join_counts = join_sample_columns(
+        sample_groups, reads_header
     )
+    print(
+        f"MESSAGE: {join_counts['matched']} samples matched the reads file "
+        f"columns, {join_counts['unmatched']} samples without reads"
+    )
+    return group_count_idxs
+
 
-    # indexing reads_header for binary searches
-    reads_header = index_list(reads_header)
+def open_run_export(
+    args: argparse.Namespace,
+    reads_header: List[str],
+    group_count_idxs: List[List[Any]],
+) -> Tuple[Optional[Any], Optional[str], Dict[str, List[str]]]:
+    """Opens the export writer of the run if a format is requested. Returns
+    the writer, the exported file and the sample ids of every group."""
+    if args.format is None:
+        return None, None, {}
 
-    # get gene column in reads data
+    export_file = args.export_file
+    if export_file is None:
+        export_file = export_output_path(args.output, args.format)
     try:
-        gene_name_col_idx = binary_search(
-            target="Description", indexed_sel_array=reads_header
-        )
-    except ValueError as e:
+        writer = open_writer(args.format, export_file, args.summary)
+    except (ImportError, OSError) as e:
         e_type = e.__class__.__name__
-        e_msg = "Unable to find gene column in gene reads header"
-        print(f"{e_type}: {e_msg}")
+        print(f"{e_type}: Unable to export counts, {e}")
         sys.exit(1)
 
-    # iterate all genes reads data and index genes
-    genes = []
-    for read_entry in reads:
-        gene_name_entry = read_entry[gene_name_col_idx]
-        genes.append(gene_name_entry)
+    group_samples = {
+        group_name: [reads_header[idx + 2] for idx in count_idxs]
+        for group_name, count_idxs in group_count_idxs
+    }
+    return writer, export_file, group_samples
+
+
+def filter_gene_groups(
+    gene_counts: "np.ndarray",
+    group_count_idxs: List[List[Any]],
+    threshold: float,
+    profiler: Optional[Any] = NULL_PROFILER,
+    filter_stat: Optional[str] = "mean",
+) -> Tuple[List[List[Any]], List[Dict[str, Any]]]:
+    """Collects the grouped counts of a gene and removes the groups whose
+    filter statistic is below the threshold. Returns the kept groups along
+    with their statistics. Exits if the counts are not numerical."""
+    with profiler.stage("collect_counts"):
+        grouped_read_counts = collect_grouped_counts(
+            gene_counts, group_count_idxs
+        )
 
-    # now collecting read counts of one gene of all samples per tissue
     try:
-        gene_idx_pos = linear_search(target=args.gene, sel_array=genes)
-    except ValueError as e:
+        with profiler.stage("filter"):
+            return filter_by_stat(
+                grouped_read_counts, threshold=threshold, stat=filter_stat
+            )
+    except TypeError as e:
         e_type = e.__class__.__name__
-        e_msg = f"Unable to {args.gene} gene in gene column"
-        print(f"{e_type}: {e_msg}")
+        e_msg = f"{e_type}: None numerical value captured"
+        print(e_msg)
         sys.exit(1)
 
-    # getting row entry position based on where the GOI is located
-    gene_reads_entry = reads[gene_idx_pos]
 
-    # iterating all tissue samples with associated sample members
-    grouped_read_counts = []
-    for tissue_samp, sample_members in group_members:
+def make_plot_job(
+    args: argparse.Namespace,
+    gene: str,
+    grouped_counts: List[List[Any]],
+    n_genes: int,
+    group_stats: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Returns the render job of a gene (look at viz_lib.render_box_plots).
+    Precomputed group statistics are drawn as they are."""
+    return {
+        "data": grouped_counts,
+        "gene_name": gene,
+        "output_file": gene_output_path(args.output, gene, n_genes),
+        "group_label": args.group_by,
+        "fig_width": args.fig_width,
+        "fig_height": args.fig_height,
+        "stats": group_stats,
+    }
 
-        # collecting all gene read counts within each sample member
-        counts = []
-        for sample_member in sample_members:
 
-            # conduct a binary search to find samples
-            # -- if the value is not found, skip it and go to the next
-            try:
-                sample_col_idx = binary_search(sample_member, reads_header)
-            except ValueError:
-                continue
+def report_plot_results(plot_results: List[Dict[str, Any]]) -> None:
+    for plot_result in plot_results:
+        if plot_result["output_file"] is None:
+            gene = plot_result["gene_name"]
+            print(f"Unable to plot {gene} -> {plot_result['error']}")
+        else:
+            print(f"MESSAGE: plot saved in: {plot_result['output_file']}")
 
-            # get gene read count from gene reads entry by using gene index pos
-            count = int(gene_reads_entry[sample_col_idx])
-            counts.append(count)
 
-        grouped_read_counts.append([tissue_samp, counts])
+def run(
+    args: argparse.Namespace, profiler: Optional[Any] = NULL_PROFILER
+) -> List[Dict[str, Any]]:
+    """Generates the box plots of all genes of interest. Every stage of the
+    run is recorded by the provided profiler (look at profiling.py).
 
-    # filter group read_counts with given threshold
-    try:
-        filter_by_mean_groups = filter_by_mean(
-            grouped_read_counts, threshold=args.threshold
+    Parameters
+    ----------
+    args : argparse.Namespace
+        parsed arguments (look at parse_args)
+    profiler : StageProfiler, optional
+        profiler that records the stages of the run. Nothing is recorded by
+        default.
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        plot result of every gene (look at viz_lib.render_box_plots). Empty
+        if plots are skipped with no_plot
+    """
+
+    # genes of interest
+    genes = resolve_genes(args)
+
+    # overlapping stages run in the asyncio pipeline (look at pipeline.py)
+    if args.pipeline:
+        from pipeline import run_pipeline
+
+        with profiler.stage("pipeline"):
+            return run_pipeline(args, genes, profiler)
+
+    # loading sample data
+    with profiler.stage("load_samples"):
+        sample_groups = load_run_samples(args)
+
+    reads_cache, reads_header = load_run_reads(args, profiler)
+
+    # join the samples with the reads file columns once for all genes
+    with profiler.stage("join_samples"):
+        group_count_idxs = join_run_samples(sample_groups, reads_header)
+
+    # read the gene counts from the cache or collect all of them with a
+    # single pass over the reads file, decompression and parsing are
+    # recorded as nested stages
+    with profiler.stage("load_gene_counts"):
+        gene_counts = load_gene_counts(
+            args.gene_reads,
+            genes,
+            reads_cache,
+            args.duplicate_genes,
+            profiler,
         )
-    except TypeError as e:
-        e_type = e.__class__.__name__
-        e_msg = f"{e_type}: None numerical value captured"
-        print(e_msg)
 
-    # plot the the collected grouped_read_counts
-    make_box_plot(
-        data=filter_by_mean_groups,
-        gene_name=args.gene,
-        output_file=args.output,
-        fig_width=args.fig_width,
-        fig_height=args.fig_height,
+    for gene in genes:
+        if gene not in gene_counts:
+            e_msg = f"Unable to find {gene} gene in gene column"
+            print(f"ValueError: {e_msg}")
+    if len(gene_counts) == 0:
+        sys.exit(1)
+
+    # the export is written gene by gene while the counts are collected
+    writer, export_file, group_samples = open_run_export(
+        args, reads_header, group_count_idxs
     )
 
+    plot_jobs = []
+    for gene in genes:
+        if gene not in gene_counts:
+            continue
+
+        # filter group read_counts with given threshold
+        filtered_groups, filtered_stats = filter_gene_groups(
+            gene_counts[gene],
+            group_count_idxs,
+            args.threshold,
+            profiler,
+            filter_stat=args.filter_stat,
+        )
+
+        if writer is not None:
+            with profiler.stage("export"):
+                writer.write_gene(
+                    gene, filtered_groups, group_samples, filtered_stats
+                )
+
+        if args.no_plot:
+            continue
+
+        plot_jobs.append(
+            make_plot_job(
+                args, gene, filtered_groups, len(genes), filtered_stats
+            )
+        )
+
+    if writer is not None:
+        with profiler.stage("export"):
+            writer.close()
+        print(f"MESSAGE: counts exported in: {export_file}")
+
+    if args.no_plot:
+        return []
+
+    # plot the the collected grouped_read_counts of every gene
+    # -- matplotlib is only imported once plots are rendered
+    with profiler.stage("render"):
+        from viz_lib import render_box_plots
+
+        plot_results = render_box_plots(plot_jobs, workers=args.workers)
+
+    report_plot_results(plot_results)
+
+    return plot_results
+
+
+def main() -> None:
+    # long running server and its client (look at gtex_server.py)
+    if len(sys.argv) > 1 and sys.argv[1] in ("serve", "query"):
+        import gtex_server
+
+        if sys.argv[1] == "serve":
+            gtex_server.serve_main(sys.argv[2:])
+        gtex_server.query_main(sys.argv[2:])
+
+    args = parse_args()
+
+    profiler = NULL_PROFILER
+    if args.profile or args.profile_time or args.profile_json is not None:
+        profiler = StageProfiler(trace_memory=not args.profile_time)
+
+    plot_results = run(args, profiler=profiler)
+
+    if profiler.enabled:
+        print(profiler.summary())
+        if args.profile_json is not None:
+            profiler.write_json(args.profile_json)
+            print(f"MESSAGE: profile saved in: {args.profile_json}")
+
     print("Analysis complete!")
+    if any(result["output_file"] is None for result in plot_results):
+        sys.exit(1)
     sys.exit(0)
 
 
@@ -0,0 +1,230 @@
+"""
+profiling module
+Developer: Erik Serrano
+
+Module contains the stage profiler used by plot_gtex to record the wall time,
+CPU time and memory usage of each stage of a run.
+
+* StageProfiler - records every stage entered with `profiler.stage(name)`
+* NullProfiler - profiler that records nothing, used when profiling is off
+
+Hooks can be attached to a StageProfiler to run custom timers around every
+stage. A hook is a callable that takes the stage name and returns a context
+manager:
+
+>>> @contextmanager
+... def my_timer(stage_name):
+...     start = time.perf_counter()
+...     yield
+...     print(stage_name, time.perf_counter() - start)
+>>> profiler = StageProfiler()
+>>> profiler.add_hook(my_timer)
+
+Stages can be nested and can overlap across threads (look at pipeline.py).
+The memory peak of a stage includes the allocations of the stages nested in
+it, and of the stages running at the same time in other threads.
+"""
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import ExitStack
+from contextlib import nullcontext
+from contextlib import contextmanager
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+from typing import ContextManager
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+Hook = Callable[[str], ContextManager[Any]]
+
+
+def _max_rss_mb() -> Optional[float]:
+    """Returns the peak resident set size of the process in MB"""
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # linux reports kilobytes, macos reports bytes
+    if sys.platform == "darwin":
+        return round(max_rss / 1024**2, 2)
+    return round(max_rss / 1024, 2)
+
+
+class NullProfiler:
+    """Profiler that records nothing. Every stage returns the same reusable
+    null context, so profiling calls cost close to nothing when disabled.
+    """
+
+    enabled = False
+    _null_stage = nullcontext()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return self._null_stage
+
+    def add_hook(self, hook: Hook) -> None:
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class StageProfiler:
+    """Records the wall time, CPU time and memory usage of every stage.
+
+    Parameters
+    ----------
+    trace_memory : bool
+        records the peak memory allocated by Python (tracemalloc) during each
+        stage. Tracing slows down allocations and inflates the recorded
+        times, so it can be turned off to only time the stages.
+
+    Example
+    -------
+    >>> profiler = StageProfiler()
+    >>> with profiler.stage("load_samples"):
+    ...     samples = load_samples("SampleAttributesDS.txt")
+    >>> print(profiler.summary())
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory: Optional[bool] = True):
+        self.trace_memory = trace_memory
+        self.records: List[Dict[str, Any]] = []
+        self.hooks: List[Hook] = []
+
+        # memory peaks of the open stages, tracemalloc only keeps one peak
+        # which is folded into every open stage before it is reset
+        self._open_peaks: Dict[int, int] = {}
+        self._next_stage_id = 0
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Hook) -> None:
+        """Attaches a hook that is entered around every stage"""
+        self.hooks.append(hook)
+
+    def _fold_peak(self) -> None:
+        """Folds the traced peak since the last reset into every open stage
+        and resets it, called with the lock held"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for stage_id, open_peak in self._open_peaks.items():
+            self._open_peaks[stage_id] = max(open_peak, peak)
+        tracemalloc.reset_peak()
+
+    def _open_stage(self) -> Optional[int]:
+        """Starts tracing the memory of a stage, returns its id"""
+        if not self.trace_memory:
+            return None
+
+        with self._lock:
+            if len(self._open_peaks) == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._fold_peak()
+            stage_id = self._next_stage_id
+            self._next_stage_id += 1
+            self._open_peaks[stage_id] = 0
+        return stage_id
+
+    def _close_stage(self, stage_id: Optional[int]) -> Optional[int]:
+        """Stops tracing the memory of a stage, returns its peak in bytes.
+        Tracing stops once no stage is open."""
+        if stage_id is None:
+            return None
+
+        with self._lock:
+            self._fold_peak()
+            peak = self._open_peaks.pop(stage_id)
+            if len(self._open_peaks) == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        return peak
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager that records a stage of the run. The CPU time is
+        the time of the thread that entered the stage."""
+        stage_id = self._open_stage()
+
+        with ExitStack() as hooks:
+            for hook in self.hooks:
+                hooks.enter_context(hook(name))
+
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            try:
+                yield
+            finally:
+                record = {
+                    "stage": name,
+                    "wall_s": time.perf_counter() - wall_start,
+                    "cpu_s": time.thread_time() - cpu_start,
+                    "peak_traced_mb": None,
+                    "max_rss_mb": _max_rss_mb(),
+                }
+                peak = self._close_stage(stage_id)
+                if peak is not None:
+                    record["peak_traced_mb"] = round(peak / 1024**2, 2)
+                self.records.append(record)
+
+    def totals(self) -> List[Dict[str, Any]]:
+        """Returns the records combined per stage name, in the order stages
+        were first entered. Times are summed and memory peaks are maxed.
+        """
+        totals = {}
+        for record in self.records:
+            name = record["stage"]
+            if name not in totals:
+                totals[name] = dict(record, calls=0, wall_s=0.0, cpu_s=0.0)
+
+            total = totals[name]
+            total["calls"] += 1
+            total["wall_s"] += record["wall_s"]
+            total["cpu_s"] += record["cpu_s"]
+            for key in ("peak_traced_mb", "max_rss_mb"):
+                if record[key] is not None:
+                    total[key] = max(total[key], record[key])
+
+        return list(totals.values())
+
+    def summary(self) -> str:
+        """Returns a table of the time and memory used by every stage"""
+        row_format = "{:<20} {:>6} {:>10} {:>10} {:>12} {:>12}"
+        lines = [
+            row_format.format(
+                "stage", "calls", "wall (s)", "cpu (s)", "peak py MB", "rss MB"
+            )
+        ]
+
+        for total in self.totals():
+            lines.append(
+                row_format.format(
+                    total["stage"],
+                    total["calls"],
+                    f"{total['wall_s']:.4f}",
+                    f"{total['cpu_s']:.4f}",
+                    str(total["peak_traced_mb"]),
+                    str(total["max_rss_mb"]),
+                )
+            )
+
+        return "\n".join(lines)
+
+    def write_json(self, output_file: str) -> None:
+        """Writes every recorded stage and the per stage totals as JSON"""
+        with open(output_file, "w") as f:
+            json.dump(
+                {"stages": self.records, "totals": self.totals()}, f, indent=2
+            )
@@ -0,0 +1,281 @@
+"""
+reads_matrix module
+Developer: Erik Serrano
+
+Module contains the in-memory container of the gene reads. Read counts are
+converted to integers once when loaded and stored in a single uint32 matrix
+(genes x samples), which takes 4 bytes per count instead of a Python string
+per count.
+
+* ReadsMatrix - gene reads matrix with gene and sample accessors
+* ReadsRow - lightweight view of one gene row of a ReadsMatrix
+* to_counts_row - checks and converts the counts of a row to uint32
+"""
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+
+from gene_index import GeneIndex
+from gene_index import GeneRowsMixin
+
+COUNTS_DTYPE = np.uint32
+COUNTS_MAX = np.iinfo(COUNTS_DTYPE).max
+
+
+def to_counts_row(
+    name: str, row_counts: np.ndarray, n_samples: int
+) -> np.ndarray:
+    """Returns the counts of a gene row as a uint32 array. The counts are
+    checked before they are converted, so out of range counts are never
+    wrapped around.
+
+    Parameters
+    ----------
+    name : str
+        Name of the gene row, used in error messages
+    row_counts : np.ndarray
+        integer counts of the row
+    n_samples : int
+        expected number of counts
+
+    Returns
+    -------
+    np.ndarray
+        uint32 counts of the row
+
+    Raises
+    ------
+    ValueError
+        Raised if the row does not have one count per sample or a count
+        does not fit in an unsigned 32 bit integer
+    """
+    row_counts = np.asarray(row_counts)
+    if row_counts.shape[0] != n_samples:
+        msg = f"{name} has {row_counts.shape[0]} counts, "
+        msg += f"expected {n_samples}"
+        raise ValueError(msg)
+    if row_counts.size > 0 and (
+        row_counts.min() < 0 or row_counts.max() > COUNTS_MAX
+    ):
+        raise ValueError(f"{name} has counts out of uint32 range")
+
+    return row_counts.astype(COUNTS_DTYPE, copy=False)
+
+
+class ReadsRow:
+    """View of one gene row of a ReadsMatrix. Rows only hold a reference to
+    the matrix and their position, the counts are not copied.
+    """
+
+    __slots__ = ("matrix", "row_idx")
+
+    def __init__(self, matrix: "ReadsMatrix", row_idx: int):
+        self.matrix = matrix
+        self.row_idx = row_idx
+
+    @property
+    def name(self) -> str:
+        return self.matrix.names[self.row_idx]
+
+    @property
+    def description(self) -> str:
+        return self.matrix.descriptions[self.row_idx]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self.matrix.counts[self.row_idx]
+
+    def __len__(self) -> int:
+        return self.matrix.counts.shape[1]
+
+    def __repr__(self) -> str:
+        return f"ReadsRow({self.name}, {self.description})"
+
+    def to_list(self) -> List[Union[str, int]]:
+        """Returns the row in the layout of the reads file rows (Name,
+        Description followed by the counts)"""
+        return [self.name, self.description] + self.counts.tolist()
+
+
+class ReadsMatrix(GeneRowsMixin):
+    """Gene reads matrix along with its gene and sample indexes. Genes are
+    looked up with the gene row accessors of GeneRowsMixin.
+
+    Parameters
+    ----------
+    header : list[str]
+        column names of the reads file
+    names : list[str]
+        Name (Ensembl ID) of each gene row
+    descriptions : list[str]
+        Description (gene symbol) of each gene row
+    counts : np.ndarray
+        count matrix of shape (genes, samples)
+    gene_index : GeneIndex, optional
+        index of the gene rows, built from the names and descriptions if not
+        provided
+    """
+
+    def __init__(
+        self,
+        header: List[str],
+        names: List[str],
+        descriptions: List[str],
+        counts: np.ndarray,
+        gene_index: Optional[GeneIndex] = None,
+    ):
+        self.header = header
+        self.names = names
+        self.descriptions = descriptions
+        self.counts = counts
+
+        # duplicated gene symbols point to the first row
+        if gene_index is None:
+            gene_index = GeneIndex(names, descriptions)
+        self.gene_index = gene_index
+        self._sample_index = None
+
+    @classmethod
+    def from_rows(
+        cls,
+        header: List[str],
+        rows: Iterable[Tuple[str, str, np.ndarray]],
+    ) -> "ReadsMatrix":
+        """Builds a matrix from parsed rows (Name, Description and integer
+        counts). Rows are copied into a growing uint32 buffer one at a time,
+        so the counts are never held twice as Python objects.
+
+        Raises
+        ------
+        ValueError
+            Raised if a row does not have one count per sample or a count
+            does not fit in an unsigned 32 bit integer
+        """
+        n_samples = len(header) - 2
+        counts = np.empty((1024, n_samples), dtype=COUNTS_DTYPE)
+        names = []
+        descriptions = []
+
+        for name, description, row_counts in rows:
+            row_counts = to_counts_row(name, row_counts, n_samples)
+            if len(names) == counts.shape[0]:
+                counts = np.resize(counts, (2 * len(names), n_samples))
+            counts[len(names)] = row_counts
+            names.append(name)
+            descriptions.append(description)
+
+        if len(names) < counts.shape[0]:
+            counts = counts[: len(names)].copy()
+
+        return cls(header, names, descriptions, counts)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[ReadsRow]:
+        for row_idx in range(len(self.names)):
+            yield ReadsRow(self, row_idx)
+
+    @property
+    def sample_ids(self) -> List[str]:
+        """Sample ids of the count columns"""
+        return self.header[2:]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the count matrix in bytes"""
+        return self.counts.nbytes
+
+    def row(self, row_idx: int) -> ReadsRow:
+        """Returns the view of a gene row by position"""
+        if not -len(self.names) <= row_idx < len(self.names):
+            raise IndexError(f"row {row_idx} is out of range")
+        return ReadsRow(self, row_idx % len(self.names))
+
+    def gene(
+        self,
+        gene: str,
+        gene_col: Optional[str] = "Description",
+        ignore_case: bool = False,
+    ) -> ReadsRow:
+        """Returns the view of a gene row
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found in the gene column
+        """
+        return ReadsRow(self, self.gene_row_idx(gene, gene_col, ignore_case))
+
+    def get_counts(
+        self,
+        gene: str,
+        gene_col: Optional[str] = "Description",
+        ignore_case: bool = False,
+    ) -> np.ndarray:
+        """Returns the read counts of a gene for all samples
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found in the gene column
+        """
+        return self.counts[self.gene_row_idx(gene, gene_col, ignore_case)]
+
+    def rows_counts(self, row_idxs: Iterable[int]) -> np.ndarray:
+        """Returns the read counts of the given rows, one row per row
+        position"""
+        return self.counts[np.asarray(row_idxs, dtype=np.intp)]
+
+    def get_row(
+        self,
+        gene: str,
+        gene_col: Optional[str] = "Description",
+        ignore_case: bool = False,
+    ) -> List[Union[str, int]]:
+        """Returns the row entry of a gene in the same layout as the rows of
+        the reads file (Name, Description followed by the counts).
+
+        Raises
+        ------
+        ValueError
+            Raised if the gene is not found in the gene column
+        """
+        return self.gene(gene, gene_col, ignore_case).to_list()
+
+    def sample_counts(self, sample_id: str) -> np.ndarray:
+        """Returns the read counts of all genes for one sample
+
+        Raises
+        ------
+        ValueError
+            Raised if the sample is not a column of the reads file
+        """
+        if self._sample_index is None:
+            self._sample_index = {}
+            for count_idx, column in enumerate(self.sample_ids):
+                self._sample_index.setdefault(column, count_idx)
+
+        try:
+            return self.counts[:, self._sample_index[sample_id]]
+        except KeyError:
+            raise ValueError(f"{sample_id} is not a sample of the reads file")
+
+    def find_genes(
+        self,
+        prefix: str,
+        gene_col: Optional[str] = "Description",
+        limit: Optional[int] = None,
+    ) -> List[List[str]]:
+        """Returns the Name and Description of the genes starting with a
+        prefix, ignoring case, in alphabetical order
+        """
+        return [
+            [self.names[row_idx], self.descriptions[row_idx]]
+            for row_idx in self.gene_index.find_prefix(prefix, gene_col, limit)
+        ]
@@ -0,0 +1,220 @@
+"""
+sample_index module
+Developer: Erik Serrano
+
+Module contains a column-projecting loader of the sample attributes file. Only
+the sample id and group columns of each row are parsed, and the resulting
+sample -> group mapping is kept in a small JSON index beside the attributes
+file (`<attributes file>.<group column>.index.json`).
+
+Later runs reuse the index while the size and mtime of the attributes file
+are unchanged. When rows are appended to the attributes file, the previously
+parsed part is verified with its sha256 and only the new rows are parsed.
+
+* sample_index_path - returns the index file used for an attributes file
+* load_sample_groups - returns the sample id and group of every sample
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+INDEX_VERSION = 1
+
+
+def sample_index_path(sample_file: str, group_col: str) -> Path:
+    """Returns the index file kept beside the attributes file"""
+    sample_path = Path(sample_file)
+    return sample_path.with_name(f"{sample_path.name}.{group_col}.index.json")
+
+
+def _read_index(index_path: Path) -> Optional[Dict[str, Any]]:
+    """Returns the stored index or None if it cannot be read"""
+    try:
+        with open(index_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_index(index_path: Path, index: Dict[str, Any]) -> None:
+    """Writes the index, a read only directory only disables the index"""
+    tmp_path = index_path.with_name(f"{index_path.name}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _hash_prefix(f: BinaryIO, n_bytes: int) -> Optional[Any]:
+    """Returns the sha256 state of the first n_bytes of a file, None if the
+    file is shorter"""
+    digest = hashlib.sha256()
+    remaining = n_bytes
+    while remaining > 0:
+        chunk = f.read(min(remaining, 1 << 20))
+        if chunk == b"":
+            return None
+        digest.update(chunk)
+        remaining -= len(chunk)
+    return digest
+
+
+def _parse_rows(
+    f: BinaryIO,
+    id_col_idx: int,
+    group_col_idx: int,
+    digest: Any,
+    sample_ids: List[str],
+    groups: List[str],
+) -> Tuple[int, int]:
+    """Parses the sample id and group of every row from the current position
+    of the file. Only the fields up to the last needed column are split.
+
+    Returns the offset after the last complete (newline terminated) row and
+    the number of samples parsed up to that offset. A trailing row without
+    newline is parsed but not counted, as it may still be written.
+    """
+    max_idx = max(id_col_idx, group_col_idx)
+    offset = f.tell()
+    n_complete = len(sample_ids)
+    for line in f:
+        fields = line.decode().rstrip("\r\n").split("\t", max_idx + 1)
+        if len(fields) > max_idx:
+            sample_ids.append(fields[id_col_idx])
+            groups.append(fields[group_col_idx].rstrip())
+
+        if line.endswith(b"\n"):
+            digest.update(line)
+            offset += len(line)
+            n_complete = len(sample_ids)
+
+    return offset, n_complete
+
+
+def load_sample_groups(
+    sample_file: str,
+    group_col: Optional[str] = "SMTS",
+    id_col: Optional[str] = "SAMPID",
+    use_index: Optional[bool] = True,
+) -> List[Tuple[str, str]]:
+    """Returns the sample id and group of every sample in the attributes file,
+    in file order. Only the sample id and group columns are parsed.
+
+    Parameters
+    ----------
+    sample_file : str
+        path to sample attributes file
+    group_col : str
+        column used to group samples
+    id_col : str
+        column that contains the sample ids
+    use_index : bool
+        reuses and updates the index kept beside the attributes file
+
+    Returns
+    -------
+    list[tuple[str, str]]
+        sample id and group of every sample
+
+    Raises
+    ------
+    FileNotFoundError
+        Raised if the provided sample_file path does not exist
+    PermissionError
+        Raised if you do not have permission to read the sample file
+    ValueError
+        Raised if the sample id or group column is not found in the header
+    """
+    stats = os.stat(sample_file)
+    index_path = sample_index_path(sample_file, group_col)
+
+    index = None
+    if use_index:
+        index = _read_index(index_path)
+        if index is not None and (
+            index.get("version") != INDEX_VERSION
+            or index["id_col"] != id_col
+            or index["group_col"] != group_col
+        ):
+            index = None
+
+    # unchanged attributes file
+    if (
+        index is not None
+        and index["size"] == stats.st_size
+        and index["offset"] == stats.st_size
+        and index["mtime_ns"] == stats.st_mtime_ns
+    ):
+        group_names = index["groups"]
+        return [
+            (sample_id, group_names[code])
+            for sample_id, code in zip(index["sample_ids"], index["codes"])
+        ]
+
+    with open(sample_file, "rb") as f:
+        digest = None
+        if index is not None and index["offset"] <= stats.st_size:
+            digest = _hash_prefix(f, index["offset"])
+            if digest is None or digest.hexdigest() != index["sha256"]:
+                digest = None
+
+        if digest is not None:
+            # only the rows appended after the indexed part are parsed
+            id_col_idx = index["id_col_idx"]
+            group_col_idx = index["group_col_idx"]
+            group_names = index["groups"]
+            sample_ids = index["sample_ids"]
+            groups = [group_names[code] for code in index["codes"]]
+        else:
+            f.seek(0)
+            digest = hashlib.sha256()
+            header_line = f.readline()
+            digest.update(header_line)
+            header = header_line.decode().rstrip("\r\n").split("\t")
+            col_idxs = []
+            for col in (id_col, group_col):
+                if col not in header:
+                    msg = f"{col} column is not found in attributes file"
+                    raise ValueError(msg)
+                col_idxs.append(header.index(col))
+            id_col_idx, group_col_idx = col_idxs
+            sample_ids = []
+            groups = []
+
+        offset, n_complete = _parse_rows(
+            f, id_col_idx, group_col_idx, digest, sample_ids, groups
+        )
+
+    if use_index:
+        codes = {}
+        for group in groups[:n_complete]:
+            codes.setdefault(group, len(codes))
+        _write_index(
+            index_path,
+            {
+                "version": INDEX_VERSION,
+                "size": stats.st_size,
+                "mtime_ns": stats.st_mtime_ns,
+                "offset": offset,
+                "sha256": digest.hexdigest(),
+                "id_col": id_col,
+                "group_col": group_col,
+                "id_col_idx": id_col_idx,
+                "group_col_idx": group_col_idx,
+                "groups": list(codes),
+                "sample_ids": sample_ids[:n_complete],
+                "codes": [codes[group] for group in groups[:n_complete]],
+            },
+        )
+
+    return list(zip(sample_ids, groups))
@@ -1,15 +1,199 @@
 """
 search.py
 
-Simple script that searches for a target value within an input file. Currently
-supported search algorithms are: linear and binary searches:
+Simple script that searches for a target value within an input file. The
+search algorithm is selected with `-a` among the search backends of utils
+(look at utils.SEARCH_BACKENDS): linear, binary, hash, bisect, exponential,
+interpolation (numerical data only) and numpy. `auto` picks a backend from the
+data size and the number of targets.
 
 Users have the option to shuffle the loaded data as well with the `-s` flag
+
+Many targets can be searched at once with `-tf` (a file with one target per
+line, `-` reads the targets from stdin). The index is then built once and
+every target is written as a `target<TAB>index` line, or
+`target<TAB>not-found`.
+
+With `-al` every position of the targets is reported (comma separated) from
+a postings index of the input (look at utils.PostingsIndex).
+
+With `-ic` targets are matched regardless of their case, with any algorithm.
+
+The input file is tokenized in chunks over a memory map (look at
+token_stream.py). Linear searches of a single target on unshuffled data stop
+reading the file at the first match.
 """
 import sys
 import utils
 import random
 import argparse
+from typing import Any
+from typing import Iterator
+from typing import List
+from typing import TextIO
+from typing import Optional
+from typing import Union
+
+from token_stream import iter_tokens
+from token_stream import load_tokens
+
+NOT_FOUND = "not-found"
+ALGORITHMS = list(utils.SEARCH_BACKENDS) + ["auto"]
+
+# batches of the linear algorithm are answered with the hash index, which
+# returns the same first positions after a single pass over the data
+BATCH_BACKENDS = {"linear": "hash"}
+
+
+def iter_targets(targets: TextIO) -> Iterator[str]:
+    """Yields the targets of a file with one target per line, empty lines are
+    skipped. Targets are yielded as they are read, so queries can be streamed
+    through stdin."""
+    for line in targets:
+        target = line.strip()
+        if target != "":
+            yield target
+
+
+def to_number(token: str) -> Union[int, float]:
+    """Converts a token to an int or float, used by interpolation searches
+
+    Raises
+    ------
+    ValueError
+        Raised if the token is not a number
+    """
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+def to_keys(tokens: List[str], algorithm: str) -> List[Any]:
+    """Returns the searched keys of the tokens, numbers for interpolation
+    searches
+
+    Raises
+    ------
+    TypeError
+        Raised if interpolation is used on non numerical tokens
+    """
+    if algorithm != "interpolation":
+        return tokens
+    try:
+        return [to_number(token) for token in tokens]
+    except ValueError:
+        raise TypeError("Interpolation search requires numerical data")
+
+
+def build_index(
+    tokens: List[str], algorithm: str, ignore_case: Optional[bool] = False
+) -> Optional[utils.SearchIndex]:
+    """Builds the search index of the tokens, prints the error and returns
+    None if the index cannot be built"""
+    try:
+        keys = to_keys(tokens, algorithm)
+        index_cls = utils.SEARCH_BACKENDS[algorithm]
+        return index_cls.from_array(keys, ignore_case=ignore_case)
+    except TypeError as e:
+        print(f"{e.__class__.__name__}: {e}")
+    except ValueError as e:
+        e_type = e.__class__.__name__
+        e_msg = "Input data does not have any elements"
+        print(f"{e_type}: {e_msg}")
+    return None
+
+
+def lookup_target(
+    index: utils.SearchIndex, target: str, algorithm: str
+) -> Optional[int]:
+    """Returns the position of a target, None if it is not found"""
+    try:
+        if algorithm == "interpolation":
+            return index.lookup(to_number(target))
+        return index.lookup(target)
+    except ValueError:
+        return None
+
+
+def all_positions(index: utils.PostingsIndex, target: str) -> str:
+    """Returns the comma separated positions of a target, not-found if the
+    target is not found"""
+    try:
+        return ",".join(map(str, index.find_all(target)))
+    except ValueError:
+        return NOT_FOUND
+
+
+def batch_search(
+    args: argparse.Namespace, out: Optional[TextIO] = None
+) -> int:
+    """Searches every target of the targets file. The index is built once and
+    each target costs a single lookup afterwards. Targets of a file are looked
+    up as one batch, targets streamed through stdin are answered and flushed
+    one at a time. Results are written to out (stdout by default). Returns the
+    exit code."""
+    if out is None:
+        out = sys.stdout
+
+    from_stdin = args.targets_file == "-"
+    try:
+        targets_file = (
+            sys.stdin if from_stdin else open(args.targets_file, "r")
+        )
+    except FileNotFoundError as e:
+        e_type = e.__class__.__name__
+        e_msg = "Targets file path provided does not exists"
+        print(f"{e_type}: {e_msg}")
+        return 1
+
+    with targets_file:
+        targets = iter_targets(targets_file)
+        if not from_stdin:
+            targets = list(targets)
+
+        toy_conts = load_tokens(args.input)
+        if args.shuffle is True:
+            random.shuffle(toy_conts)
+
+        algorithm = args.algorithm
+        if args.all is True:
+            algorithm = "postings"
+        elif algorithm == "auto":
+            n_queries = None if from_stdin else len(targets)
+            algorithm = utils.choose_search_backend(len(toy_conts), n_queries)
+        algorithm = BATCH_BACKENDS.get(algorithm, algorithm)
+
+        index = build_index(toy_conts, algorithm, args.ignore_case)
+        if index is None:
+            return 1
+
+        if args.all is True:
+            for target in targets:
+                positions = all_positions(index, target)
+                print(f"{target}\t{positions}", file=out, flush=from_stdin)
+            return 0
+
+        if from_stdin:
+            for target in targets:
+                position = lookup_target(index, target, algorithm)
+                if position is None:
+                    position = NOT_FOUND
+                print(f"{target}\t{position}", file=out, flush=True)
+            return 0
+
+        if algorithm == "interpolation":
+            positions = [
+                lookup_target(index, target, algorithm) for target in targets
+            ]
+        else:
+            positions = index.lookup_many(targets)
+        for target, position in zip(targets, positions):
+            if position is None:
+                position = NOT_FOUND
+            out.write(f"{target}\t{position}\n")
+
+    return 0
 
 
 def main() -> int:
@@ -19,22 +203,47 @@ def main() -> int:
     parser.add_argument(
         "-i", "--input", dest="input", type=str, help="path to data"
     )
-    parser.add_argument(
+    targets_group = parser.add_mutually_exclusive_group(required=True)
+    targets_group.add_argument(
         "-t",
         "--target",
         dest="target",
-        required=True,
         type=str,
         help="value to find in given toy data",
     )
+    targets_group.add_argument(
+        "-tf",
+        "--targets_file",
+        dest="targets_file",
+        type=str,
+        help="file with one target per line, use - to read the targets from "
+        "stdin. Prints one target<TAB>index (or not-found) line per target",
+    )
     parser.add_argument(
         "-a",
         "--algorithm",
         dest="algorithm",
         type=str,
-        choices=["linear", "binary"],
+        choices=ALGORITHMS,
         default="linear",
-        help="Selecting search algorithm. choices=[linear, binary]",
+        help=f"Selecting search algorithm. choices={ALGORITHMS}",
+    )
+    parser.add_argument(
+        "-al",
+        "--all",
+        dest="all",
+        default=False,
+        action="store_true",
+        help="prints all positions of the target, comma separated, using a "
+        "postings index. The search algorithm is ignored",
+    )
+    parser.add_argument(
+        "-ic",
+        "--ignore_case",
+        dest="ignore_case",
+        default=False,
+        action="store_true",
+        help="matches the target regardless of its case",
     )
     parser.add_argument(
         "-s",
@@ -46,25 +255,53 @@ def main() -> int:
     )
     args = parser.parse_args()
 
-    # open input file
-    with open(args.input, "r") as f:
-        # clean contents
-        lorem_ipsum_data = (
-            f.read().rstrip("\n").replace(".", "").replace(",", "")
-        )
+    # -- batch search, the index is built once for all targets
+    if args.targets_file is not None:
+        sys.exit(batch_search(args))
 
-        # create list
-        toy_conts = lorem_ipsum_data.split()
+    # -- all positions of the target, the postings index is built with one
+    # pass over the token stream
+    if args.all is True:
+        toy_conts = iter_tokens(args.input)
+        if args.shuffle is True:
+            toy_conts = list(toy_conts)
+            random.shuffle(toy_conts)
 
-        # shuffle list if `-s` is used
+        try:
+            index = utils.PostingsIndex(toy_conts, args.ignore_case)
+        except ValueError as e:
+            e_type = e.__class__.__name__
+            e_msg = "Input data does not have any elements"
+            print(f"{e_type}: {e_msg}")
+            sys.exit(1)
+
+        positions = all_positions(index, args.target)
+        if positions == NOT_FOUND:
+            e_msg = f"Unable to find target value {args.target}"
+            print(f"ValueError: {e_msg}")
+            sys.exit(1)
+
+        print(positions)
+        sys.exit(0)
+
+    # a single target is searched linearly in auto mode
+    algorithm = args.algorithm
+    if algorithm == "auto":
+        algorithm = utils.choose_search_backend(None, 1)
+
+    # -- linear search over the token stream, the file is only read up to
+    # the first match. Shuffled data has to be loaded first
+    if algorithm == "linear":
+        toy_conts = iter_tokens(args.input)
         if args.shuffle is True:
+            toy_conts = list(toy_conts)
             random.shuffle(toy_conts)
 
-    # selecting algorithm
-    # -- linear search
-    if args.algorithm == "linear":
+        key = utils.comparison_key(args.ignore_case)
         try:
-            index = utils.linear_search(args.target, toy_conts)
+            index = utils.linear_search_iter(
+                key(args.target), map(key, toy_conts)
+            )
             print(index)
             sys.exit(0)
         except ValueError as e:
@@ -72,11 +309,6 @@ def main() -> int:
             e_msg = f"Unable to find target value `{args.target}`"
             print(f"{e_type}: {e_msg}")
             sys.exit(1)
-        except TypeError as e:
-            e_type = e.__class__.__name__
-            e_msg = "Provided data is not a list or tuple"
-            print(f"{e_type}: {e_msg}")
-            sys.exit(1)
         except RuntimeError as e:
             e_type = e.__class__.__name__
             e_msg = "Empty list provided for linear search"
@@ -88,38 +320,24 @@ def main() -> int:
             print(f"{e_msg} -> {e_type}")
             sys.exit(1)
 
-    # -- binary search
-    if args.algorithm == "binary":
+    # -- indexed search, the index of the selected backend is built from all
+    # tokens
+    toy_conts = load_tokens(args.input)
+    if args.shuffle is True:
+        random.shuffle(toy_conts)
 
-        # creating index array
-        try:
-            indexed_array = utils.index_list(toy_conts)
-        except TypeError as e:
-            e_type = e.__class__.__name__
-            e_msg = "Provided data is not a list or tuple"
-            print(f"{e_type}: {e_msg}")
-            sys.exit(1)
-        except ValueError as e:
-            e_type = e.__class__.__name__
-            e_msg = "Input data does not have any "
-            print(f"{e_type}: {e_msg}")
-            sys.exit(1)
+    index = build_index(toy_conts, algorithm, args.ignore_case)
+    if index is None:
+        sys.exit(1)
 
-        # conducting binary search with indexed array
-        try:
-            index = utils.binary_search(args.target, indexed_array)
-            print(index)
-            sys.exit(0)
-        except ValueError as e:
-            e_type = e.__class__.__name__
-            e_msg = f"Unable to find target value {args.target}"
-            print(f"{e_type}: {e_msg}")
-            sys.exit(1)
-        except Exception as e:
-            e_type = e.__class__.__name__
-            e_msg = "Unknown error captured"
-            print(f"{e_msg} -> {e_type}")
-            sys.exit(1)
+    position = lookup_target(index, args.target, algorithm)
+    if position is None:
+        e_msg = f"Unable to find target value {args.target}"
+        print(f"ValueError: {e_msg}")
+        sys.exit(1)
+
+    print(position)
+    sys.exit(0)
 
 
 if __name__ == "__main__":
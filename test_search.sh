@@ -10,6 +10,11 @@ run binary_search python search.py -i toydata/lorem_ipsum_data.txt -t dolor -a b
 assert_in_stdout 2
 assert_exit_code 0
 
+run batch_search bash -c "printf 'dolor\nzzz\n' | python search.py -i toydata/lorem_ipsum_data.txt -tf - -a binary"
+assert_in_stdout "dolor	2"
+assert_in_stdout "zzz	not-found"
+assert_exit_code 0
+
 run check_styling pycodestyle *.py tests/unit/*.py
 assert_exit_code 0
 
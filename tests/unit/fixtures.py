@@ -0,0 +1,75 @@
+"""
+fixtures.py
+
+synthetic gene reads (GCT) and sample attributes files shared by the unit
+tests. Every test of a TempDirTestCase runs with its own temporary directory,
+so no test file is left in the working directory when a test fails.
+
+"""
+import gzip
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from typing import List
+from typing import Optional
+
+GENES = ["ACTA2", "BRCA1", "TP53", "ACTA2", "MYH7"]
+
+
+def make_samples(n_samples: int) -> List[str]:
+    """Returns the sample ids GTEX-0 ... GTEX-{n_samples - 1}"""
+    return [f"GTEX-{idx}" for idx in range(n_samples)]
+
+
+def make_rows(
+    genes: List[str],
+    n_samples: int,
+    name_format: Optional[str] = "ENSG{idx:05d}.1",
+    max_count: Optional[int] = 4000,
+    count_type: Optional[type] = str,
+) -> List[List[Any]]:
+    """Returns one reads row (Name, Description and random counts) per gene.
+    Names are formatted with the row position, counts are converted with
+    count_type (str by default, as the fields read back from the file)."""
+    return [
+        [name_format.format(idx=idx), gene]
+        + [count_type(random.randint(0, max_count)) for _ in range(n_samples)]
+        for idx, gene in enumerate(genes)
+    ]
+
+
+def write_reads_file(
+    reads_file: str, samples: List[str], rows: List[List[Any]]
+) -> None:
+    """Writes a compressed GCT file with the version, dimensions and header
+    lines followed by the rows"""
+    with gzip.open(reads_file, "wt") as f:
+        f.write("#1.2\n")
+        f.write(f"{len(rows)}\t{len(samples)}\n")
+        f.write("\t".join(["Name", "Description"] + samples) + "\n")
+        for row in rows:
+            f.write("\t".join(str(field) for field in row) + "\n")
+
+
+def write_sample_file(sample_file: str, rows: List[List[str]]) -> None:
+    """Writes a tab separated sample attributes file, the first row is the
+    header"""
+    with open(sample_file, "w") as f:
+        for row in rows:
+            f.write("\t".join(row) + "\n")
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Test case that gives every test its own temporary directory, removed
+    once the test ends"""
+
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+
+    def tmp_path(self, name: str) -> str:
+        """Returns the path of a file within the temporary directory"""
+        return str(self.tmp_dir / name)
@@ -0,0 +1,112 @@
+"""
+test_export_lib.py
+
+testing module that tests exporting grouped read counts.
+
+"""
+import json
+import unittest
+
+import numpy as np
+
+import export_lib
+import fixtures
+import utils
+
+
+class ExportTest(fixtures.TempDirTestCase):
+    def test_summarize_counts(self) -> None:
+        stats = export_lib.summarize_counts(np.array([1, 2, 3, 4, 10]))
+        self.assertEqual(stats["n"], 5)
+        self.assertEqual(stats["mean"], 4.0)
+        self.assertEqual(stats["median"], 3.0)
+        self.assertEqual(stats["q1"], 2.0)
+        self.assertEqual(stats["q3"], 4.0)
+
+        stats = export_lib.summarize_counts(np.array([], dtype=np.int64))
+        self.assertEqual(stats["n"], 0)
+        self.assertIsNone(stats["median"])
+
+    def test_tsv_export(self) -> None:
+        writer = export_lib.open_writer("tsv", self.output_file)
+        for gene in ["ACTA2", "TP53"]:
+            writer.write_gene(gene, self.grouped_counts, self.group_samples)
+        writer.close()
+
+        with open(self.output_file) as f:
+            lines = [line.rstrip("\n").split("\t") for line in f]
+        self.assertEqual(lines[0], export_lib.COUNTS_COLUMNS)
+        self.assertEqual(len(lines), 1 + 2 * 5)
+        self.assertEqual(lines[1], ["ACTA2", "Blood", "S1", "1"])
+        self.assertEqual(lines[-1], ["TP53", "Brain", "S5", "50"])
+
+    def test_json_summary_export(self) -> None:
+        writer = export_lib.open_writer("json", self.output_file, True)
+        for gene in ["ACTA2", "TP53"]:
+            writer.write_gene(gene, self.grouped_counts, self.group_samples)
+        writer.close()
+
+        with open(self.output_file) as f:
+            content = json.load(f)
+        self.assertEqual(
+            [entry["gene"] for entry in content], ["ACTA2", "TP53"]
+        )
+        brain = content[0]["groups"][1]
+        self.assertEqual(brain["group"], "Brain")
+        self.assertEqual(brain["n"], 2)
+        self.assertEqual(brain["mean"], 45.0)
+
+    def test_precomputed_stats(self) -> None:
+        """Provided group statistics are summarized without being
+        recomputed"""
+        stats = utils.group_stats(self.grouped_counts)
+        original_group_stats = export_lib.group_stats
+        export_lib.group_stats = None
+        try:
+            for output_format in ("tsv", "json", "npz"):
+                output_file = self.tmp_path(f"test_stats.{output_format}")
+                writer = export_lib.open_writer(
+                    output_format, output_file, True
+                )
+                writer.write_gene(
+                    "ACTA2", self.grouped_counts, self.group_samples, stats
+                )
+                writer.close()
+        finally:
+            export_lib.group_stats = original_group_stats
+
+        with open(self.tmp_path("test_stats.tsv")) as f:
+            rows = [line.rstrip("\n").split("\t") for line in f]
+        self.assertEqual(rows[2][:4], ["ACTA2", "Brain", "2", "45.0"])
+
+    def test_npz_export(self) -> None:
+        self.output_file = self.tmp_path("test_export.npz")
+        writer = export_lib.open_writer("npz", self.output_file)
+        writer.write_gene("ACTA2", self.grouped_counts, self.group_samples)
+        writer.close()
+
+        with np.load(self.output_file) as content:
+            np.testing.assert_array_equal(content["ACTA2/Blood"], [1, 2, 3])
+            self.assertEqual(
+                content["ACTA2/Brain/samples"].tolist(), ["S4", "S5"]
+            )
+
+    def test_unsupported_format(self) -> None:
+        with self.assertRaises(ValueError):
+            export_lib.open_writer("xlsx", self.output_file)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.output_file = self.tmp_path("test_export.txt")
+        self.grouped_counts = [
+            ["Blood", np.array([1, 2, 3])],
+            ["Brain", np.array([40, 50])],
+        ]
+        self.group_samples = {
+            "Blood": ["S1", "S2", "S3"],
+            "Brain": ["S4", "S5"],
+        }
+
+
+if __name__ == "__main__":
+    unittest.main()
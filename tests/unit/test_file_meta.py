@@ -0,0 +1,62 @@
+"""
+test_file_meta.py
+
+testing module that tests the metadata and atomic writes shared by the reads
+cache and the row index.
+
+"""
+
+import unittest
+
+import file_meta
+import fixtures
+
+
+class FileMetaTest(fixtures.TempDirTestCase):
+    def test_atomic_build(self) -> None:
+        """Builds replace the previous build once completed, failed builds
+        leave the previous build untouched"""
+        build_path = self.tmp_dir / "source.txt.build"
+
+        with file_meta.atomic_build(build_path) as tmp_path:
+            self.assertFalse(build_path.exists())
+            (tmp_path / "part.txt").write_text("first")
+        self.assertEqual((build_path / "part.txt").read_text(), "first")
+
+        with self.assertRaises(ValueError):
+            with file_meta.atomic_build(build_path) as tmp_path:
+                (tmp_path / "part.txt").write_text("second")
+                raise ValueError("malformed row")
+        self.assertEqual((build_path / "part.txt").read_text(), "first")
+        self.assertEqual(list(self.tmp_dir.glob("*.tmp")), [])
+
+    def test_build_validity(self) -> None:
+        """Builds are valid for the version and content they were made
+        from"""
+        build_path = self.tmp_dir / "source.txt.build"
+        with file_meta.atomic_build(build_path) as tmp_path:
+            meta = file_meta.source_fingerprint(self.source_file, 3)
+            file_meta.write_meta(tmp_path, meta)
+
+        self.assertEqual(file_meta.read_meta(build_path), meta)
+        self.assertTrue(
+            file_meta.is_build_valid(build_path, self.source_file, 3)
+        )
+        self.assertFalse(
+            file_meta.is_build_valid(build_path, self.source_file, 2)
+        )
+
+        self.source_file.write_text("other content")
+        self.assertFalse(
+            file_meta.is_build_valid(build_path, self.source_file, 3)
+        )
+        self.assertIsNone(file_meta.read_meta(self.tmp_dir / "notfound"))
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.source_file = self.tmp_dir / "source.txt"
+        self.source_file.write_text("content")
+
+
+if __name__ == "__main__":
+    unittest.main()
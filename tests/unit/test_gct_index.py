@@ -0,0 +1,124 @@
+"""
+test_gct_index.py
+
+testing module that tests the random access row index of compressed reads
+files.
+
+"""
+
+import gzip
+import random
+import unittest
+from pathlib import Path
+
+import file_meta
+import fixtures
+import gct_index
+import gtex_cache
+
+
+class RowIndexTest(fixtures.TempDirTestCase):
+    def test_random_access(self) -> None:
+        """Rows read through the index match the rows of the reads file and
+        only the block of the row is decompressed"""
+        row_index = gct_index.build_row_index(
+            self.index_path, self.reads_file, block_size=256
+        )
+        self.assertEqual(row_index.header, self.header)
+        self.assertEqual(len(row_index), len(self.rows))
+        self.assertGreater(len(row_index.blocks), 10)
+
+        for row in random.sample(self.rows, 10):
+            self.assertEqual(row_index.get_row(row[1]), row)
+            self.assertEqual(
+                row_index.get_counts(row[0], gene_col="Name").tolist(),
+                [int(n) for n in row[2:]],
+            )
+        self.assertEqual(
+            row_index.get_row("gene7", gene_col=None, ignore_case=True),
+            self.rows[7],
+        )
+        self.assertRaises(ValueError, row_index.get_row, "notfound")
+
+        # rows of a shared block are decompressed once
+        lines = row_index.read_lines([0, 1, len(self.rows) - 1])
+        self.assertEqual(lines[-1].decode().split("\t")[1], self.rows[-1][1])
+
+    def test_duplicated_gene_rows(self) -> None:
+        """All rows of a shared gene symbol are read from their blocks"""
+        self.rows[97][1] = "GENE3"
+        fixtures.write_reads_file(self.reads_file, self.header[2:], self.rows)
+
+        row_index = gct_index.build_row_index(
+            self.index_path, self.reads_file, block_size=256
+        )
+        self.assertEqual(list(row_index.gene_row_idxs("GENE3")), [3, 97])
+        self.assertEqual(
+            row_index.get_all_counts("gene3", ignore_case=True).tolist(),
+            [[int(n) for n in self.rows[idx][2:]] for idx in (3, 97)],
+        )
+        self.assertEqual(
+            row_index.get_all_counts("ENSG00097.1").tolist(),
+            [[int(n) for n in self.rows[97][2:]]],
+        )
+
+    def test_reblocked_file_content(self) -> None:
+        """The re-blocked copy decompresses to the original content"""
+        gct_index.build_row_index(
+            self.index_path, self.reads_file, block_size=256
+        )
+        with gzip.open(self.reads_file, "rb") as f:
+            content = f.read()
+        with gzip.open(self.index_path / "reads.gct.gz", "rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_reload_and_validity(self) -> None:
+        gct_index.build_row_index(self.index_path, self.reads_file)
+        self.assertTrue(
+            file_meta.is_build_valid(
+                self.index_path, self.reads_file, gct_index.INDEX_VERSION
+            )
+        )
+        # a row index is not a valid reads cache
+        self.assertFalse(
+            gtex_cache.is_cache_valid(self.index_path, self.reads_file)
+        )
+
+        row_index = gct_index.load_row_index(self.index_path)
+        self.assertEqual(row_index.get_row("GENE42"), self.rows[42])
+        self.assertRaises(
+            FileNotFoundError, gct_index.load_row_index, Path("notfound")
+        )
+
+    def test_malformed_rows(self) -> None:
+        """Malformed rows fail the build without leaving an index behind"""
+        with gzip.open(self.reads_file, "wt") as f:
+            f.write("#1.2\n1\t2\nName\tDescription\tS0\tS1\nENSG0\n")
+
+        self.assertRaises(
+            ValueError,
+            gct_index.build_row_index,
+            self.index_path,
+            self.reads_file,
+        )
+        self.assertFalse(self.index_path.exists())
+        self.assertFalse(Path(f"{self.index_path}.tmp").exists())
+
+    def setUp(self) -> None:
+        """Writing a compressed GCT file"""
+        super().setUp()
+        self.reads_file = self.tmp_path("test_index_reads.gct.gz")
+        self.index_dir = self.tmp_path("test_row_index")
+        self.index_path = gct_index.row_index_path_for(
+            self.reads_file, self.index_dir
+        )
+
+        samples = fixtures.make_samples(8)
+        self.header = ["Name", "Description"] + samples
+        genes = [f"GENE{idx}" for idx in range(100)]
+        self.rows = fixtures.make_rows(genes, len(samples))
+        fixtures.write_reads_file(self.reads_file, samples, self.rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+test_gene_index.py
+
+testing module that tests exact, case-insensitive and prefix gene lookups.
+
+"""
+import unittest
+
+from gene_index import GeneIndex
+from gene_index import strip_version
+
+
+class GeneIndexTest(unittest.TestCase):
+    def test_strip_version(self) -> None:
+        self.assertEqual(strip_version("ENSG00000223972.5"), "ENSG00000223972")
+        self.assertEqual(strip_version("ENSG00000223972"), "ENSG00000223972")
+        self.assertEqual(strip_version("RP11-34P13.3A"), "RP11-34P13.3A")
+
+    def test_exact_lookup(self) -> None:
+        """Symbols and Ensembl IDs with or without version are found"""
+        self.assertEqual(self.gene_index.lookup("BRCA1"), 1)
+        self.assertEqual(self.gene_index.lookup("ENSG00002.3"), 2)
+        self.assertEqual(self.gene_index.lookup("ENSG00002"), 2)
+        self.assertEqual(self.gene_index.lookup("ENSG00002.9", "Name"), 2)
+
+        # duplicated gene symbols return the first row
+        self.assertEqual(self.gene_index.lookup("ACTA2"), 0)
+
+        self.assertRaises(ValueError, self.gene_index.lookup, "brca1")
+        self.assertRaises(
+            ValueError, self.gene_index.lookup, "BRCA1", gene_col="Name"
+        )
+        self.assertRaises(
+            ValueError, self.gene_index.lookup, "BRCA1", gene_col="Nope"
+        )
+        self.assertIn("TP53", self.gene_index)
+        self.assertNotIn("notfound", self.gene_index)
+
+    def test_case_insensitive_lookup(self) -> None:
+        self.assertEqual(self.gene_index.lookup("brca1", ignore_case=True), 1)
+        self.assertEqual(
+            self.gene_index.lookup("ensg00004.1", ignore_case=True), 4
+        )
+
+        # exact matches are preferred over case-insensitive matches
+        self.assertEqual(self.gene_index.lookup("Tp53", ignore_case=True), 5)
+        self.assertEqual(self.gene_index.lookup("TP53", ignore_case=True), 2)
+
+    def test_prefix_lookup(self) -> None:
+        """Symbols that only differ by case are listed once"""
+        self.assertEqual(self.gene_index.find_prefix("tp"), [2])
+        self.assertEqual(self.gene_index.find_prefix("TP", limit=1), [2])
+        self.assertEqual(self.gene_index.find_prefix("A"), [0])
+        self.assertEqual(self.gene_index.find_prefix("x"), [])
+
+        # versioned and unversioned IDs of a row are listed once
+        self.assertEqual(
+            self.gene_index.find_prefix("ensg0000", gene_col="Name"),
+            [0, 1, 2, 3, 4, 5],
+        )
+
+    def setUp(self) -> None:
+        descriptions = ["ACTA2", "BRCA1", "TP53", "ACTA2", "MYH7", "Tp53"]
+        names = [
+            f"ENSG{idx:05d}.{idx + 1}" for idx in range(len(descriptions))
+        ]
+        self.gene_index = GeneIndex(names, descriptions)
+
+
+if __name__ == "__main__":
+    unittest.main()
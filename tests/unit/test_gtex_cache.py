@@ -0,0 +1,117 @@
+"""
+test_gtex_cache.py
+
+testing module that tests building, reloading and invalidating the binary
+gene reads cache.
+
+"""
+import os
+import unittest
+
+import fixtures
+import gtex_cache
+import plot_gtex
+
+
+class ReadsCacheTest(fixtures.TempDirTestCase):
+    def build_cache(self) -> gtex_cache.ReadsCache:
+        header = plot_gtex.load_reads_header(self.reads_file)
+        return gtex_cache.build_reads_cache(
+            self.cache_path,
+            self.reads_file,
+            header,
+            plot_gtex.iter_parsed_reads(self.reads_file),
+        )
+
+    def test_build_and_reload(self) -> None:
+        """Cached rows match the rows of the reads file"""
+        built_cache = self.build_cache()
+        loaded_cache = gtex_cache.load_reads_cache(self.cache_path)
+
+        for cache in (built_cache, loaded_cache):
+            self.assertEqual(cache.header, self.header)
+            self.assertEqual(len(cache), len(self.rows))
+            self.assertEqual(cache.get_row("BRCA1"), self.rows[1])
+            self.assertEqual(
+                cache.get_row("ENSG00004.1", gene_col="Name"), self.rows[4]
+            )
+
+            # duplicated gene symbols return the first row
+            self.assertEqual(cache.get_row("ACTA2"), self.rows[0])
+            self.assertRaises(ValueError, cache.get_row, "notfound")
+
+            # the gene index matches any case and gene column
+            self.assertEqual(
+                cache.get_row("ensg00004", gene_col=None, ignore_case=True),
+                self.rows[4],
+            )
+            self.assertEqual(cache.find_genes("brc"), [self.rows[1][:2]])
+
+    def test_cache_validity(self) -> None:
+        """Caches become stale when the reads file content changes"""
+        self.assertFalse(
+            gtex_cache.is_cache_valid(self.cache_path, self.reads_file)
+        )
+        self.build_cache()
+        self.assertTrue(
+            gtex_cache.is_cache_valid(self.cache_path, self.reads_file)
+        )
+
+        # new mtime with the same content is still valid
+        stats = os.stat(self.reads_file)
+        os.utime(self.reads_file, ns=(stats.st_atime_ns, 0))
+        self.assertTrue(
+            gtex_cache.is_cache_valid(self.cache_path, self.reads_file)
+        )
+
+        # new content is stale
+        self.rows[0][2] += 1
+        self.write_reads_file()
+        os.utime(self.reads_file, ns=(stats.st_atime_ns, 1))
+        self.assertFalse(
+            gtex_cache.is_cache_valid(self.cache_path, self.reads_file)
+        )
+
+        rebuilt_cache = self.build_cache()
+        self.assertEqual(rebuilt_cache.get_row("ACTA2"), self.rows[0])
+
+    def test_non_integer_counts(self) -> None:
+        """Malformed counts fail the build without leaving a cache behind"""
+        self.rows[2][3] = "not_a_count"
+        self.write_reads_file()
+
+        self.assertRaises(ValueError, self.build_cache)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_out_of_range_counts(self) -> None:
+        """Counts that do not fit in uint32 fail the build instead of being
+        wrapped around"""
+        for count in (-1, 2**32):
+            self.rows[2][3] = count
+            self.write_reads_file()
+
+            self.assertRaises(ValueError, self.build_cache)
+            self.assertFalse(os.path.exists(self.cache_path))
+
+    def write_reads_file(self) -> None:
+        fixtures.write_reads_file(self.reads_file, self.header[2:], self.rows)
+
+    def setUp(self) -> None:
+        """Writing a small compressed GCT file"""
+        super().setUp()
+        self.reads_file = self.tmp_path("test_cache_reads.gct.gz")
+        self.cache_dir = self.tmp_path("test_cache_dir")
+        self.cache_path = gtex_cache.cache_path_for(
+            self.reads_file, self.cache_dir
+        )
+
+        samples = fixtures.make_samples(8)
+        self.header = ["Name", "Description"] + samples
+        self.rows = fixtures.make_rows(
+            fixtures.GENES, len(samples), count_type=int
+        )
+        self.write_reads_file()
+
+
+if __name__ == "__main__":
+    unittest.main()
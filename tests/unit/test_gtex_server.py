@@ -0,0 +1,203 @@
+"""
+test_gtex_server.py
+
+testing module that tests the plot_gtex query server and its client with a
+small synthetic dataset.
+
+"""
+
+import os
+import threading
+import unittest
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import fixtures
+import gtex_server
+
+
+class GTExServerTest(fixtures.TempDirTestCase):
+    def test_dataset_grouped_counts(self) -> None:
+        """Grouped counts of the resident dataset match the reads file"""
+        grouped_counts, stats = self.dataset.grouped_counts("BRCA1")
+        counts = {name: counts.tolist() for name, counts in grouped_counts}
+        self.assertEqual([s["label"] for s in stats], ["Blood", "Brain"])
+
+        row = self.rows[1][2:]
+        self.assertEqual(counts["Blood"], [row[0], row[2]])
+        self.assertEqual(counts["Brain"], [row[1], row[3]])
+
+        grouped_counts, _ = self.dataset.grouped_counts("BRCA1", "SMCENTER")
+        self.assertEqual([name for name, _ in grouped_counts], ["B1", "B2"])
+
+        self.assertRaises(ValueError, self.dataset.grouped_counts, "notfound")
+        self.assertRaises(
+            ValueError, self.dataset.grouped_counts, "BRCA1", "notfound"
+        )
+
+    def test_filter_stat_and_duplicate_genes(self) -> None:
+        """Groups are filtered on any statistic and the rows of a shared
+        gene symbol are summed on request"""
+        row = self.rows[2][2:]
+        max_count = max(row)
+        grouped_counts, _ = self.dataset.grouped_counts(
+            "TP53", threshold=max_count, filter_stat="whishi"
+        )
+        self.assertEqual(len(grouped_counts), 1)
+
+        grouped_counts, _ = self.dataset.grouped_counts(
+            "ACTA2", duplicate_genes="sum"
+        )
+        counts = {name: counts.tolist() for name, counts in grouped_counts}
+        summed = [a + b for a, b in zip(self.rows[0][2:], self.rows[3][2:])]
+        self.assertEqual(counts["Blood"], [summed[0], summed[2]])
+
+    def test_group_column_with_empty_cells(self) -> None:
+        """Rows whose trailing group cells are empty are grouped under an
+        empty group name instead of failing the request"""
+        server = gtex_server.make_server(self.dataset, port=0, quiet=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_port
+
+        try:
+            response = gtex_server.query(
+                "counts", {"gene": "TP53", "group_by": "EXTRA"}, port=port
+            )
+            groups = {g["group"]: g["counts"] for g in response["groups"]}
+            self.assertEqual(sorted(groups), ["", "x"])
+            self.assertEqual(
+                self.status(
+                    port, "counts", {"gene": "TP53", "filter_stat": "max"}
+                ),
+                400,
+            )
+            self.assertEqual(
+                self.status(
+                    port, "counts", {"gene": "TP53", "duplicate_genes": "all"}
+                ),
+                400,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_server_queries(self) -> None:
+        """Counts queries are answered by a running server"""
+        server = gtex_server.make_server(self.dataset, port=0, quiet=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_port
+
+        try:
+            health = gtex_server.query("health", {}, port=port)
+            self.assertEqual(health["n_genes"], len(self.rows))
+
+            response = gtex_server.query(
+                "counts", {"gene": "TP53", "threshold": 0}, port=port
+            )
+            groups = {g["group"]: g["counts"] for g in response["groups"]}
+            self.assertEqual(
+                groups["Blood"], [self.rows[2][2], self.rows[2][4]]
+            )
+
+            # genes are matched ignoring case, or listed by prefix
+            response = gtex_server.query("counts", {"gene": "tp53"}, port=port)
+            self.assertEqual(response["gene"], "tp53")
+            response = gtex_server.query("genes", {"prefix": "b"}, port=port)
+            self.assertEqual(
+                response["genes"], [{"name": "ENSG1", "description": "BRCA1"}]
+            )
+
+            self.assertRaises(
+                ValueError,
+                gtex_server.query,
+                "counts",
+                {"gene": "notfound"},
+                port=port,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_plot_queries(self) -> None:
+        """Plots are saved within the plot directory, malformed parameters
+        are rejected with a client error"""
+        plot_dir = self.tmp_path("plots")
+        server = gtex_server.make_server(
+            self.dataset, port=0, quiet=True, plot_dir=plot_dir
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_port
+
+        try:
+            response = gtex_server.query(
+                "plot",
+                {"gene": "TP53", "output_file": "tp53.png"},
+                port=port,
+            )
+            output_file = os.path.join(os.path.realpath(plot_dir), "tp53.png")
+            self.assertEqual(response["output_file"], output_file)
+            self.assertTrue(os.path.exists(output_file))
+
+            bad_params = [
+                {"output_file": "../tp53.png"},
+                {"output_file": "/tmp/tp53.png"},
+                {"fig_width": "wide"},
+                {"threshold": "high"},
+            ]
+            for params in bad_params:
+                params["gene"] = "TP53"
+                self.assertEqual(self.status(port, "plot", params), 400)
+            self.assertEqual(
+                self.status(port, "plot", {"gene": "notfound"}), 404
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def status(self, port: int, endpoint: str, params: dict) -> int:
+        """Returns the HTTP status code of a query"""
+        query_string = urllib.parse.urlencode(params)
+        url = f"http://127.0.0.1:{port}/{endpoint}?{query_string}"
+        try:
+            with urllib.request.urlopen(url) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def setUp(self) -> None:
+        """Writing a small reads and sample attributes files"""
+        super().setUp()
+        self.reads_file = self.tmp_path("test_server_reads.gct.gz")
+        self.sample_file = self.tmp_path("test_server_samples.txt")
+
+        samples = fixtures.make_samples(4)
+        self.rows = fixtures.make_rows(
+            ["ACTA2", "BRCA1", "TP53", "ACTA2"],
+            len(samples),
+            name_format="ENSG{idx}",
+            count_type=int,
+        )
+        fixtures.write_reads_file(self.reads_file, samples, self.rows)
+        fixtures.write_sample_file(
+            self.sample_file,
+            [
+                ["SAMPID", "SMCENTER", "SMTS", "EXTRA"],
+                ["GTEX-0", "B1", "Blood", "x"],
+                ["GTEX-1", "B1", "Brain", ""],
+                ["GTEX-2", "B2", "Blood", "x"],
+                ["GTEX-3", "B2", "Brain", ""],
+                ["GTEX-NORNA", "B2", "Brain", ""],
+            ],
+        )
+
+        self.dataset = gtex_server.GTExDataset(
+            self.reads_file, self.sample_file
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+test_pipeline.py
+
+testing module that tests the asyncio pipeline of plot_gtex against the
+sequential run.
+
+"""
+
+import os
+import io
+import unittest
+from contextlib import redirect_stdout
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import fixtures
+import plot_gtex
+from profiling import StageProfiler
+
+
+class PipelineTest(fixtures.TempDirTestCase):
+    def run_plot_gtex(self, *argv: str) -> Tuple[List[Dict[str, Any]], str]:
+        args = plot_gtex.parse_args(
+            [
+                "-gr",
+                self.reads_file,
+                "-s",
+                self.sample_file,
+                "-gs",
+                "TP53,notfound,ACTA2",
+                "-o",
+                self.output_file,
+                "-wt",
+                "3",
+                "-ht",
+                "2",
+            ]
+            + list(argv)
+        )
+        with redirect_stdout(io.StringIO()) as stdout:
+            plot_results = plot_gtex.run(args)
+        return plot_results, stdout.getvalue()
+
+    def test_same_export(self) -> None:
+        """The pipeline exports the same counts as the sequential run"""
+        exports = []
+        for argv in ([], ["--pipeline"]):
+            plot_results, stdout = self.run_plot_gtex(
+                "--no_plot", "-f", "tsv", *argv
+            )
+            self.assertEqual(plot_results, [])
+            self.assertIn("Unable to find notfound gene", stdout)
+            with open(self.export_file) as f:
+                exports.append(sorted(f))
+
+        self.assertEqual(exports[0], exports[1])
+        self.assertEqual(len(exports[0]), 1 + 2 * 4)
+
+    def test_plots_in_gene_order(self) -> None:
+        """Plots are rendered while genes stream in and are reported in the
+        order of the genes of interest"""
+        plot_results, stdout = self.run_plot_gtex("--pipeline")
+
+        self.assertEqual(
+            [result["gene_name"] for result in plot_results], ["TP53", "ACTA2"]
+        )
+        for result in plot_results:
+            self.assertTrue(os.path.exists(result["output_file"]))
+            self.assertEqual(
+                os.path.dirname(result["output_file"]), str(self.tmp_dir)
+            )
+            self.assertIn(result["output_file"], stdout)
+
+    def test_profiled_stages(self) -> None:
+        """Every stage of the pipeline is recorded by the profiler"""
+        args = plot_gtex.parse_args(
+            [
+                "-gr",
+                self.reads_file,
+                "-s",
+                self.sample_file,
+                "-gs",
+                "TP53,ACTA2",
+                "-o",
+                self.output_file,
+                "-f",
+                "tsv",
+                "--no_plot",
+                "--pipeline",
+            ]
+        )
+        profiler = StageProfiler(trace_memory=False)
+        with redirect_stdout(io.StringIO()):
+            plot_gtex.run(args, profiler)
+
+        calls = {t["stage"]: t["calls"] for t in profiler.totals()}
+        for stage in (
+            "pipeline",
+            "load_samples",
+            "join_samples",
+            "decompress",
+            "parse_counts",
+            "filter",
+        ):
+            self.assertIn(stage, calls)
+        self.assertEqual(calls["stream_gene_counts"], 3)
+        self.assertEqual(calls["export"], 3)
+
+    def test_no_genes_found(self) -> None:
+        args = plot_gtex.parse_args(
+            [
+                "-gr",
+                self.reads_file,
+                "-s",
+                self.sample_file,
+                "-g",
+                "notfound",
+                "-o",
+                self.output_file,
+                "--pipeline",
+            ]
+        )
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                plot_gtex.run(args)
+
+    def setUp(self) -> None:
+        """Writing small reads and sample attributes files"""
+        super().setUp()
+        self.reads_file = self.tmp_path("test_pipeline_reads.gct.gz")
+        self.sample_file = self.tmp_path("test_pipeline_samples.txt")
+        self.output_file = self.tmp_path("test_pipeline.png")
+        self.export_file = self.tmp_path("test_pipeline.tsv")
+
+        samples = fixtures.make_samples(4)
+        rows = fixtures.make_rows(
+            ["ACTA2", "BRCA1", "TP53"], len(samples), name_format="ENSG{idx}"
+        )
+        fixtures.write_reads_file(self.reads_file, samples, rows)
+        fixtures.write_sample_file(
+            self.sample_file,
+            [["SAMPID", "SMTS"]]
+            + [
+                [sample, ["Blood", "Brain"][idx % 2]]
+                for idx, sample in enumerate(samples)
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
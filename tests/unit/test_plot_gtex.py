@@ -0,0 +1,311 @@
+"""
+test_plot_gtex.py
+
+testing module that tests the loading functions of plot_gtex with a small
+synthetic gene reads file.
+
+"""
+
+import os
+import sys
+import subprocess
+import unittest
+
+import numpy as np
+
+import fixtures
+import plot_gtex
+from profiling import StageProfiler
+
+
+class ReadsLoadingTest(fixtures.TempDirTestCase):
+    def test_load_reads_header(self) -> None:
+        """Only the column names of the reads file are returned"""
+        header = plot_gtex.load_reads_header(self.reads_file)
+        self.assertEqual(header, ["Name", "Description"] + self.samples)
+
+    def test_iter_reads_all_rows(self) -> None:
+        """Streaming all rows returns the same entries as load_reads"""
+        header, entries = plot_gtex.load_reads(self.reads_file)
+        streamed_entries = list(plot_gtex.iter_reads(self.reads_file))
+
+        self.assertEqual(header, ["Name", "Description"] + self.samples)
+        self.assertEqual(streamed_entries, entries)
+        self.assertEqual(entries, self.rows)
+
+    def test_iter_reads_selected_genes(self) -> None:
+        """Only requested genes are yielded, by Description or Name"""
+        entries = list(
+            plot_gtex.iter_reads(self.reads_file, genes=["TP53", "ACTA2"])
+        )
+        self.assertEqual(entries, [self.rows[0], self.rows[2]])
+
+        entries = list(
+            plot_gtex.iter_reads(
+                self.reads_file, genes=["ENSG00003.1"], gene_col="Name"
+            )
+        )
+        self.assertEqual(entries, [self.rows[3]])
+
+        entries = list(
+            plot_gtex.iter_reads(self.reads_file, genes=["notfound"])
+        )
+        self.assertEqual(entries, [])
+
+    def test_iter_reads_stops_early(self) -> None:
+        """Reading stops once all requested genes are found"""
+        reads = plot_gtex.iter_reads(self.reads_file, genes=["ACTA2"])
+        self.assertEqual(next(reads), self.rows[0])
+        self.assertRaises(StopIteration, next, reads)
+
+    def test_iter_parsed_reads(self) -> None:
+        """Parallel parsing returns the same rows in the same order as serial
+        parsing"""
+        serial_rows = list(plot_gtex.iter_parsed_reads(self.reads_file))
+        parallel_rows = list(
+            plot_gtex.iter_parsed_reads(
+                self.reads_file, workers=2, block_size=2
+            )
+        )
+
+        self.assertEqual(len(serial_rows), len(self.rows))
+        self.assertEqual(len(parallel_rows), len(self.rows))
+        for row, serial_row, parallel_row in zip(
+            self.rows, serial_rows, parallel_rows
+        ):
+            for name, description, counts in (serial_row, parallel_row):
+                self.assertEqual([name, description], row[:2])
+                self.assertEqual(counts.tolist(), [int(n) for n in row[2:]])
+
+    def test_load_gene_counts(self) -> None:
+        """All requested genes are collected in one pass as integer arrays,
+        duplicated symbols keep their first row and missing genes are left
+        out"""
+        gene_counts = plot_gtex.load_gene_counts(
+            self.reads_file, ["MYH7", "ACTA2", "notfound"]
+        )
+
+        self.assertEqual(list(gene_counts), ["ACTA2", "MYH7"])
+        for gene, row in (("ACTA2", self.rows[0]), ("MYH7", self.rows[4])):
+            counts = gene_counts[gene]
+            self.assertTrue(np.issubdtype(counts.dtype, np.integer))
+            self.assertEqual(counts.tolist(), [int(n) for n in row[2:]])
+
+    def test_load_gene_counts_duplicates(self) -> None:
+        """Counts of the rows that share a gene symbol are summed, with and
+        without a reads matrix"""
+        expected = [
+            int(first) + int(second)
+            for first, second in zip(self.rows[0][2:], self.rows[3][2:])
+        ]
+        matrix = plot_gtex.load_reads_matrix(self.reads_file)
+
+        for reads_cache in (None, matrix):
+            gene_counts = plot_gtex.load_gene_counts(
+                self.reads_file, ["ACTA2", "TP53"], reads_cache, "sum"
+            )
+            self.assertEqual(gene_counts["ACTA2"].tolist(), expected)
+            self.assertEqual(
+                gene_counts["TP53"].tolist(),
+                [int(n) for n in self.rows[2][2:]],
+            )
+
+            gene_counts = plot_gtex.load_gene_counts(
+                self.reads_file, ["ACTA2"], reads_cache, "first"
+            )
+            self.assertEqual(
+                gene_counts["ACTA2"].tolist(),
+                [int(n) for n in self.rows[0][2:]],
+            )
+
+    def test_profiled_streaming(self) -> None:
+        """Decompression and parsing of the streaming pass are recorded as
+        separate stages, and small blocks give the same counts"""
+        profiler = StageProfiler(trace_memory=False)
+        gene_counts = plot_gtex.load_gene_counts(
+            self.reads_file, ["MYH7", "ACTA2"], profiler=profiler
+        )
+        calls = {t["stage"]: t["calls"] for t in profiler.totals()}
+        self.assertEqual(sorted(calls), ["decompress", "parse_counts"])
+        self.assertEqual(
+            gene_counts["MYH7"].tolist(), [int(n) for n in self.rows[4][2:]]
+        )
+
+        blocks = list(
+            plot_gtex._iter_read_blocks(self.reads_file, block_size=1)
+        )
+        self.assertEqual(len(blocks), len(self.rows))
+
+    def test_streamed_duplicates_last_row(self) -> None:
+        """The streaming pass sums a symbol shared with the last row of the
+        file and stops at the first row without summing"""
+        last_row = ["ENSG99999.1", "TP53"] + self.rows[2][2:]
+        fixtures.write_reads_file(
+            self.reads_file, self.samples, self.rows + [last_row]
+        )
+        counts = [int(n) for n in self.rows[2][2:]]
+
+        summed = plot_gtex._iter_streamed_gene_counts(
+            self.reads_file, ["TP53"], sum_rows=True
+        )
+        self.assertEqual(
+            [(gene, c.tolist()) for gene, c in summed],
+            [("TP53", [2 * n for n in counts])],
+        )
+
+        first = plot_gtex._iter_streamed_gene_counts(
+            self.reads_file, ["TP53"], sum_rows=False
+        )
+        gene, first_counts = next(first)
+        self.assertEqual((gene, first_counts.tolist()), ("TP53", counts))
+        self.assertRaises(StopIteration, next, first)
+
+    def test_streamed_short_rows(self) -> None:
+        """Blank and truncated rows are skipped by the streaming pass"""
+        rows = self.rows[:2] + [[""], ["ENSG99999.1"]] + self.rows[2:]
+        fixtures.write_reads_file(self.reads_file, self.samples, rows)
+
+        for duplicate_genes in plot_gtex.DUPLICATE_GENES:
+            gene_counts = plot_gtex.load_gene_counts(
+                self.reads_file, ["MYH7", "ENSG99999"], None, duplicate_genes
+            )
+            self.assertEqual(list(gene_counts), ["MYH7"])
+            self.assertEqual(
+                gene_counts["MYH7"].tolist(),
+                [int(n) for n in self.rows[4][2:]],
+            )
+
+    def test_streamed_gene_matching(self) -> None:
+        """Without a cache, genes are matched like the gene index: by symbol
+        or Ensembl ID (with or without version) in any case, and counts are
+        keyed by the requested gene"""
+        genes = ["acta2", "ENSG00002", "ensg00004.1", "BRCA1", "notfound"]
+        matrix = plot_gtex.load_reads_matrix(self.reads_file)
+
+        for duplicate_genes in plot_gtex.DUPLICATE_GENES:
+            streamed = plot_gtex.load_gene_counts(
+                self.reads_file, genes, None, duplicate_genes
+            )
+            cached = plot_gtex.load_gene_counts(
+                self.reads_file, genes, matrix, duplicate_genes
+            )
+
+            self.assertEqual(sorted(streamed), sorted(genes[:4]))
+            for gene in genes[:4]:
+                self.assertEqual(
+                    streamed[gene].tolist(), cached[gene].tolist()
+                )
+            self.assertEqual(
+                streamed["ENSG00002"].tolist(),
+                [int(n) for n in self.rows[2][2:]],
+            )
+
+    def test_collect_grouped_counts(self) -> None:
+        """Counts are gathered from the resolved sample columns of every
+        group"""
+        header = plot_gtex.load_reads_header(self.reads_file)
+        sample_groups = [
+            ("GTEX-0", "Blood"),
+            ("GTEX-1", "Brain"),
+            ("GTEX-2", "Blood"),
+            ("notfound", "Blood"),
+            ("notfound", "Lung"),
+        ]
+
+        group_count_idxs, _ = plot_gtex.join_sample_columns(
+            sample_groups, header
+        )
+        gene_counts = np.asarray(self.rows[1][2:], dtype=np.int64)
+        grouped_counts = plot_gtex.collect_grouped_counts(
+            gene_counts, group_count_idxs
+        )
+
+        row = self.rows[1]
+        self.assertEqual(
+            [[name, counts.tolist()] for name, counts in grouped_counts],
+            [
+                ["Blood", [int(row[2]), int(row[4])]],
+                ["Brain", [int(row[3])]],
+                ["Lung", []],
+            ],
+        )
+
+    def test_join_sample_columns(self) -> None:
+        """Samples are joined with the reads file columns in one pass,
+        samples without a column are counted as unmatched"""
+        header = plot_gtex.load_reads_header(self.reads_file)
+        sample_groups = [
+            ("GTEX-0", "Blood"),
+            ("notfound", "Lung"),
+            ("GTEX-1", "Brain"),
+            ("GTEX-2", "Blood"),
+            ("notfound2", "Blood"),
+        ]
+
+        group_count_idxs, join_counts = plot_gtex.join_sample_columns(
+            sample_groups, header
+        )
+        self.assertEqual(
+            [[name, idxs.tolist()] for name, idxs in group_count_idxs],
+            [["Blood", [0, 2]], ["Lung", []], ["Brain", [1]]],
+        )
+        self.assertEqual(join_counts, {"matched": 3, "unmatched": 2})
+
+        # the attributes header is never matched with the Name column
+        _, join_counts = plot_gtex.join_sample_columns(
+            [("Name", "Blood")], header
+        )
+        self.assertEqual(join_counts["unmatched"], 1)
+
+    def test_lazy_imports(self) -> None:
+        """Importing plot_gtex does not import matplotlib, numpy or the
+        reads caches"""
+        modules = ["matplotlib", "numpy", "gtex_cache", "gct_index"]
+        code = (
+            "import sys, plot_gtex; "
+            f"print([m in sys.modules for m in {modules}])"
+        )
+        process = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(os.path.abspath(plot_gtex.__file__)),
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(process.stdout.strip(), str([False] * len(modules)))
+
+    def test_gene_output_path(self) -> None:
+        """Plot names only change when multiple genes are plotted"""
+        self.assertEqual(
+            plot_gtex.gene_output_path("out/plot.png", "ACTA2", 1),
+            "out/plot.png",
+        )
+        self.assertEqual(
+            plot_gtex.gene_output_path("out/plot.png", "ACTA2", 2),
+            os.path.join("out", "plot_ACTA2.png"),
+        )
+        self.assertEqual(
+            plot_gtex.gene_output_path("{gene}_counts.png", "TP53", 2),
+            "TP53_counts.png",
+        )
+
+    def test_export_output_path(self) -> None:
+        self.assertEqual(
+            plot_gtex.export_output_path("out/plot.png", "tsv"),
+            os.path.join("out", "plot.tsv"),
+        )
+        self.assertEqual(
+            plot_gtex.export_output_path("{gene}_counts.png", "npz"),
+            "genes_counts.npz",
+        )
+
+    def setUp(self) -> None:
+        """Writing a small compressed GCT file"""
+        super().setUp()
+        self.reads_file = self.tmp_path("test_reads.gct.gz")
+        self.samples = fixtures.make_samples(6)
+        self.rows = fixtures.make_rows(fixtures.GENES, len(self.samples))
+        fixtures.write_reads_file(self.reads_file, self.samples, self.rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
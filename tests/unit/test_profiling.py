@@ -0,0 +1,101 @@
+"""
+test_profiling.py
+
+testing module that tests the stage profiler used by plot_gtex.
+
+"""
+import json
+import unittest
+from contextlib import contextmanager
+
+import fixtures
+from profiling import NULL_PROFILER
+from profiling import StageProfiler
+
+
+class StageProfilerTest(fixtures.TempDirTestCase):
+    def test_records_stages(self) -> None:
+        """Every stage is recorded and totals are combined per stage"""
+        profiler = StageProfiler()
+        with profiler.stage("load"):
+            data = [i for i in range(10000)]
+        for _ in range(3):
+            with profiler.stage("render"):
+                sum(data)
+
+        self.assertEqual(len(profiler.records), 4)
+        totals = profiler.totals()
+        self.assertEqual([t["stage"] for t in totals], ["load", "render"])
+        self.assertEqual([t["calls"] for t in totals], [1, 3])
+        self.assertGreater(totals[0]["peak_traced_mb"], 0)
+        self.assertIn("render", profiler.summary())
+
+    def test_nested_stage_peaks(self) -> None:
+        """A nested stage does not wipe the memory peak of its parent"""
+        profiler = StageProfiler()
+        with profiler.stage("outer"):
+            data = bytearray(8 * 1024**2)
+            del data
+            with profiler.stage("inner"):
+                pass
+
+        records = {record["stage"]: record for record in profiler.records}
+        self.assertGreaterEqual(records["outer"]["peak_traced_mb"], 8)
+        self.assertLess(records["inner"]["peak_traced_mb"], 8)
+
+    def test_stage_recorded_on_error(self) -> None:
+        """Stages that raise are still recorded"""
+        profiler = StageProfiler(trace_memory=False)
+        with self.assertRaises(ValueError):
+            with profiler.stage("fails"):
+                raise ValueError
+
+        self.assertEqual(profiler.records[0]["stage"], "fails")
+        self.assertIsNone(profiler.records[0]["peak_traced_mb"])
+
+    def test_hooks(self) -> None:
+        """Hooks are entered and exited around every stage"""
+        events = []
+
+        @contextmanager
+        def hook(stage_name):
+            events.append(("start", stage_name))
+            yield
+            events.append(("stop", stage_name))
+
+        profiler = StageProfiler(trace_memory=False)
+        profiler.add_hook(hook)
+        with profiler.stage("load"):
+            events.append(("run", "load"))
+
+        self.assertEqual(
+            events, [("start", "load"), ("run", "load"), ("stop", "load")]
+        )
+
+    def test_null_profiler(self) -> None:
+        """Disabled profiling records nothing and reuses one context"""
+        self.assertFalse(NULL_PROFILER.enabled)
+        self.assertIs(NULL_PROFILER.stage("a"), NULL_PROFILER.stage("b"))
+        with NULL_PROFILER.stage("a"):
+            pass
+
+    def test_write_json(self) -> None:
+        """Profiles are written as JSON"""
+        profiler = StageProfiler(trace_memory=False)
+        with profiler.stage("load"):
+            pass
+
+        profiler.write_json(self.json_file)
+        with open(self.json_file, "r") as f:
+            trace = json.load(f)
+
+        self.assertEqual(trace["stages"][0]["stage"], "load")
+        self.assertEqual(trace["totals"][0]["calls"], 1)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.json_file = self.tmp_path("test_profile.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+test_reads_matrix.py
+
+testing module that tests the in-memory uint32 gene reads matrix.
+
+"""
+import unittest
+
+import numpy as np
+
+import fixtures
+import plot_gtex
+from reads_matrix import ReadsMatrix
+from reads_matrix import ReadsRow
+
+
+class ReadsMatrixTest(fixtures.TempDirTestCase):
+    def test_load_reads_matrix(self) -> None:
+        """Counts are stored once as uint32, rows match the reads file"""
+        for workers in (1, 2):
+            matrix = plot_gtex.load_reads_matrix(self.reads_file, workers)
+
+            self.assertEqual(matrix.counts.dtype, np.uint32)
+            self.assertEqual(matrix.counts.shape, (len(self.rows), 6))
+            self.assertEqual(matrix.nbytes, len(self.rows) * 6 * 4)
+            self.assertEqual(matrix.sample_ids, self.samples)
+            self.assertEqual(
+                [row.to_list() for row in matrix],
+                [row[:2] + [int(n) for n in row[2:]] for row in self.rows],
+            )
+
+    def test_gene_and_sample_accessors(self) -> None:
+        matrix = plot_gtex.load_reads_matrix(self.reads_file)
+
+        row = matrix.gene("BRCA1")
+        self.assertIsInstance(row, ReadsRow)
+        self.assertEqual(row.name, "ENSG00001.1")
+        self.assertEqual(len(row), 6)
+        self.assertEqual(
+            row.counts.tolist(), [int(n) for n in self.rows[1][2:]]
+        )
+        self.assertFalse(hasattr(row, "__dict__"))
+
+        # duplicated gene symbols return the first row
+        self.assertEqual(matrix.gene("ACTA2").row_idx, 0)
+        self.assertEqual(matrix.row(-1).description, "MYH7")
+        self.assertRaises(IndexError, matrix.row, len(self.rows))
+        self.assertEqual(
+            matrix.get_row("tp53", gene_col=None, ignore_case=True)[0],
+            "ENSG00002.1",
+        )
+        self.assertRaises(ValueError, matrix.gene, "notfound")
+
+        self.assertEqual(
+            matrix.sample_counts("GTEX-3").tolist(),
+            [int(row[5]) for row in self.rows],
+        )
+        self.assertRaises(ValueError, matrix.sample_counts, "notfound")
+
+    def test_duplicated_gene_rows(self) -> None:
+        """Gene symbols shared by several rows return all of their rows,
+        Ensembl IDs return their own row"""
+        matrix = plot_gtex.load_reads_matrix(self.reads_file)
+
+        self.assertEqual(list(matrix.gene_row_idxs("ACTA2")), [0, 3])
+        self.assertEqual(
+            list(matrix.gene_row_idxs("acta2", ignore_case=True)), [0, 3]
+        )
+        self.assertEqual(list(matrix.gene_row_idxs("ENSG00003")), [3])
+        self.assertEqual(list(matrix.gene_row_idxs("TP53")), [2])
+        self.assertRaises(
+            ValueError, matrix.gene_row_idxs, "ENSG00003", "Description"
+        )
+
+        counts = matrix.get_all_counts("ACTA2")
+        self.assertEqual(
+            counts.tolist(),
+            [[int(n) for n in self.rows[idx][2:]] for idx in (0, 3)],
+        )
+
+    def test_from_rows_validation(self) -> None:
+        header = ["Name", "Description", "S0", "S1"]
+        matrix = ReadsMatrix.from_rows(header, [])
+        self.assertEqual(matrix.counts.shape, (0, 2))
+
+        # the buffer grows past its initial capacity
+        rows = [(f"ENSG{i}", f"G{i}", [i, i + 1]) for i in range(3000)]
+        matrix = ReadsMatrix.from_rows(header, rows)
+        self.assertEqual(matrix.counts.shape, (3000, 2))
+        self.assertEqual(matrix.get_counts("G2999").tolist(), [2999, 3000])
+
+        with self.assertRaises(ValueError):
+            ReadsMatrix.from_rows(header, [("ENSG0", "G0", [1, 2, 3])])
+        with self.assertRaises(ValueError):
+            ReadsMatrix.from_rows(header, [("ENSG0", "G0", [1, -2])])
+        with self.assertRaises(ValueError):
+            ReadsMatrix.from_rows(header, [("ENSG0", "G0", [1, 2**32])])
+
+    def setUp(self) -> None:
+        """Writing a small compressed GCT file"""
+        super().setUp()
+        self.reads_file = self.tmp_path("test_matrix_reads.gct.gz")
+        self.samples = fixtures.make_samples(6)
+        self.rows = fixtures.make_rows(fixtures.GENES, len(self.samples))
+        fixtures.write_reads_file(self.reads_file, self.samples, self.rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
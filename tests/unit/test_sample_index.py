@@ -0,0 +1,99 @@
+"""
+test_sample_index.py
+
+testing module that tests the column-projecting sample attributes loader and
+its on-disk index.
+
+"""
+import os
+import unittest
+
+import fixtures
+import sample_index
+
+
+class SampleIndexTest(fixtures.TempDirTestCase):
+    def test_projected_columns(self) -> None:
+        """Only the sample id and group are returned, in file order"""
+        sample_groups = sample_index.load_sample_groups(
+            self.sample_file, use_index=False
+        )
+        self.assertEqual(sample_groups, self.expected)
+        self.assertFalse(os.path.exists(self.index_file))
+
+        sample_groups = sample_index.load_sample_groups(
+            self.sample_file, group_col="SMTSD", use_index=False
+        )
+        self.assertEqual(sample_groups[0], ("S0", "Whole Blood"))
+
+    def test_missing_column(self) -> None:
+        with self.assertRaises(ValueError):
+            sample_index.load_sample_groups(self.sample_file, group_col="NOPE")
+
+    def test_index_reused(self) -> None:
+        """The index is written on the first load and reused after"""
+        sample_index.load_sample_groups(self.sample_file)
+        self.assertTrue(os.path.exists(self.index_file))
+
+        # rewriting the stored groups shows that the file is not parsed again
+        index = sample_index._read_index(self.index_file)
+        index["groups"] = [group.upper() for group in index["groups"]]
+        sample_index._write_index(self.index_file, index)
+
+        sample_groups = sample_index.load_sample_groups(self.sample_file)
+        self.assertEqual(sample_groups[0], ("S0", "BLOOD"))
+
+    def test_appended_rows(self) -> None:
+        """Only appended rows are parsed, an unterminated row is returned
+        but parsed again once completed"""
+        sample_index.load_sample_groups(self.sample_file)
+        offset = sample_index._read_index(self.index_file)["offset"]
+
+        with open(self.sample_file, "a") as f:
+            f.write("S4\t0.1\tLung\tLung")
+        sample_groups = sample_index.load_sample_groups(self.sample_file)
+        self.assertEqual(sample_groups, self.expected + [("S4", "Lung")])
+        self.assertEqual(
+            sample_index._read_index(self.index_file)["offset"], offset
+        )
+
+        with open(self.sample_file, "a") as f:
+            f.write("\nS5\t0.2\tBrain\tBrain - Cortex\n")
+        sample_groups = sample_index.load_sample_groups(self.sample_file)
+        expected = self.expected + [("S4", "Lung"), ("S5", "Brain")]
+        self.assertEqual(sample_groups, expected)
+        self.assertEqual(
+            sample_index.load_sample_groups(self.sample_file, use_index=False),
+            expected,
+        )
+
+    def test_rewritten_file(self) -> None:
+        """A modified attributes file is parsed again"""
+        sample_index.load_sample_groups(self.sample_file)
+
+        with open(self.sample_file, "w") as f:
+            f.write("SAMPID\tSMTS\n")
+            f.write("S9\tHeart\n")
+            f.write("S8\tHeart\n")
+        sample_groups = sample_index.load_sample_groups(self.sample_file)
+        self.assertEqual(sample_groups, [("S9", "Heart"), ("S8", "Heart")])
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.sample_file = self.tmp_path("test_attributes.txt")
+        self.index_file = sample_index.sample_index_path(
+            self.sample_file, "SMTS"
+        )
+        rows = [
+            ["SAMPID", "SMATSSCR", "SMTS", "SMTSD"],
+            ["S0", "0.0", "Blood", "Whole Blood"],
+            ["S1", "1.0", "Brain", "Brain - Cortex"],
+            ["S2", "", "Blood", "Whole Blood"],
+            ["S3", "2.0", "Kidney", "Kidney - Cortex"],
+        ]
+        fixtures.write_sample_file(self.sample_file, rows)
+        self.expected = [(row[0], row[2]) for row in rows[1:]]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+test_search.py
+
+testing module that tests the batch queries of search.py.
+
+"""
+import io
+import argparse
+import unittest
+
+import fixtures
+import search
+
+
+class BatchSearchTest(fixtures.TempDirTestCase):
+    def test_batch_search(self) -> None:
+        """Every target is written as a TSV line, missing targets are marked
+        as not-found"""
+        for algorithm in ("linear", "binary", "hash", "numpy", "auto"):
+            out = io.StringIO()
+            args = self.make_args(algorithm, self.targets_file)
+
+            self.assertEqual(search.batch_search(args, out=out), 0)
+            self.assertEqual(
+                out.getvalue().splitlines(),
+                ["dolor\t2", "zzz\tnot-found", "Lorem\t0", "elit\t5"],
+            )
+
+    def test_interpolation_batch(self) -> None:
+        """Interpolation searches convert the data and targets to numbers"""
+        with open(self.input_file, "w") as f:
+            f.write("2 4 7 8\n")
+        with open(self.targets_file, "w") as f:
+            f.write("7\n3\nabc\n8\n")
+
+        out = io.StringIO()
+        args = self.make_args("interpolation", self.targets_file)
+        self.assertEqual(search.batch_search(args, out=out), 0)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ["7\t2", "3\tnot-found", "abc\tnot-found", "8\t3"],
+        )
+
+        # non numerical data cannot be indexed
+        with open(self.input_file, "w") as f:
+            f.write("Lorem ipsum\n")
+        self.assertEqual(search.batch_search(args, out=io.StringIO()), 1)
+
+    def test_all_positions(self) -> None:
+        """All positions of every target are written comma separated"""
+        with open(self.input_file, "w") as f:
+            f.write("Lorem ipsum dolor, sit dolor. Lorem dolor\n")
+
+        out = io.StringIO()
+        args = self.make_args("linear", self.targets_file)
+        args.all = True
+        self.assertEqual(search.batch_search(args, out=out), 0)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "dolor\t2,4,6",
+                "zzz\tnot-found",
+                "Lorem\t0,5",
+                "elit\tnot-found",
+            ],
+        )
+
+    def test_ignore_case_batch(self) -> None:
+        """Targets of any case are found with every algorithm"""
+        with open(self.targets_file, "w") as f:
+            f.write("DOLOR\nlorem\nzzz\n")
+
+        for algorithm in ("linear", "binary", "hash", "numpy", "auto"):
+            out = io.StringIO()
+            args = self.make_args(algorithm, self.targets_file)
+            args.ignore_case = True
+
+            self.assertEqual(search.batch_search(args, out=out), 0)
+            self.assertEqual(
+                out.getvalue().splitlines(),
+                ["DOLOR\t2", "lorem\t0", "zzz\tnot-found"],
+            )
+
+    def test_missing_targets_file(self) -> None:
+        """A missing targets file is reported with an exit code of 1"""
+        args = self.make_args("linear", "not_a_targets_file.txt")
+        self.assertEqual(search.batch_search(args, out=io.StringIO()), 1)
+
+    def make_args(
+        self, algorithm: str, targets_file: str
+    ) -> argparse.Namespace:
+        return argparse.Namespace(
+            input=self.input_file,
+            targets_file=targets_file,
+            algorithm=algorithm,
+            shuffle=False,
+            all=False,
+            ignore_case=False,
+        )
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.input_file = self.tmp_path("test_search_input.txt")
+        self.targets_file = self.tmp_path("test_search_targets.txt")
+        with open(self.input_file, "w") as f:
+            f.write("Lorem ipsum dolor sit, amet elit.\n")
+        with open(self.targets_file, "w") as f:
+            f.write("dolor\nzzz\n\nLorem\nelit\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,14 @@ test_search_functions.py
 testing module that tests both linear and binary search algorithm.
 
 """
+
 import os
 import pickle
 import random
 import unittest
 
+import numpy as np
+
 import utils
 
 
@@ -164,6 +167,182 @@ class SearchAlgorithms(unittest.TestCase):
                     ValueError, utils.binary_search, "notfound", indexed_array
                 )
 
+    def test_sorted_index_1(self) -> None:
+        """Positive case, sorted index returns the true index position of
+        every element of randomly shuffled arrays"""
+        with open("string_data.pickle", "rb") as f:
+            loaded_data = pickle.load(f)
+
+        for _ in range(40):
+            random.shuffle(loaded_data)
+            sorted_index = utils.SortedIndex(utils.index_list(loaded_data))
+            for true_idx, target in enumerate(loaded_data):
+                self.assertEqual(sorted_index.lookup(target), true_idx)
+
+    def test_sorted_index_2(self) -> None:
+        """Negative case, missing targets raise ValueError and empty arrays
+        are rejected"""
+        with open("string_data.pickle", "rb") as f:
+            loaded_data = pickle.load(f)
+
+        sorted_index = utils.SortedIndex(utils.index_list(loaded_data))
+        self.assertRaises(ValueError, sorted_index.lookup, "notfound")
+        self.assertNotIn("notfound", sorted_index)
+        self.assertRaises(ValueError, utils.SortedIndex, [])
+
+    def test_sorted_index_lookup_many(self) -> None:
+        """Bulk lookups return positions in the order of the provided targets
+        with None for targets that are not found"""
+        with open("string_data.pickle", "rb") as f:
+            loaded_data = pickle.load(f)
+
+        sorted_index = utils.SortedIndex(utils.index_list(loaded_data))
+        targets = ["sit", "notfound", "Lorem", "elit", "aaa", "zzz"]
+        positions = sorted_index.lookup_many(targets)
+
+        self.assertEqual(positions, [3, None, 0, 7, None, None])
+        self.assertEqual(sorted_index.lookup_many([]), [])
+
+    def test_hash_index(self) -> None:
+        """Hash index returns the same first positions as linear_search"""
+        words = "Lorem ipsum dolor sit amet dolor Lorem elit".split()
+        hash_index = utils.HashIndex(utils.index_list(words))
+
+        for target in words:
+            self.assertEqual(
+                hash_index.lookup(target), utils.linear_search(target, words)
+            )
+        self.assertRaises(ValueError, hash_index.lookup, "notfound")
+        self.assertNotIn("notfound", hash_index)
+        self.assertEqual(
+            hash_index.lookup_many(["elit", "notfound", "dolor"]),
+            [7, None, 2],
+        )
+        self.assertRaises(ValueError, utils.HashIndex, [])
+
+    def test_search_backends(self) -> None:
+        """Every backend returns the first position of every target, as
+        linear_search does, and None for missing targets in batches"""
+        words = [
+            random.choice(["Lorem", "ipsum", "dolor", "sit", "amet", "elit"])
+            for _ in range(200)
+        ]
+        numbers = [random.randint(-50, 50) for _ in range(200)]
+
+        for name, index_cls in utils.SEARCH_BACKENDS.items():
+            for data, missing in ((words, "notfound"), (numbers, 1000)):
+                if name == "interpolation" and data is words:
+                    continue
+
+                index = index_cls.from_array(data)
+                for target in set(data):
+                    self.assertEqual(
+                        index.lookup(target), utils.linear_search(target, data)
+                    )
+                self.assertRaises(ValueError, index.lookup, missing)
+                self.assertNotIn(missing, index)
+
+                targets = [data[-1], missing, data[0]]
+                self.assertEqual(
+                    index.lookup_many(targets),
+                    [data.index(data[-1]), None, 0],
+                )
+
+    def test_search_backends_errors(self) -> None:
+        """Backends reject empty and non sequence data, interpolation only
+        accepts numbers"""
+        for index_cls in utils.SEARCH_BACKENDS.values():
+            self.assertRaises(ValueError, index_cls.from_array, [])
+            self.assertRaises(TypeError, index_cls.from_array, 10)
+
+        interpolation = utils.SEARCH_BACKENDS["interpolation"]
+        self.assertRaises(TypeError, interpolation.from_array, ["a", "b"])
+        index = interpolation.from_array([1, 5, 5, 9.5])
+        self.assertEqual(index.lookup(5), 1)
+        self.assertEqual(index.lookup(9.5), 3)
+        self.assertRaises(ValueError, index.lookup, 4)
+        self.assertRaises(TypeError, index.lookup, "5")
+
+        # infinite keys and targets fall back to bisection
+        index = interpolation.from_array([-float("inf"), 1, 2, float("inf")])
+        self.assertEqual(index.lookup(float("inf")), 3)
+        self.assertEqual(index.lookup(-float("inf")), 0)
+        self.assertEqual(index.lookup(2), 2)
+        self.assertRaises(ValueError, index.lookup, 1.5)
+        index = interpolation.from_array([1, 2, float("inf")])
+        self.assertEqual(index.lookup(float("inf")), 2)
+        self.assertRaises(ValueError, index.lookup, float("nan"))
+
+    def test_search_backends_ignore_case(self) -> None:
+        """Every backend accepts ignore_case and returns the first position
+        of any case of the target"""
+        words = ["Lorem", "ipsum", "LOREM", "Dolor", "dolor"]
+        for name, index_cls in utils.SEARCH_BACKENDS.items():
+            if name == "interpolation":
+                continue
+
+            index = index_cls.from_array(words, ignore_case=True)
+            self.assertEqual(index.lookup("lorem"), 0)
+            self.assertIn("DOLOR", index)
+            self.assertEqual(
+                index.lookup_many(["IPSUM", "notfound", "dolor"]),
+                [1, None, 3],
+            )
+
+            index = index_cls.from_array(words)
+            self.assertRaises(ValueError, index.lookup, "lorem")
+
+    def test_search_backends_mixed_types(self) -> None:
+        """The NumPy backend rejects mixed strings and numbers instead of
+        converting them to strings, and never matches targets of another
+        kind"""
+        numpy_index = utils.SEARCH_BACKENDS["numpy"]
+        self.assertRaises(TypeError, numpy_index.from_array, ["1", 1])
+        self.assertRaises(TypeError, numpy_index.from_array, [None, 1])
+        self.assertRaises(TypeError, numpy_index, [["1", 0], [1, 1]])
+
+        index = numpy_index.from_array(["1", "2"])
+        self.assertRaises(ValueError, index.lookup, 1)
+        self.assertEqual(index.lookup_many([2, "2", "1"]), [None, 1, 0])
+
+        index = numpy_index.from_array([1, 2.5, np.int64(3)])
+        self.assertEqual(index.lookup_many(["1", 3, 2.5]), [None, 2, 1])
+
+    def test_search_index_abstract(self) -> None:
+        """SearchIndex cannot be built without a lookup"""
+        self.assertRaises(TypeError, utils.SearchIndex)
+
+    def test_postings_index(self) -> None:
+        """Postings index returns every position of a target in order"""
+        words = "Lorem ipsum dolor sit amet dolor Lorem elit dolor".split()
+        postings = utils.PostingsIndex(iter(words))
+
+        for target in set(words):
+            expected = [idx for idx, elm in enumerate(words) if elm == target]
+            positions = postings.find_all(target)
+            self.assertEqual(positions.typecode, "I")
+            self.assertEqual(list(positions), expected)
+            self.assertEqual(postings.count(target), len(expected))
+            self.assertEqual(postings.first(target), expected[0])
+            self.assertEqual(postings.last(target), expected[-1])
+
+        self.assertEqual(len(postings), 6)
+        self.assertEqual(postings.size, len(words))
+        self.assertEqual(postings.count("notfound"), 0)
+        for method in (postings.find_all, postings.first, postings.last):
+            self.assertRaises(ValueError, method, "notfound")
+        self.assertRaises(ValueError, utils.PostingsIndex, iter([]))
+
+    def test_choose_search_backend(self) -> None:
+        """Single queries are linear, large batches vectorized, streamed or
+        small batches hashed"""
+        self.assertEqual(utils.choose_search_backend(None, 1), "linear")
+        self.assertEqual(utils.choose_search_backend(10**6, 1), "linear")
+        self.assertEqual(utils.choose_search_backend(10**6, 10**4), "numpy")
+        self.assertEqual(utils.choose_search_backend(100, 10**4), "hash")
+        self.assertEqual(utils.choose_search_backend(10**6, 10), "hash")
+        self.assertEqual(utils.choose_search_backend(10**6, None), "hash")
+
     @classmethod
     def setUp(cls) -> None:
         """Setting up files for tests"""
@@ -214,6 +393,153 @@ class SearchAlgorithms(unittest.TestCase):
         os.remove(cls.mixed_chars_array)
 
 
+class SearchOrderProperties(unittest.TestCase):
+    """Randomized property tests of the binary searches against a dictionary
+    oracle. Elements are short mixed-case strings, so arrays contain
+    duplicates and elements that only differ by case."""
+
+    n_trials = 200
+
+    def random_array(self, rng: random.Random) -> list:
+        alphabet = rng.choice(["aAbB", "aAbBcC-1", "GTEXgtex-12"])
+        return [
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 3)))
+            for _ in range(rng.randint(1, 40))
+        ]
+
+    def oracle(self, array: list, ignore_case: bool) -> dict:
+        """maps the comparison key of every element to its first position"""
+        key = utils.comparison_key(ignore_case)
+        first_positions = {}
+        for idx, element in enumerate(array):
+            first_positions.setdefault(key(element), idx)
+        return first_positions
+
+    def targets(self, rng: random.Random, array: list) -> list:
+        """elements of the array, case variants and random strings"""
+        targets = list(array) + [elm.swapcase() for elm in array]
+        targets += self.random_array(rng) + ["", "zzzz"]
+        return targets
+
+    def test_binary_search_matches_oracle(self) -> None:
+        """binary_search returns the first position of every element, in both
+        comparison modes, whatever the order of the indexed array"""
+        rng = random.Random(1)
+        for _ in range(self.n_trials):
+            array = self.random_array(rng)
+            indexed_array = utils.index_list(array)
+            rng.shuffle(indexed_array)
+
+            for ignore_case in (False, True):
+                oracle = self.oracle(array, ignore_case)
+                key = utils.comparison_key(ignore_case)
+                for target in self.targets(rng, array):
+                    expected = oracle.get(key(target))
+                    if expected is None:
+                        self.assertRaises(
+                            ValueError,
+                            utils.binary_search,
+                            target,
+                            indexed_array,
+                            ignore_case,
+                        )
+                    else:
+                        position = utils.binary_search(
+                            target, indexed_array, ignore_case
+                        )
+                        self.assertEqual(position, expected)
+
+    def test_sorted_indexes_match_oracle(self) -> None:
+        """Sorted backends agree with the oracle on single and bulk lookups"""
+        rng = random.Random(2)
+        backends = ["binary", "bisect", "exponential"]
+        for _ in range(self.n_trials):
+            array = self.random_array(rng)
+            targets = self.targets(rng, array)
+
+            for ignore_case in (False, True):
+                oracle = self.oracle(array, ignore_case)
+                key = utils.comparison_key(ignore_case)
+                expected = [oracle.get(key(target)) for target in targets]
+
+                for name in backends:
+                    index = utils.SEARCH_BACKENDS[name].from_array(
+                        array, ignore_case=ignore_case
+                    )
+                    # keys are sorted in the order they are probed with
+                    self.assertEqual(index.keys, sorted(index.keys))
+                    self.assertEqual(index.lookup_many(targets), expected)
+                    for target, position in zip(targets, expected):
+                        self.assertEqual(target in index, position is not None)
+                        if position is not None:
+                            self.assertEqual(index.lookup(target), position)
+
+    def test_comparison_key(self) -> None:
+        """Case-sensitive keys keep strings, casefolded keys ignore case and
+        leave other types unchanged"""
+        exact = utils.comparison_key()
+        folded = utils.comparison_key(ignore_case=True)
+
+        self.assertNotEqual(exact("GTEX-1117F"), exact("gtex-1117f"))
+        self.assertEqual(folded("GTEX-1117F"), folded("gtex-1117f"))
+        self.assertEqual(folded("Straße"), folded("STRASSE"))
+        self.assertEqual(folded(3), 3)
+
+    def test_mixed_case_lookup(self) -> None:
+        """Mixed-case elements are found by the case-sensitive search, the
+        previous case mismatch between sort and probe missed them"""
+        array = ["b", "B", "a", "A", "GTEX-1117F", "gtex-1117f"]
+        indexed_array = utils.index_list(array)
+
+        for idx, target in enumerate(array):
+            self.assertEqual(utils.binary_search(target, indexed_array), idx)
+        self.assertEqual(
+            utils.binary_search("GTEX-1117f", indexed_array, ignore_case=True),
+            4,
+        )
+
+
+class GroupingTest(unittest.TestCase):
+    def test_group_by_order_and_members(self) -> None:
+        """Groups keep first-seen order and no member is dropped"""
+        rows = [
+            ["s1", "Blood", "B1"],
+            ["s2", "Brain", "B1"],
+            ["s3", "Blood", "B2"],
+            ["s4", "Kidney", "B2"],
+            ["s5", "Brain", "B1"],
+        ]
+
+        groups = utils.group_by(rows, key_col_idx=1, value_col_idx=0)
+        self.assertEqual(
+            groups,
+            [
+                ["Blood", ["s1", "s3"]],
+                ["Brain", ["s2", "s5"]],
+                ["Kidney", ["s4"]],
+            ],
+        )
+
+        # grouping by another column
+        groups = utils.group_by(rows, key_col_idx=2, value_col_idx=0)
+        self.assertEqual(
+            groups, [["B1", ["s1", "s2", "s5"]], ["B2", ["s3", "s4"]]]
+        )
+
+    def test_group_by_random_rows(self) -> None:
+        """Every row ends up in exactly one group"""
+        groups_names = ["Blood", "Kidney", "Brain", "Lung"]
+        rows = [
+            [f"sample_{i}", random.choice(groups_names)] for i in range(500)
+        ]
+
+        groups = utils.group_by(rows, key_col_idx=1, value_col_idx=0)
+        n_members = sum(len(members) for _, members in groups)
+
+        self.assertEqual(n_members, len(rows))
+        self.assertEqual(utils.group_by([], 1, 0), [])
+
+
 class MeanCalculationTest(unittest.TestCase):
 
     # ------------------------------
@@ -300,6 +626,23 @@ class MeanCalculationTest(unittest.TestCase):
 
         self.assertEqual(true_mean, test_mean)
 
+    def test_mean_numpy_arrays(self) -> None:
+        """Tests read_count_mean() on numpy arrays"""
+        with open("group_ints.pickle", "rb") as f:
+            group_datasets = pickle.load(f)
+
+        for group_data in group_datasets:
+            read_counts = group_data[1]
+
+            true_mean = utils.read_count_mean(read_counts)
+            test_mean = utils.read_count_mean(np.asarray(read_counts))
+            self.assertEqual(true_mean, test_mean)
+
+        self.assertEqual(utils.read_count_mean(np.asarray([])), 0)
+        self.assertRaises(
+            TypeError, utils.read_count_mean, np.asarray(["a", "b"])
+        )
+
     # ------------------------------
     # Thresholding Tests
     # ------------------------------
@@ -345,6 +688,127 @@ class MeanCalculationTest(unittest.TestCase):
             TypeError, utils.filter_by_mean, group_data, threshold="ten"
         )
 
+    def test_filter_numpy_arrays(self) -> None:
+        """Filtering groups of numpy arrays keeps the arrays"""
+        grouped_data = [
+            ["Blood", np.asarray([1, 2, 3])],
+            ["Kidney", np.asarray([10, 20, 30])],
+            ["Brain", np.asarray([], dtype=np.int64)],
+        ]
+
+        filtered = utils.filter_by_mean(grouped_data, threshold=5)
+        self.assertEqual(len(filtered), 1)
+        self.assertEqual(filtered[0][0], "Kidney")
+        self.assertIsInstance(filtered[0][1], np.ndarray)
+
+        filtered = utils.filter_by_mean(grouped_data, threshold=0)
+        self.assertEqual(
+            [name for name, _ in filtered], ["Blood", "Kidney", "Brain"]
+        )
+
+    # ------------------------------
+    # Statistics Tests
+    # ------------------------------
+
+    def test_group_stats_quantiles(self) -> None:
+        """Partition-based quantiles match np.percentile for odd, even and
+        single element groups"""
+        rng = np.random.default_rng(7)
+        grouped_data = [
+            [f"group_{size}", rng.integers(0, 5000, size)]
+            for size in (1, 2, 5, 10, 101)
+        ]
+
+        stats = utils.group_stats(grouped_data)
+        for (group_name, counts), group_stats in zip(grouped_data, stats):
+            q1, med, q3 = np.percentile(counts, [25, 50, 75])
+            self.assertEqual(group_stats["label"], group_name)
+            self.assertEqual(group_stats["n"], len(counts))
+            self.assertAlmostEqual(group_stats["mean"], counts.mean())
+            self.assertAlmostEqual(group_stats["q1"], q1)
+            self.assertAlmostEqual(group_stats["med"], med)
+            self.assertAlmostEqual(group_stats["q3"], q3)
+            self.assertAlmostEqual(group_stats["iqr"], q3 - q1)
+
+    def test_group_stats_whiskers(self) -> None:
+        """Whiskers and fliers follow the 1.5 IQR rule of matplotlib"""
+        counts = [10, 11, 12, 13, 14, 15, 16, 17, 18, 100]
+        group_stats = utils.group_stats([["Blood", counts]])[0]
+
+        self.assertEqual(group_stats["whislo"], 10)
+        self.assertEqual(group_stats["whishi"], 18)
+        self.assertEqual(group_stats["fliers"].tolist(), [100])
+
+        # whiskers never end inside the box
+        group_stats = utils.group_stats([["Blood", [5, 5, 5, 5]]])[0]
+        self.assertEqual(group_stats["whislo"], 5)
+        self.assertEqual(group_stats["whishi"], 5)
+        self.assertEqual(len(group_stats["fliers"]), 0)
+
+    def test_group_stats_empty_and_non_numerical(self) -> None:
+        """Empty groups have NaN stats, non numerical counts are rejected"""
+        stats = utils.group_stats([["Brain", []], ["Blood", [3, 1, 2]]])
+        self.assertEqual(stats[0]["n"], 0)
+        self.assertTrue(np.isnan(stats[0]["med"]))
+        self.assertEqual(len(stats[0]["fliers"]), 0)
+        self.assertEqual(stats[1]["med"], 2)
+
+        self.assertRaises(
+            TypeError, utils.group_stats, [["Blood", ["1", "2"]]]
+        )
+
+    def test_filter_by_stat(self) -> None:
+        """Groups are filtered on the selected statistic"""
+        grouped_data = [
+            ["Blood", np.asarray([0, 0, 0, 0, 100])],
+            ["Kidney", np.asarray([10, 10, 10, 10, 10])],
+        ]
+
+        # the mean of Blood is raised by a single outlier, its median is not
+        filtered, stats = utils.filter_by_stat(grouped_data, threshold=15)
+        self.assertEqual([name for name, _ in filtered], ["Blood"])
+        self.assertEqual(stats[0]["mean"], 20)
+
+        filtered, stats = utils.filter_by_stat(
+            grouped_data, threshold=5, stat="median"
+        )
+        self.assertEqual([name for name, _ in filtered], ["Kidney"])
+        self.assertEqual([entry["label"] for entry in stats], ["Kidney"])
+        self.assertIsInstance(filtered[0][1], np.ndarray)
+
+    def test_filter_by_stat_empty_groups(self) -> None:
+        """Empty groups never meet a threshold, even a threshold of 0"""
+        grouped_data = [
+            ["Blood", np.asarray([0, 0, 1])],
+            ["Brain", np.asarray([], dtype=np.int64)],
+        ]
+        for stat in utils.FILTER_STATS:
+            filtered, stats = utils.filter_by_stat(grouped_data, 0, stat)
+            self.assertEqual([name for name, _ in filtered], ["Blood"])
+            self.assertEqual(len(stats), 1)
+
+    def test_filter_by_stat_matches_mean(self) -> None:
+        """Filtering on the mean keeps the same groups as filter_by_mean"""
+        with open("group_ints.pickle", "rb") as f:
+            group_data = pickle.load(f)
+
+        for threshold in (0, 10, 25.5, 1000):
+            filtered, _ = utils.filter_by_stat(group_data, threshold)
+            self.assertEqual(
+                filtered, utils.filter_by_mean(group_data, threshold)
+            )
+
+    def test_filter_by_stat_errors(self) -> None:
+        """Invalid inputs raise the same errors as filter_by_mean"""
+        self.assertRaises(ValueError, utils.filter_by_stat, [])
+        self.assertRaises(TypeError, utils.filter_by_stat, [1, 2, 3])
+        self.assertRaises(
+            TypeError, utils.filter_by_stat, [["Blood", [1]]], "10"
+        )
+        self.assertRaises(
+            ValueError, utils.filter_by_stat, [["Blood", [1]]], 0, "mode"
+        )
+
     # ------------------------------
     # Tests setup methods
     # ------------------------------
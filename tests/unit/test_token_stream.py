@@ -0,0 +1,77 @@
+"""
+test_token_stream.py
+
+testing module that tests the memory-mapped tokenizer of search.py.
+
+"""
+import random
+import unittest
+
+import fixtures
+import utils
+from token_stream import iter_tokens
+from token_stream import load_tokens
+
+
+class TokenStreamTest(fixtures.TempDirTestCase):
+    def test_same_tokens_as_read(self) -> None:
+        """Tokens match the full read, replace and split of the file for
+        chunks that end anywhere in the text"""
+        with open(self.text_file, "r") as f:
+            expected = f.read().replace(".", "").replace(",", "").split()
+
+        for chunk_size in (1, 3, 7, 64, 1 << 20):
+            tokens = load_tokens(self.text_file, chunk_size=chunk_size)
+            self.assertEqual(tokens, expected)
+
+    def test_long_tokens_and_unicode(self) -> None:
+        """Tokens longer than a chunk and multi-byte characters are never
+        cut"""
+        words = ["a" * 50, "café,", "naïve.", "b", "x.y"]
+        with open(self.text_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(words))
+
+        tokens = load_tokens(self.text_file, chunk_size=4)
+        self.assertEqual(tokens, ["a" * 50, "café", "naïve", "b", "xy"])
+
+    def test_empty_file(self) -> None:
+        """Empty files have no tokens"""
+        open(self.text_file, "w").close()
+        self.assertEqual(load_tokens(self.text_file), [])
+        self.assertRaises(
+            RuntimeError,
+            utils.linear_search_iter,
+            "dolor",
+            iter_tokens(self.text_file),
+        )
+
+    def test_linear_search_stops_early(self) -> None:
+        """The linear search stops consuming tokens at the first match"""
+        tokens = iter_tokens(self.text_file, chunk_size=16)
+        self.assertEqual(utils.linear_search_iter("ipsum", tokens), 1)
+        self.assertEqual(next(tokens), "dolor")
+
+        self.assertRaises(
+            ValueError,
+            utils.linear_search_iter,
+            "not_a_word",
+            iter_tokens(self.text_file),
+        )
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.text_file = self.tmp_path("test_tokens.txt")
+        words = (
+            "Lorem ipsum dolor sit amet, consectetur adipiscing elit.".split()
+        )
+        random.seed(3)
+        lines = [
+            " ".join(random.choice(words) for _ in range(12))
+            for _ in range(20)
+        ]
+        with open(self.text_file, "w") as f:
+            f.write("Lorem ipsum dolor\n" + "\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
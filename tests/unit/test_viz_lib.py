@@ -0,0 +1,91 @@
+"""
+test_viz_lib.py
+
+testing module that tests rendering batches of box plots.
+
+"""
+import os
+import random
+import unittest
+
+import fixtures
+import utils
+import viz_lib
+
+
+class RenderBoxPlotsTest(fixtures.TempDirTestCase):
+    def test_render_batch(self) -> None:
+        """Every job is rendered, failing jobs are reported without stopping
+        the batch"""
+        jobs = [
+            {
+                "data": self.data,
+                "gene_name": gene,
+                "output_file": output_file,
+                "fig_width": 4,
+                "fig_height": 3,
+            }
+            for gene, output_file in zip(
+                ["ACTA2", "BRCA1", "TP53"], self.output_files
+            )
+        ]
+        jobs.append(
+            {
+                "data": self.data,
+                "gene_name": "MYH7",
+                "output_file": os.path.join(
+                    self.tmp_path("not_a_dir"), "MYH7.png"
+                ),
+            }
+        )
+
+        for workers in (1, 2):
+            results = viz_lib.render_box_plots(jobs, workers=workers)
+
+            self.assertEqual(
+                [result["gene_name"] for result in results],
+                ["ACTA2", "BRCA1", "TP53", "MYH7"],
+            )
+            for result, output_file in zip(results, self.output_files):
+                self.assertEqual(result["output_file"], output_file)
+                self.assertTrue(os.path.exists(output_file))
+
+            self.assertIsNone(results[3]["output_file"])
+            self.assertIn("FileNotFoundError", results[3]["error"])
+
+            for output_file in self.output_files:
+                os.remove(output_file)
+
+    def test_precomputed_stats(self) -> None:
+        """Provided group statistics are drawn without being recomputed"""
+        stats = utils.group_stats(self.data)
+        original_group_stats = viz_lib.group_stats
+        viz_lib.group_stats = None
+        try:
+            save_path = viz_lib._render_box_plot(
+                self.data,
+                "ACTA2",
+                self.output_files[0],
+                fig_width=4,
+                fig_height=3,
+                stats=stats,
+            )
+        finally:
+            viz_lib.group_stats = original_group_stats
+
+        self.assertEqual(save_path, self.output_files[0])
+        self.assertTrue(os.path.exists(save_path))
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.output_files = [
+            self.tmp_path(f"test_plot_{idx}.png") for idx in range(1, 4)
+        ]
+        self.data = [
+            [group, [random.randint(0, 4000) for _ in range(20)]]
+            for group in ["Blood", "Brain", "Kidney"]
+        ]
+
+
+if __name__ == "__main__":
+    unittest.main()
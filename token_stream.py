@@ -0,0 +1,93 @@
+"""
+token_stream module
+Developer: Erik Serrano
+
+Module contains a streaming tokenizer of the text files searched by search.py.
+The file is memory-mapped and split into chunks of about `chunk_size` bytes
+that always end on whitespace, so no token is cut in two. Only one chunk is
+decoded and tokenized at a time, the file is never held in memory as a
+whole.
+
+Tokens are the whitespace separated words of the file with the punctuation
+characters (`.` and `,` by default) removed, the same tokens as
+`f.read().replace(".", "").replace(",", "").split()`.
+
+* iter_tokens - yields the tokens of a text file one chunk at a time
+* load_tokens - returns all tokens of a text file as a list
+"""
+import os
+import re
+import mmap
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+STRIP_CHARS = ".,"
+
+# ASCII whitespace, a chunk never ends within a multi-byte UTF-8 character
+_WHITESPACE = re.compile(rb"[ \t\n\r\x0b\x0c]")
+
+
+def _iter_chunks(data: mmap.mmap, chunk_size: int) -> Iterator[bytes]:
+    """Yields consecutive chunks of the mapped file, each chunk is extended
+    up to the next whitespace"""
+    start = 0
+    size = len(data)
+    while start < size:
+        end = start + chunk_size
+        if end < size:
+            match = _WHITESPACE.search(data, end)
+            end = size if match is None else match.start()
+        yield data[start:end]
+        start = end
+
+
+def iter_tokens(
+    input_file: str,
+    chunk_size: Optional[int] = DEFAULT_CHUNK_SIZE,
+    strip_chars: Optional[str] = STRIP_CHARS,
+) -> Iterator[str]:
+    """Yields the tokens of a text file in file order. The file is read
+    lazily, so stopping the iteration early leaves the rest of the file
+    unread.
+
+    Parameters
+    ----------
+    input_file : str
+        path to a UTF-8 text file
+    chunk_size : int
+        number of bytes decoded and tokenized at a time
+    strip_chars : str
+        punctuation characters removed from the text
+
+    Yields
+    ------
+    str
+        tokens of the file
+
+    Raises
+    ------
+    FileNotFoundError
+        Raised if the input file does not exist
+    UnicodeDecodeError
+        Raised if the file is not UTF-8 encoded
+    """
+    delete_table = str.maketrans("", "", strip_chars)
+    with open(input_file, "rb") as f:
+        # empty files cannot be memory-mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for chunk in _iter_chunks(data, chunk_size):
+                yield from chunk.decode().translate(delete_table).split()
+
+
+def load_tokens(
+    input_file: str,
+    chunk_size: Optional[int] = DEFAULT_CHUNK_SIZE,
+    strip_chars: Optional[str] = STRIP_CHARS,
+) -> List[str]:
+    """Returns all tokens of a text file (look at iter_tokens)"""
+    return list(iter_tokens(input_file, chunk_size, strip_chars))
@@ -8,18 +8,66 @@ utils.py package contains functions that aids in searching and indexing arrays
 * linear_search - A function that searches for a specific target from a given
                   array. It will return the index value of target
 
+* linear_search_iter - linear search over a stream of elements that stops
+                       reading the stream at the first match.
+
 * binary_search - Searching algorithm that requires an indexed array. (look at
                   index_list). Sorts list and attempts to find target element.
                   return the index position of the target.
 
+* comparison_key - key used by the binary searches to both sort and probe
+                   elements, case-sensitive or casefolded.
+
 * index_list - generates a list of lists where the nested list contains index
                index values for each element.
+
+* group_by - groups row entries on a column with a single pass over the rows.
+
+* SortedIndex - sorted lookup structure built once from an indexed array
+                (look at index_list) and queried many times.
+
+* HashIndex - hash lookup structure mapping every element of an indexed
+              array to its first position, queried in O(1).
+
+* SEARCH_BACKENDS - search index classes by name: linear, binary, hash,
+                    bisect, exponential, interpolation (numbers only),
+                    numpy (vectorized batches) and postings. Look at
+                    SearchIndex.
+
+* PostingsIndex - maps every element to all of its positions, answers
+                  find_all, count, first and last.
+
+* choose_search_backend - picks a backend from the data size and the number
+                          of queries.
+
+* group_stats - box plot statistics (mean, median, quartiles, IQR, whiskers
+                and fliers) of every group. Groups are sorted once and their
+                statistics are computed for all groups at a time.
+
+* filter_by_stat - filters groups on any of their statistics.
 """
+
+import sys
+import math
+import numbers
+import importlib.util
+from abc import ABC
+from abc import abstractmethod
+from array import array
+from bisect import bisect_left
 from typing import Union
 from typing import Optional
 from typing import List
 from typing import Any
+from typing import Callable
+from typing import Dict
 from typing import Sequence
+from typing import Tuple
+from typing import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 def linear_search(target: str, sel_array: List[str]) -> int:
@@ -68,8 +116,75 @@ def linear_search(target: str, sel_array: List[str]) -> int:
     raise ValueError
 
 
+def linear_search_iter(target: str, elements: Iterable[str]) -> int:
+    """Searches target value within a stream of elements (e.g. the tokens of
+    token_stream.iter_tokens). The stream is consumed only up to the first
+    match, so elements after the target are never read.
+
+    Parameters
+    ----------
+    target : str
+        specific value to search within the given stream.
+    elements : Iterable[str]
+        elements to search, in order
+
+    Returns
+    -------
+    int
+        index position where the target is located within the stream.
+
+    Raises
+    ------
+    ValueError
+        raised if the target cannot be found within the provided stream
+    RuntimeError
+        raised if the stream is empty
+    """
+    idx = -1
+    for idx, field in enumerate(elements):
+        if target == field:
+            return idx
+    if idx == -1:
+        raise RuntimeError("Empty stream provided")
+    raise ValueError
+
+
+def _exact_key(value: Any) -> Any:
+    return value
+
+
+def _casefold_key(value: Any) -> Any:
+    return value.casefold() if isinstance(value, str) else value
+
+
+def comparison_key(ignore_case: Optional[bool] = False) -> Callable:
+    """Returns the key that orders and matches the elements of a binary
+    search. Strings are compared as they are, or casefolded if ignore_case is
+    set. The same key is used to sort the elements and to probe them with the
+    target, so both always agree on the order.
+
+    Example
+    -------
+    >>> key = comparison_key(ignore_case=True)
+    >>> print(key("GTEX-1117F") == key("gtex-1117f"))
+    True
+    """
+    return _casefold_key if ignore_case else _exact_key
+
+
+def _sort_indexed(
+    indexed_sel_array: List[List[Union[str, int]]], key: Callable
+) -> List[List[Union[str, int]]]:
+    """Sorts an indexed array on the comparison key of its elements, then on
+    their positions. Every entry has a distinct position, so the order is
+    total and equal elements are sorted by position."""
+    return sorted(indexed_sel_array, key=lambda x: (key(x[0]), x[1]))
+
+
 def binary_search(
-    target: str, indexed_sel_array: List[List[Union[str, int]]]
+    target: str,
+    indexed_sel_array: List[List[Union[str, int]]],
+    ignore_case: Optional[bool] = False,
 ) -> int:
     """Conducted a binary search on a provided indexed array. The indexed array
     should be a list of lists were the nested list contains string and an
@@ -81,12 +196,15 @@ def binary_search(
         target name to look for
     indexed_sel_array : list[list[Any, int]]
         list of nested list that contains indexed parameter names.
+    ignore_case : bool
+        matches strings regardless of their case (look at comparison_key)
 
     Returns
     -------
     int
         return the true index position where the target resides within the
-        provided array.
+        provided array. The first position is returned if the target occurs
+        more than once.
 
 
     Raises
@@ -94,27 +212,33 @@ def binary_search(
     ValueError
         Raises when the target is not found within the provided list
     """
-    # sort the list
-    indexed_sel_array = sorted(indexed_sel_array, key=lambda x: x[0])
+    # sort the list and the target with the same comparison key
+    key = comparison_key(ignore_case)
+    indexed_sel_array = _sort_indexed(indexed_sel_array, key)
+    target_key = key(target)
 
     # set up index positions
     low_idx = -1
     high_idx = len(indexed_sel_array)
 
-    # conducting binary search for target element and return true index pos
+    # conducting binary search for the first element that is not lower than
+    # the target, equal elements are sorted by position
     while high_idx - low_idx > 1:
 
         mid_idx = (high_idx + low_idx) // 2
 
-        # return the value if the mid point index point to target
-        if target == indexed_sel_array[mid_idx][0]:
-            return indexed_sel_array[mid_idx][1]
-
         # checking where the target resides (left or right half of the array)
-        if target.lower() < indexed_sel_array[mid_idx][0].lower():
-            high_idx = mid_idx
-        else:
+        if key(indexed_sel_array[mid_idx][0]) < target_key:
             low_idx = mid_idx
+        else:
+            high_idx = mid_idx
+
+    # return the true index pos if the element is the target
+    if (
+        high_idx < len(indexed_sel_array)
+        and key(indexed_sel_array[high_idx][0]) == target_key
+    ):
+        return indexed_sel_array[high_idx][1]
 
     # raised if the target is not found
     raise ValueError
@@ -165,12 +289,797 @@ def index_list(sel_array: List[Any]) -> List[Union[Any, int]]:
     return indexed_elements
 
 
-def read_count_mean(count_array: List[int]) -> float:
-    """Returns the mean of a given read count
+def group_by(
+    rows: Iterable[Sequence[Any]], key_col_idx: int, value_col_idx: int
+) -> List[List[Any]]:
+    """Groups row entries based on the values found in the key column. Groups
+    are tracked in a dictionary, so the rows are grouped in a single O(n) pass
+    and groups are returned in the order they were first seen.
+
+    Parameters
+    ----------
+    rows : Iterable[Sequence[Any]]
+        row entries to group
+    key_col_idx : int
+        Index value that points to the column used for grouping
+    value_col_idx : int
+        Index value that points to the column collected as group members
+
+    Returns
+    -------
+    list[list[Any, list[Any]]]
+        list of nested lists where the first element is the group name and the
+        second element is the list of all members of that group.
+
+    Example
+    -------
+    >>> rows = [["s1", "Blood"], ["s2", "Brain"], ["s3", "Blood"]]
+    >>> print(group_by(rows, key_col_idx=1, value_col_idx=0))
+    [['Blood', ['s1', 's3']], ['Brain', ['s2']]]
+    """
+    groups = {}
+    for row in rows:
+        group_name = row[key_col_idx]
+        try:
+            groups[group_name].append(row[value_col_idx])
+        except KeyError:
+            groups[group_name] = [row[value_col_idx]]
+
+    return [[group_name, members] for group_name, members in groups.items()]
+
+
+# search backends by name, every backend is a SearchIndex subclass. Backends
+# share the error contract of linear_search and binary_search: building an
+# index raises TypeError for unsupported data and ValueError for empty data,
+# looking up a missing target raises ValueError
+SEARCH_BACKENDS = {}
+
+
+def register_search_backend(name: str) -> Callable[[type], type]:
+    """Class decorator that adds a SearchIndex subclass to SEARCH_BACKENDS"""
+
+    def register(index_cls: type) -> type:
+        index_cls.backend_name = name
+        SEARCH_BACKENDS[name] = index_cls
+        return index_cls
+
+    return register
+
+
+class SearchIndex(ABC):
+    """Base class of the search backends. An index is built once from an
+    indexed array (look at index_list) and queried many times. Backends
+    implement lookup and accept the ignore_case keyword."""
+
+    backend_name = None
+
+    @classmethod
+    def from_array(cls, sel_array: Sequence[Any], **kwargs) -> "SearchIndex":
+        """Builds the index of a plain array, keyword arguments are passed to
+        the index (e.g. ignore_case, supported by every backend)
+
+        Raises
+        ------
+        TypeError
+            Raised if a non-Sequence type object is provided
+        ValueError
+            Raised if an empty array is provided
+        """
+        if not isinstance(sel_array, Sequence):
+            raise TypeError("sel_arry must be either a list or a tuple array")
+        return cls(index_list(sel_array), **kwargs)
+
+    def __contains__(self, target: Any) -> bool:
+        try:
+            self.lookup(target)
+        except ValueError:
+            return False
+        return True
+
+    @abstractmethod
+    def lookup(self, target: Any) -> int:
+        """Returns the index position of the first occurrence of the target
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+
+    def lookup_many(self, targets: Iterable[Any]) -> List[Optional[int]]:
+        """Returns the index positions of a batch of targets in the same
+        order as the targets. Targets that are not found are set to None.
+        """
+        results = []
+        for target in targets:
+            try:
+                results.append(self.lookup(target))
+            except ValueError:
+                results.append(None)
+        return results
+
+
+@register_search_backend("linear")
+class LinearIndex(SearchIndex):
+    """Unsorted index searched with linear_search, returns the first
+    position of a target. Building it costs no more than copying the array,
+    or casefolding it with ignore_case.
+    """
+
+    def __init__(
+        self,
+        indexed_sel_array: List[List[Union[str, int]]],
+        ignore_case: Optional[bool] = False,
+    ):
+        if len(indexed_sel_array) == 0:
+            raise ValueError("Empty list is provided")
+
+        self.key = comparison_key(ignore_case)
+        self.keys = [self.key(entry[0]) for entry in indexed_sel_array]
+        self.positions = [entry[1] for entry in indexed_sel_array]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, target: Any) -> int:
+        """Returns the index position of the first occurrence of the target
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        return self.positions[linear_search(self.key(target), self.keys)]
+
+
+@register_search_backend("binary")
+class SortedIndex(SearchIndex):
+    """Sorted lookup structure built from an indexed array (look at
+    index_list). The array is sorted once when the index is created, so
+    every lookup afterwards is a O(log n) binary search instead of a full
+    re-sort.
+
+    Elements are sorted and probed with the same comparison key (look at
+    comparison_key), and duplicated elements return their first position.
 
     Parameters
     ----------
-    count_array : List[int]
+    indexed_sel_array : list[list[Any, int]]
+        list of nested list that contains indexed parameter names.
+    ignore_case : bool
+        matches strings regardless of their case. The keys of the index are
+        then casefolded
+
+    Raises
+    ------
+    ValueError
+        Raised if an empty list is provided
+
+    Example
+    -------
+    >>> header = index_list(["Name", "Description", "GTEX-1117F"])
+    >>> header_index = SortedIndex(header)
+    >>> print(header_index.lookup("Description"))
+    1
+    >>> print(header_index.lookup_many(["GTEX-1117F", "missing"]))
+    [2, None]
+    """
+
+    def __init__(
+        self,
+        indexed_sel_array: List[List[Union[str, int]]],
+        ignore_case: Optional[bool] = False,
+    ):
+        if len(indexed_sel_array) == 0:
+            raise ValueError("Empty list is provided")
+
+        self.ignore_case = ignore_case
+        self.key = comparison_key(ignore_case)
+        sorted_array = _sort_indexed(indexed_sel_array, self.key)
+        self.keys = [self.key(entry[0]) for entry in sorted_array]
+        self.positions = [entry[1] for entry in sorted_array]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, target: Any) -> int:
+        """Returns the true index position of the target.
+
+        Parameters
+        ----------
+        target : Any
+            target name to look for
+
+        Returns
+        -------
+        int
+            index position where the target resides within the original
+            array.
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        target = self.key(target)
+        low_idx = -1
+        high_idx = len(self.keys)
+
+        while high_idx - low_idx > 1:
+            mid_idx = (high_idx + low_idx) // 2
+            if self.keys[mid_idx] < target:
+                low_idx = mid_idx
+            else:
+                high_idx = mid_idx
+
+        if high_idx < len(self.keys) and self.keys[high_idx] == target:
+            return self.positions[high_idx]
+        raise ValueError
+
+    def lookup_many(self, targets: Iterable[Any]) -> List[Optional[int]]:
+        """Looks up a batch of targets with a single merge-join pass over the
+        index. Targets are sorted once and both sorted sequences are walked
+        together, so the whole batch costs O(m log m + n) instead of m
+        separate searches.
+
+        Parameters
+        ----------
+        targets : Iterable[Any]
+            targets to look for
+
+        Returns
+        -------
+        list[Optional[int]]
+            index positions in the same order as the provided targets. Targets
+            that are not found are set to None.
+        """
+        targets = [self.key(target) for target in targets]
+        results = [None] * len(targets)
+        order = sorted(range(len(targets)), key=lambda i: targets[i])
+
+        key_idx = 0
+        n_keys = len(self.keys)
+        for target_idx in order:
+            target = targets[target_idx]
+
+            # advance the index cursor until it reaches the target
+            while key_idx < n_keys and self.keys[key_idx] < target:
+                key_idx += 1
+            if key_idx == n_keys:
+                break
+
+            if self.keys[key_idx] == target:
+                results[target_idx] = self.positions[key_idx]
+
+        return results
+
+
+@register_search_backend("hash")
+class HashIndex(SearchIndex):
+    """Hash lookup structure built from an indexed array (look at
+    index_list). Every element is mapped to the position of its first
+    occurrence, the same position linear_search returns, so every lookup
+    afterwards is O(1).
+
+    Parameters
+    ----------
+    indexed_sel_array : list[list[Any, int]]
+        list of nested list that contains indexed parameter names.
+    ignore_case : bool
+        matches strings regardless of their case. The keys of the index are
+        then casefolded
+
+    Raises
+    ------
+    ValueError
+        Raised if an empty list is provided
+
+    Example
+    -------
+    >>> header = index_list(["Name", "Description", "Name"])
+    >>> header_index = HashIndex(header)
+    >>> print(header_index.lookup("Name"))
+    0
+    """
+
+    def __init__(
+        self,
+        indexed_sel_array: List[List[Union[str, int]]],
+        ignore_case: Optional[bool] = False,
+    ):
+        if len(indexed_sel_array) == 0:
+            raise ValueError("Empty list is provided")
+
+        self.key = comparison_key(ignore_case)
+        if ignore_case:
+            indexed_sel_array = [
+                (self.key(element), position)
+                for element, position in indexed_sel_array
+            ]
+
+        self.positions = {}
+        for element, position in indexed_sel_array:
+            self.positions.setdefault(element, position)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, target: Any) -> bool:
+        return self.key(target) in self.positions
+
+    def lookup(self, target: Any) -> int:
+        """Returns the index position of the first occurrence of the target
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        try:
+            return self.positions[self.key(target)]
+        except KeyError:
+            raise ValueError
+
+    def lookup_many(self, targets: Iterable[Any]) -> List[Optional[int]]:
+        """Returns the index positions of a batch of targets in the same
+        order as the targets. Targets that are not found are set to None.
+        """
+        return [self.positions.get(self.key(target)) for target in targets]
+
+
+@register_search_backend("bisect")
+class BisectIndex(SortedIndex):
+    """Sorted index searched with the standard library bisect module. Equal
+    elements keep their original order when sorted, so the first position of
+    a target is returned."""
+
+    def lookup(self, target: Any) -> int:
+        """Returns the index position of the first occurrence of the target
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        target = self.key(target)
+        key_idx = bisect_left(self.keys, target)
+        if key_idx < len(self.keys) and self.keys[key_idx] == target:
+            return self.positions[key_idx]
+        raise ValueError
+
+
+@register_search_backend("exponential")
+class ExponentialIndex(SortedIndex):
+    """Sorted index searched with exponential search. The search range is
+    doubled from the start of the index until it passes the target, then
+    bisected, so targets near the start are found in fewer steps."""
+
+    def lookup(self, target: Any) -> int:
+        """Returns the index position of the first occurrence of the target
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        target = self.key(target)
+        n_keys = len(self.keys)
+        bound = 1
+        while bound < n_keys and self.keys[bound] < target:
+            bound *= 2
+
+        key_idx = bisect_left(
+            self.keys, target, bound // 2, min(bound + 1, n_keys)
+        )
+        if key_idx < n_keys and self.keys[key_idx] == target:
+            return self.positions[key_idx]
+        raise ValueError
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+@register_search_backend("interpolation")
+class InterpolationIndex(SortedIndex):
+    """Sorted index of numbers searched with interpolation search. The next
+    probe is estimated from the value of the target, which takes O(log log n)
+    probes on evenly distributed keys.
+
+    Raises
+    ------
+    TypeError
+        Raised if the indexed array contains non numerical elements
+    """
+
+    def __init__(
+        self,
+        indexed_sel_array: List[List[Union[int, float]]],
+        ignore_case: Optional[bool] = False,
+    ):
+        for entry in indexed_sel_array:
+            if not _is_number(entry[0]) or entry[0] != entry[0]:
+                _type = type(entry[0])
+                msg = f"Interpolation search requires numbers, found {_type}"
+                raise TypeError(msg)
+        super().__init__(indexed_sel_array, ignore_case)
+
+    def lookup(self, target: Union[int, float]) -> int:
+        """Returns the index position of the first occurrence of the target
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        TypeError
+            Raises when the target is not a number
+        """
+        if not _is_number(target):
+            raise TypeError("Interpolation search requires a numerical target")
+
+        keys = self.keys
+        low_idx = 0
+        high_idx = len(keys) - 1
+        while (
+            low_idx <= high_idx and keys[low_idx] <= target <= keys[high_idx]
+        ):
+            if keys[high_idx] == keys[low_idx]:
+                probe_idx = low_idx
+            elif not (
+                math.isfinite(target)
+                and math.isfinite(keys[low_idx])
+                and math.isfinite(keys[high_idx])
+            ):
+                # infinite bounds give no usable estimate (inf / inf is
+                # nan), the remaining range is bisected instead
+                key_idx = bisect_left(keys, target, low_idx, high_idx + 1)
+                if keys[key_idx] == target:
+                    return self.positions[key_idx]
+                break
+            else:
+                span = (target - keys[low_idx]) / (
+                    keys[high_idx] - keys[low_idx]
+                )
+                probe_idx = low_idx + int(span * (high_idx - low_idx))
+
+            if keys[probe_idx] < target:
+                low_idx = probe_idx + 1
+            elif keys[probe_idx] > target:
+                high_idx = probe_idx - 1
+            else:
+                # equal elements sit next to each other, the first one holds
+                # the first position
+                key_idx = bisect_left(keys, target, low_idx, probe_idx)
+                return self.positions[key_idx]
+
+        raise ValueError
+
+
+def _type_kind(value_type: type) -> Optional[str]:
+    """Returns the kind of elements ("str" or "number") a NumPy index can
+    hold for a type, None for any other type"""
+    if issubclass(value_type, str):
+        return "str"
+    if issubclass(value_type, numbers.Real) and not issubclass(
+        value_type, bool
+    ):
+        return "number"
+    return None
+
+
+@register_search_backend("numpy")
+class SearchsortedIndex(SearchIndex):
+    """Sorted NumPy index searched with np.searchsorted. A batch of targets
+    is looked up with a single vectorized call, which makes it the fastest
+    backend for large batches. numpy is imported when the index is built.
+
+    Elements must be all strings or all numbers, NumPy would otherwise
+    convert a mixed array to strings. Targets of the other kind are not
+    found.
+
+    Parameters
+    ----------
+    indexed_sel_array : list[list[Any, int]]
+        list of nested list that contains indexed parameter names.
+    ignore_case : bool
+        matches strings regardless of their case. The keys of the index are
+        then casefolded
+
+    Raises
+    ------
+    TypeError
+        Raised if the elements are not all strings or all numbers
+    ValueError
+        Raised if an empty list is provided
+    """
+
+    def __init__(
+        self,
+        indexed_sel_array: List[List[Union[str, int]]],
+        ignore_case: Optional[bool] = False,
+    ):
+        if len(indexed_sel_array) == 0:
+            raise ValueError("Empty list is provided")
+
+        import numpy as np
+
+        self._build(
+            [entry[0] for entry in indexed_sel_array],
+            np.asarray([entry[1] for entry in indexed_sel_array]),
+            ignore_case,
+        )
+
+    @classmethod
+    def from_array(
+        cls, sel_array: Sequence[Any], ignore_case: Optional[bool] = False
+    ) -> "SearchsortedIndex":
+        """Builds the index of a plain array without indexing it in Python
+
+        Raises
+        ------
+        TypeError
+            Raised if a non-Sequence type object is provided, or its
+            elements are not all strings or all numbers
+        ValueError
+            Raised if an empty array is provided
+        """
+        if not isinstance(sel_array, Sequence):
+            raise TypeError("sel_arry must be either a list or a tuple array")
+        if len(sel_array) == 0:
+            raise ValueError("Empty list is provided")
+
+        import numpy as np
+
+        index = cls.__new__(cls)
+        index._build(sel_array, np.arange(len(sel_array)), ignore_case)
+        return index
+
+    def _build(
+        self,
+        elements: Sequence[Any],
+        positions: "np.ndarray",
+        ignore_case: bool,
+    ) -> None:
+        import numpy as np
+
+        # only the distinct types are checked, not every element
+        kinds = {
+            _type_kind(value_type) for value_type in set(map(type, elements))
+        }
+        if len(kinds) != 1 or None in kinds:
+            raise TypeError("Elements must be all strings or all numbers")
+        self.kind = kinds.pop()
+
+        self.key = comparison_key(ignore_case and self.kind == "str")
+        if ignore_case and self.kind == "str":
+            elements = [self.key(element) for element in elements]
+        elements = np.asarray(elements)
+
+        # stable sort, equal elements keep their original order
+        order = np.argsort(elements, kind="stable")
+        self.keys = elements[order]
+        self.positions = positions[order]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, target: Any) -> int:
+        """Returns the index position of the first occurrence of the target
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        position = self.lookup_many([target])[0]
+        if position is None:
+            raise ValueError
+        return position
+
+    def lookup_many(self, targets: Iterable[Any]) -> List[Optional[int]]:
+        """Looks up a batch of targets with one np.searchsorted call. Returns
+        the index positions in the same order as the targets, targets that
+        are not found are set to None.
+        """
+        import numpy as np
+
+        # targets of another kind than the elements are never found
+        targets = list(targets)
+        is_kind = None
+        target_kinds = {
+            _type_kind(t_type) for t_type in set(map(type, targets))
+        }
+        if target_kinds != {self.kind}:
+            is_kind = [
+                _type_kind(type(target)) == self.kind for target in targets
+            ]
+            targets = [
+                target for target, keep in zip(targets, is_kind) if keep
+            ]
+        if self.key is _casefold_key:
+            targets = [self.key(target) for target in targets]
+
+        results = []
+        if len(targets) > 0:
+            targets = np.asarray(targets)
+            key_idxs = np.searchsorted(self.keys, targets)
+            key_idxs = np.minimum(key_idxs, len(self.keys) - 1)
+            found = self.keys[key_idxs] == targets
+            positions = np.where(found, self.positions[key_idxs], -1)
+            results = [
+                None if position < 0 else position
+                for position in positions.tolist()
+            ]
+
+        if is_kind is not None:
+            kind_results = iter(results)
+            results = [
+                next(kind_results) if keep else None for keep in is_kind
+            ]
+        return results
+
+
+@register_search_backend("postings")
+class PostingsIndex(SearchIndex):
+    """Postings index that maps every element to all of its positions. The
+    index is built with a single pass over the elements, which can be any
+    iterable (e.g. the token stream of token_stream.iter_tokens), and the
+    positions of each element are stored compactly as an array('I').
+
+    find_all, count, first and last cost O(1) plus the number of returned
+    positions.
+
+    Parameters
+    ----------
+    elements : Iterable[Any]
+        elements to index, in order
+    ignore_case : bool
+        matches strings regardless of their case. The keys of the index are
+        then casefolded
+
+    Raises
+    ------
+    ValueError
+        Raised if no elements are provided
+
+    Example
+    -------
+    >>> postings = PostingsIndex(["ACTA2", "TP53", "ACTA2"])
+    >>> print(postings.find_all("ACTA2").tolist())
+    [0, 2]
+    >>> print(postings.count("ACTA2"), postings.last("ACTA2"))
+    2 2
+    """
+
+    def __init__(
+        self, elements: Iterable[Any], ignore_case: Optional[bool] = False
+    ):
+        self.key = comparison_key(ignore_case)
+        if ignore_case:
+            elements = map(self.key, elements)
+
+        self.postings = {}
+        self.size = 0
+        for position, element in enumerate(elements):
+            try:
+                self.postings[element].append(position)
+            except KeyError:
+                self.postings[element] = array("I", [position])
+            self.size = position + 1
+
+        if self.size == 0:
+            raise ValueError("Empty list is provided")
+
+    @classmethod
+    def from_array(
+        cls, sel_array: Sequence[Any], ignore_case: Optional[bool] = False
+    ) -> "PostingsIndex":
+        """Builds the index of a plain array
+
+        Raises
+        ------
+        TypeError
+            Raised if a non-Sequence type object is provided
+        ValueError
+            Raised if an empty array is provided
+        """
+        if not isinstance(sel_array, Sequence):
+            raise TypeError("sel_arry must be either a list or a tuple array")
+        return cls(sel_array, ignore_case)
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def __contains__(self, target: Any) -> bool:
+        return self.key(target) in self.postings
+
+    def find_all(self, target: Any) -> array:
+        """Returns all positions of the target in ascending order
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        try:
+            return self.postings[self.key(target)]
+        except KeyError:
+            raise ValueError
+
+    def count(self, target: Any) -> int:
+        """Returns the number of occurrences of the target, 0 if not found"""
+        return len(self.postings.get(self.key(target), ()))
+
+    def first(self, target: Any) -> int:
+        """Returns the first position of the target (look at find_all)"""
+        return self.find_all(target)[0]
+
+    def last(self, target: Any) -> int:
+        """Returns the last position of the target (look at find_all)"""
+        return self.find_all(target)[-1]
+
+    def lookup(self, target: Any) -> int:
+        """Returns the first position of the target, as linear_search does
+
+        Raises
+        ------
+        ValueError
+            Raises when the target is not found within the index
+        """
+        return self.first(target)
+
+
+# auto backend selection (look at choose_search_backend)
+AUTO_NUMPY_MIN_QUERIES = 1000
+AUTO_NUMPY_MIN_ELEMENTS = 10000
+
+
+def choose_search_backend(
+    n_elements: Optional[int], n_queries: Optional[int]
+) -> str:
+    """Picks the search backend for a number of elements and queries.
+
+    * a single query is answered with a linear search, building any index
+      already reads every element once
+    * large batches on large arrays use the vectorized numpy backend, if
+      numpy is installed
+    * other batches, and streamed queries of unknown count, use the hash
+      backend, O(1) per query after an O(n) build
+
+    Parameters
+    ----------
+    n_elements : int, optional
+        number of searched elements, None if not known yet
+    n_queries : int, optional
+        number of targets, None if the targets are streamed
+
+    Returns
+    -------
+    str
+        name of the backend (look at SEARCH_BACKENDS)
+    """
+    if n_queries is not None and n_queries <= 1:
+        return "linear"
+
+    if (
+        n_queries is not None
+        and n_queries >= AUTO_NUMPY_MIN_QUERIES
+        and n_elements is not None
+        and n_elements >= AUTO_NUMPY_MIN_ELEMENTS
+        and importlib.util.find_spec("numpy") is not None
+    ):
+        return "numpy"
+
+    return "hash"
+
+
+def read_count_mean(count_array: Union[List[int], "np.ndarray"]) -> float:
+    """Returns the mean of a given read count. NumPy arrays are reduced
+    directly without checking every element in Python.
+
+    Parameters
+    ----------
+    count_array : Union[List[int], np.ndarray]
         array that contains read counts of a given group
 
     Returns
@@ -183,9 +1092,22 @@ def read_count_mean(count_array: List[int]) -> float:
     TypeError
         if a non numerical type is captured or a List object is not provided
     """
+    # vectorized path for numpy arrays. numpy is not imported by this module
+    # to keep startup fast, an array can only exist if numpy was imported
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(count_array, np.ndarray):
+        if not np.issubdtype(count_array.dtype, np.number):
+            _type = count_array.dtype
+            msg = f"Only integers and floats allowed, you provided {_type}"
+            raise TypeError(msg)
+        if count_array.size == 0:
+            print("Warning: Array with no length captured. Mean set to 0")
+            return 0
+        return round(float(count_array.mean()), 2)
+
     # checking data type
     if not isinstance(count_array, List):
-        raise TypeError("count_array must be list")
+        raise TypeError("count_array must be list or numpy array")
 
     if len(count_array) == 0:
         print("Warning: Array with no length captured. Mean set to 0")
@@ -210,7 +1132,8 @@ def filter_by_mean(
     grouped_read_counts: List[Any],
     threshold: Optional[Union[int, float]] = 0,
 ) -> List[Union[int, float]]:
-    """Filtering read counts based on mean threshold
+    """Filtering read counts based on mean threshold. Read counts can be
+    lists or NumPy arrays, arrays are kept as arrays in the returned groups.
 
     Parameters
     ----------
@@ -259,3 +1182,197 @@ def filter_by_mean(
             filtered_groups.append(result)
 
     return filtered_groups
+
+
+# statistics of group_stats that groups can be filtered on, "median" is
+# stored under matplotlib's "med" key so the stats can be drawn with bxp
+FILTER_STATS = ("mean", "median", "q1", "q3", "iqr", "whislo", "whishi")
+_STAT_KEYS = {"median": "med"}
+
+
+def _group_quantiles(
+    values: "np.ndarray",
+    starts: "np.ndarray",
+    sizes: "np.ndarray",
+    prob: float,
+) -> "np.ndarray":
+    """Returns the linearly interpolated quantile (same as np.percentile) of
+    every group of the concatenated values. Each group is sorted within
+    values and given by its start offset and size, groups must not be
+    empty."""
+    import numpy as np
+
+    ranks = prob * (sizes - 1)
+    lower = np.floor(ranks).astype(np.intp)
+    upper = np.ceil(ranks).astype(np.intp)
+    low_vals = values[starts + lower]
+    return low_vals + (values[starts + upper] - low_vals) * (ranks - lower)
+
+
+def group_stats(
+    grouped_read_counts: List[Any], whis: Optional[float] = 1.5
+) -> List[Dict[str, Any]]:
+    """Computes the box plot statistics of every group. The sorted counts of
+    all groups are concatenated once, then every statistic is computed for
+    all groups at a time from the group offsets.
+
+    Each group is summarized as a dictionary that can be passed directly to
+    matplotlib's Axes.bxp (label, med, q1, q3, whislo, whishi, fliers, mean)
+    along with the group size (n) and the interquartile range (iqr). Groups
+    without counts have all their statistics set to NaN.
+
+    Parameters
+    ----------
+    grouped_read_counts : List[Any]
+        list of [group name, read counts] entries. Read counts can be lists or
+        NumPy arrays
+    whis : float
+        whiskers extend to the furthest counts within whis * iqr of the
+        quartiles, counts beyond the whiskers are fliers
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        statistics of every group, in the order of the groups
+
+    Raises
+    ------
+    TypeError
+        Raised if the read counts contain non-numerical datatypes
+    """
+    # numpy is imported on first use so importing utils stays fast
+    import numpy as np
+
+    group_counts = []
+    for _, read_counts in grouped_read_counts:
+        counts = np.asarray(read_counts)
+        if counts.size > 0 and not np.issubdtype(counts.dtype, np.number):
+            _type = counts.dtype
+            msg = f"Only integers and floats allowed, you provided {_type}"
+            raise TypeError(msg)
+        group_counts.append(np.sort(counts.astype(np.float64).ravel()))
+
+    # every group is sorted once and concatenated, groups are then given by
+    # their offsets (a lexsort of all counts by group and value is slower)
+    n_groups = len(group_counts)
+    sizes = np.asarray([counts.size for counts in group_counts], dtype=np.intp)
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    group_ids = np.repeat(np.arange(n_groups), sizes)
+    values = np.concatenate(group_counts) if n_groups else np.empty(0)
+
+    stat_names = ("mean", "med", "q1", "q3", "iqr", "whislo", "whishi")
+    stats = {name: np.full(n_groups, np.nan) for name in stat_names}
+    filled = sizes > 0
+    f_starts = starts[filled]
+    f_sizes = sizes[filled]
+
+    if filled.any():
+        sums = np.add.reduceat(values, f_starts)
+        stats["mean"][filled] = sums / f_sizes
+        for name, prob in (("q1", 0.25), ("med", 0.5), ("q3", 0.75)):
+            stats[name][filled] = _group_quantiles(
+                values, f_starts, f_sizes, prob
+            )
+        stats["iqr"] = stats["q3"] - stats["q1"]
+
+        # whiskers end at the furthest counts within the limits, but never
+        # inside the box
+        low_limits = (stats["q1"] - whis * stats["iqr"])[group_ids]
+        high_limits = (stats["q3"] + whis * stats["iqr"])[group_ids]
+        inside = (values >= low_limits) & (values <= high_limits)
+        lowest = np.minimum.reduceat(
+            np.where(inside, values, np.inf), f_starts
+        )
+        highest = np.maximum.reduceat(
+            np.where(inside, values, -np.inf), f_starts
+        )
+        stats["whislo"][filled] = np.minimum(lowest, stats["q1"][filled])
+        stats["whishi"][filled] = np.maximum(highest, stats["q3"][filled])
+
+    is_flier = (values < stats["whislo"][group_ids]) | (
+        values > stats["whishi"][group_ids]
+    )
+    group_values = np.split(values, ends[:-1])
+    group_fliers = np.split(is_flier, ends[:-1])
+    stats = {name: stats[name].tolist() for name in stat_names}
+
+    all_stats = []
+    for group_idx, (group_name, _) in enumerate(grouped_read_counts):
+        group_stat = {name: stats[name][group_idx] for name in stat_names}
+        group_stat.update(
+            label=group_name,
+            n=int(sizes[group_idx]),
+            fliers=group_values[group_idx][group_fliers[group_idx]],
+        )
+        all_stats.append(group_stat)
+
+    return all_stats
+
+
+def filter_by_stat(
+    grouped_read_counts: List[Any],
+    threshold: Optional[Union[int, float]] = 0,
+    stat: Optional[str] = "mean",
+) -> Tuple[List[List[Any]], List[Dict[str, Any]]]:
+    """Filtering read counts on any group statistic (look at FILTER_STATS).
+    Groups are kept if their statistic is equal to or above the threshold,
+    the mean is rounded to 2 decimals as in filter_by_mean. Groups without
+    counts have no statistics (NaN) and are never kept.
+
+    Parameters
+    ----------
+    grouped_read_counts : List[Any]
+        list of [group name, read counts] entries
+    threshold : Union[int, float]
+        minimum value of the statistic
+    stat : str
+        statistic compared to the threshold
+
+    Returns
+    -------
+    Tuple[List[List[Any]], List[Dict[str, Any]]]
+        returns the [group name, read counts] entries of the groups that meet
+        the threshold along with their statistics (look at group_stats)
+
+    Raises
+    ------
+    TypeError
+        Raised if a List is not provided, group name is not found, or read
+        counts contain non-numerical datatypes.
+    ValueError
+        Raised if an empty list or an unknown statistic is provided
+    """
+    # type checking
+    if not isinstance(grouped_read_counts, List):
+        raise TypeError("grouped_read_counts must be a list")
+    if len(grouped_read_counts) == 0:
+        raise ValueError("Empty list is provided")
+    if not isinstance(grouped_read_counts[0][0], str):
+        raise TypeError("Group name is not found")
+    if not isinstance(threshold, int) and not isinstance(threshold, float):
+        raise TypeError("threshold must be must be an int or float")
+    if stat not in FILTER_STATS:
+        raise ValueError(f"{stat} is not a statistic, use {FILTER_STATS}")
+
+    # groups without data are skipped
+    grouped_read_counts = [
+        grouped_data
+        for grouped_data in grouped_read_counts
+        if len(grouped_data) > 1
+    ]
+    stat_key = _STAT_KEYS.get(stat, stat)
+
+    filtered_groups = []
+    filtered_stats = []
+    for (group_name, read_counts), stats in zip(
+        grouped_read_counts, group_stats(grouped_read_counts)
+    ):
+        value = stats[stat_key]
+        if stat == "mean":
+            value = round(value, 2)
+        if value >= threshold:
+            filtered_groups.append([group_name, read_counts])
+            filtered_stats.append(stats)
+
+    return filtered_groups, filtered_stats
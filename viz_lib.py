@@ -6,20 +6,84 @@ Module contains functions used for plotting data collected form the gene read
 counts and gene attributes datasets
 
 * make_box_plot - generates box plot of all gene counts across all tissue types
+
+* render_box_plots - generates the box plots of many genes across a pool of
+                     processes
+
+Plots are drawn with matplotlib's object-oriented Figure API on the Agg canvas,
+so no pyplot global state or GUI backend is involved and figures can be
+rendered in parallel.
 """
+from typing import Any
+from typing import Dict
 from typing import Union
 from typing import List
 from typing import Optional
 from pathlib import Path
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from utils import group_stats
+
+
+def _render_box_plot(
+    data: List[List[Union[str, int]]],
+    gene_name: str,
+    output_file: str,
+    group_label: Optional[str] = "SMTS",
+    fig_width: Optional[int] = 10,
+    fig_height: Optional[int] = 4,
+    stats: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """Draws and saves the box plot, returns the path of the saved plot. The
+    boxes are drawn from the group statistics (look at utils.group_stats),
+    which are only computed if not provided."""
+    # setting output path
+    out_path_obj = Path(output_file)
+    parent_path = out_path_obj.parent
+    out_name = out_path_obj.name
+
+    save_path = parent_path / f"{out_name}"
+
+    # setting up plot figure
+    fig = Figure(figsize=(fig_width, fig_height), dpi=300)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    # data prep for plotting
+    if stats is None:
+        stats = group_stats(data)
+
+    # plot data, bxp draws the precomputed statistics as they are
+    ax.bxp(stats)
+
+    # axis formatting
+    ax.ticklabel_format(style="plain", axis="y")
+    ax.tick_params(axis="x", labelrotation=90)
+
+    # figure labeling
+    ax.set_title(f"{gene_name} read counts across all tissue samples")
+    ax.set_xlabel(group_label)
+    ax.set_ylabel("Gene Read Counts")
+
+    # squeezes plot into figure dimensions
+    fig.tight_layout()
+
+    # save figure
+    fig.savefig(save_path)
+
+    return str(save_path)
 
 
 def make_box_plot(
     data: List[List[Union[str, int]]],
     gene_name: str,
     output_file: str,
+    group_label: Optional[str] = "SMTS",
     fig_width: Optional[int] = 10,
     fig_height: Optional[int] = 4,
+    stats: Optional[List[Dict[str, Any]]] = None,
 ) -> None:
     """Generates box plots from grouped gene counts. Where the x axis
     represents tissue sample and y axis is the gene read counts.
@@ -36,49 +100,76 @@ def make_box_plot(
         name of the gene searched. Will be used to plot
     output_file : str
         name of generated box plot file
+    group_label : str
+        name of the sample group column. Used as the x axis label
     fig_width: int,
         width size of the figure
     fig_height : int
         height size of the figure
+    stats : list[dict[str, Any]], optional
+        statistics of every group (look at utils.group_stats). Computed from
+        the data if not provided
 
     Return
     ------
     None
         Generates a box plot file image in current working directory
     """
-    # setting output path
-    out_path_obj = Path(output_file)
-    parent_path = out_path_obj.parent
-    out_name = out_path_obj.name
-
-    save_path = parent_path / f"{out_name}"
-
-    # setting up plot figure
-    _, ax = plt.subplots(figsize=(fig_width, fig_height), dpi=300)
+    save_path = _render_box_plot(
+        data,
+        gene_name,
+        output_file,
+        group_label=group_label,
+        fig_width=fig_width,
+        fig_height=fig_height,
+        stats=stats,
+    )
+
+    print(f"MESSAGE: plot saved in: {save_path}")
 
-    # data prep for plotting
-    sample_types = [group_samples[0] for group_samples in data]
-    read_counts = [sample_types[1] for sample_types in data]
-
-    # plot data
-    plt.boxplot(read_counts)
+    return None
 
-    # axis formatting
-    ax.set_xticklabels(sample_types)
-    ax.ticklabel_format(style="plain", axis="y")
 
-    # figure labeling
-    plt.title(f"{gene_name} read counts across all tissue samples")
-    plt.xlabel("SMTS")
-    plt.ylabel("Gene Read Counts")
-    plt.xticks(rotation=90)
+def _render_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Renders one plot job and captures its error, runs inside the worker
+    processes"""
+    try:
+        save_path = _render_box_plot(**job)
+        return {"gene_name": job["gene_name"], "output_file": save_path}
+    except Exception as e:
+        e_type = e.__class__.__name__
+        return {
+            "gene_name": job["gene_name"],
+            "output_file": None,
+            "error": f"{e_type}: {e}",
+        }
 
-    # squeezes plot into figure dimensions
-    plt.tight_layout()
 
-    # save figure
-    plt.savefig(save_path)
+def render_box_plots(
+    jobs: List[Dict[str, Any]], workers: Optional[int] = 1
+) -> List[Dict[str, Any]]:
+    """Generates the box plots of many genes. Jobs are rendered across a pool
+    of processes and a failing job does not stop the other jobs.
 
-    print(f"MESSAGE: plot saved in: {str(save_path)}")
+    Parameters
+    ----------
+    jobs : list[dict[str, Any]]
+        keyword arguments of make_box_plot for every plot (data, gene_name,
+        output_file and optionally group_label, fig_width, fig_height,
+        stats)
+    workers : int
+        number of processes used for rendering. Jobs are rendered in the
+        calling process if set to 1
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        one result per job in the order of the jobs. Each result contains the
+        gene_name and the output_file of the saved plot. Failed jobs have an
+        output_file of None and an error message.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        return [_render_job(job) for job in jobs]
 
-    return None
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        return list(executor.map(_render_job, jobs))